@@ -1,11 +1,15 @@
 from django.contrib import admin
-from .models import ActuatorConfig, ProfileConfig, ControlSettings
+from .models import ActuatorConfig, PositionPreset, ProfileConfig, ControlSettings
 
 @admin.register(ActuatorConfig)
 class ActuatorConfigAdmin(admin.ModelAdmin):
-    list_display = ('name', 'modbus_id', 'min_position', 'max_position', 'offset')
+    list_display = ('name', 'modbus_id', 'min_position', 'max_position', 'offset', 'model_number', 'firmware_version', 'baudrate')
     list_editable = ('min_position', 'max_position', 'offset')
 
+@admin.register(PositionPreset)
+class PositionPresetAdmin(admin.ModelAdmin):
+    list_display = ('name', 'positions')
+
 @admin.register(ProfileConfig)
 class ProfileConfigAdmin(admin.ModelAdmin):
     list_display = ('name', 'target_value', 'tolerance', 'is_simulated', 'simulated_value')
@@ -13,5 +17,6 @@ class ProfileConfigAdmin(admin.ModelAdmin):
 
 @admin.register(ControlSettings)
 class ControlSettingsAdmin(admin.ModelAdmin):
-    list_display = ('__str__', 'is_active', 'loop_interval_ms', 'kp')
+    list_display = ('__str__', 'is_active', 'loop_interval_ms', 'kp', 'deadband')
     list_editable = ('is_active', 'loop_interval_ms', 'kp')
+    readonly_fields = ('bus_baudrate',)  # Changed only with the actuators, by configure_bus
@@ -0,0 +1,15 @@
+from django.apps import AppConfig
+
+
+class HardwareConfig(AppConfig):
+    name = 'apps.hardware'
+
+    def ready(self):
+        from django.db.models.signals import post_save, post_delete
+        from .models import ActuatorConfig, ProfileConfig, ControlSettings
+        from .services.config_cache import config_changed
+
+        # Any configuration change invalidates the control loop snapshot
+        for model in (ActuatorConfig, ProfileConfig, ControlSettings):
+            post_save.connect(config_changed, sender=model, dispatch_uid=f'config_changed_save_{model.__name__}')
+            post_delete.connect(config_changed, sender=model, dispatch_uid=f'config_changed_delete_{model.__name__}')
@@ -0,0 +1,45 @@
+import struct
+import timeit
+
+from django.core.management.base import BaseCommand
+from apps.hardware.modbus import build_request, crc16, crc16_bitwise
+
+
+class Command(BaseCommand):
+    help = 'Micro-benchmark of the table-driven CRC16 against the bit-by-bit implementation'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--number', type=int, default=20000, help='Iterations per measurement')
+
+    def handle(self, *args, **options):
+        number = options['number']
+
+        # Typical frames: read request (6 bytes) and a 7-register reply (17 bytes)
+        request = struct.pack('>BBHH', 1, 0x03, 0x0020, 1)
+        reply = bytes([1, 0x03, 14]) + bytes(range(14))
+
+        cases = [
+            ('request 6 B', request),
+            ('reply 17 B', reply),
+            ('block 256 B', bytes(range(256))),
+        ]
+
+        for label, data in cases:
+            bitwise = timeit.timeit(lambda: crc16_bitwise(data), number=number)
+            table = timeit.timeit(lambda: crc16(data), number=number)
+            self.stdout.write(
+                f'{label:12s} bitwise {bitwise / number * 1e6:8.2f} us  '
+                f'table {table / number * 1e6:8.2f} us  speedup {bitwise / table:5.1f}x'
+            )
+
+        # Precomputed (cached) request frame vs building and CRC'ing it each time
+        build_request.cache_clear()
+        uncached = timeit.timeit(
+            lambda: struct.pack('>BBHH', 1, 0x03, 0x0020, 1) + crc16_bitwise(request).to_bytes(2, 'little'),
+            number=number,
+        )
+        cached = timeit.timeit(lambda: build_request(1, 0x03, 0x0020, 1), number=number)
+        self.stdout.write(
+            f'{"frame build":12s} bitwise {uncached / number * 1e6:8.2f} us  '
+            f'cached {cached / number * 1e6:8.2f} us  speedup {uncached / cached:5.1f}x'
+        )
@@ -0,0 +1,67 @@
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from apps.hardware.services import benchmark
+
+SUITES = ('crc', 'framing', 'driver', 'loop', 'web')
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks CRC/framing, driver transactions, control loop cycles and web API latency on the simulated hardware'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', nargs='+', choices=SUITES, help='Suites to run (default: all)')
+        parser.add_argument('--actuators', type=int, nargs='+', default=[3], help='Actuator counts for the loop suite')
+        parser.add_argument('--cycles', type=int, default=30, help='Control loop cycles per actuator count')
+        parser.add_argument('--count', type=int, default=200, help='Transactions / requests per measurement')
+        parser.add_argument('--json', action='store_true', help='Print the results as JSON instead of a table')
+        parser.add_argument('--output', help='Also write the JSON results to this file')
+        parser.add_argument('--baseline', default=str(settings.HARDWARE_BENCHMARK_BASELINE),
+                            help='Baseline to compare against (skipped if the file does not exist)')
+        parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+        parser.add_argument('--tolerance', type=float, default=benchmark.DEFAULT_TOLERANCE,
+                            help='Relative change flagged as a regression (0.25 = 25%%)')
+
+    def handle(self, *args, **options):
+        suites = options['only'] or SUITES
+        results = {}
+        for suite in suites:
+            if suite == 'crc':
+                results.update(benchmark.bench_crc())
+            elif suite == 'framing':
+                results.update(benchmark.bench_framing())
+            elif suite == 'driver':
+                results.update(benchmark.bench_driver(count=options['count']))
+            elif suite == 'loop':
+                for n_actuators in options['actuators']:
+                    results.update(benchmark.bench_loop(n_actuators, cycles=options['cycles']))
+            elif suite == 'web':
+                from apps.web.benchmark import bench_web
+                results.update(bench_web(count=options['count']))
+
+        baseline_path = options['baseline']
+        regressions = []
+        if options['save_baseline']:
+            benchmark.save_baseline(baseline_path, results)
+        elif baseline_path and os.path.exists(baseline_path):
+            regressions = benchmark.compare(results, benchmark.load_baseline(baseline_path), options['tolerance'])
+
+        report = {'environment': benchmark.environment(), 'results': results,
+                  'regressions': [name for name, *_ in regressions]}
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, sort_keys=True))
+        else:
+            for name, result in results.items():
+                self.stdout.write(f"{name:42s} {result['value']:12.4f} {result['unit']}")
+            if options['save_baseline']:
+                self.stdout.write(self.style.SUCCESS(f'Baseline saved to {baseline_path}'))
+
+        if regressions:
+            lines = [f'{name}: {reference:g} -> {value:g} ({change:+.0%})' for name, reference, value, change in regressions]
+            raise CommandError('Regressions against the baseline:\n' + '\n'.join(lines))
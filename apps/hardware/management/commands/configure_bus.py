@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.hardware.models import ActuatorConfig
+from apps.hardware.services import bus_config
+from apps.hardware.modbus import BAUD_RATE_CODES
+from apps.hardware.services.mighty_zap import DEFAULT_SERIAL_PORT, MightyZapDriver
+from apps.hardware.services.simulator import HardwareSimulator
+
+
+class Command(BaseCommand):
+    help = ('Moves the actuators and the driver together to another baud rate (verified, rolled back on failure) '
+            'and reports the bus capacity before and after. Opens the serial port itself: stop run_control first')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--baudrate', type=int, choices=sorted(BAUD_RATE_CODES.values()),
+                            help='New bus baud rate (omit to only measure the capacity)')
+        parser.add_argument('--ids', type=int, nargs='+', help='Actuator Modbus IDs (default: configured actuators)')
+        parser.add_argument('--port', default=DEFAULT_SERIAL_PORT, help='Serial port of the actuator bus')
+        parser.add_argument('--cycles', type=int, default=bus_config.CAPACITY_CYCLES,
+                            help='Bus cycles per capacity measurement')
+        parser.add_argument('--simulate', action='store_true',
+                            help='Run against the in-process hardware simulator (nothing is stored)')
+
+    def handle(self, *args, **options):
+        ids = options['ids'] or list(ActuatorConfig.objects.order_by('modbus_id').values_list('modbus_id', flat=True))
+        if not ids:
+            raise CommandError('No actuators: pass --ids or run discover_actuators')
+        current = bus_config.configured_baudrate()
+        driver = MightyZapDriver(port=options['port'], baudrate=current, simulated=False)
+        if options['simulate']:
+            HardwareSimulator(ids, baudrate=current).attach(driver)
+        elif not driver.connect():
+            raise CommandError(f"Could not open {options['port']}")
+
+        try:
+            report = bus_config.migrate_baudrate(driver, ids, options['baudrate'] or current, cycles=options['cycles'],
+                                                 persist=not options['simulate'])
+        finally:
+            driver.disconnect()
+
+        for label in ('before', 'after'):
+            capacity = report[label]
+            if capacity:
+                self.stdout.write(
+                    f"{label:6s} {capacity['baudrate']:6d} baud: cycle {capacity['cycle_ms']:.2f} ms "
+                    f"({capacity['cycles_per_second']:.0f} cycles/s, {capacity['errors']} errors), "
+                    f"turnaround ms {capacity['turnaround_ms']}, timeout ms {capacity['timeout_ms']}"
+                )
+        if report['status'] == bus_config.MIGRATED:
+            before, after = report['before'], report['after']
+            gain = f": {after['cycles_per_second'] / before['cycles_per_second']:.2f}x cycles/s" if before and after else ''
+            self.stdout.write(self.style.SUCCESS(f"Bus moved to {report['to']} baud{gain}"))
+        elif report['status'] != bus_config.UNCHANGED:
+            message = f"{report['status']}: {report['error']}"
+            if report['lost']:
+                message += f" - actuators {report['lost']} lost, find them with discover_actuators"
+            raise CommandError(message)
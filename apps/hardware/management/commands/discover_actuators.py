@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+from apps.hardware.services.bus_config import configured_baudrate
+from apps.hardware.services.discovery import ALL_IDS, scan, sync_actuators
+from apps.hardware.modbus import BAUD_RATE_CODES
+from apps.hardware.services.mighty_zap import DEFAULT_SERIAL_PORT, MightyZapDriver
+from apps.hardware.services.simulator import HardwareSimulator
+
+
+class Command(BaseCommand):
+    help = ('Scans the actuator bus for MightyZAP devices (IDs and baud rates), reads their model and firmware '
+            'and syncs them into ActuatorConfig. Opens the serial port itself: stop run_control first, '
+            'or use POST /api/discover/ to scan from the running control process')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', default=DEFAULT_SERIAL_PORT, help='Serial port of the actuator bus')
+        parser.add_argument('--first', type=int, default=ALL_IDS.start, help='First ID to probe')
+        parser.add_argument('--last', type=int, default=ALL_IDS.stop - 1, help='Last ID to probe')
+        parser.add_argument('--baudrates', type=int, nargs='+', choices=sorted(BAUD_RATE_CODES.values()),
+                            help='Baud rates to try (default: all, the configured bus rate first)')
+        parser.add_argument('--timeout', type=float,
+                            help='Response timeout per probe in ms (default: line time of the probe at each '
+                                 'rate plus the read delay of the MightyZAP manual)')
+        parser.add_argument('--expected', type=int, help='Stop once this many devices were found')
+        parser.add_argument('--no-sync', action='store_true', help='Only report, do not touch ActuatorConfig')
+        parser.add_argument('--simulate', type=int, nargs='+', metavar='ID',
+                            help='Scan the in-process hardware simulator with these actuator IDs')
+
+    def handle(self, *args, **options):
+        if not 1 <= options['first'] <= options['last'] <= ALL_IDS.stop - 1:
+            raise CommandError(f'IDs must be within {ALL_IDS.start}-{ALL_IDS.stop - 1}')
+        baudrate = configured_baudrate()
+        driver = MightyZapDriver(port=options['port'], baudrate=baudrate, simulated=False)
+        if options['simulate']:
+            HardwareSimulator(options['simulate'], baudrate=baudrate).attach(driver)
+        elif not driver.connect():
+            raise CommandError(f"Could not open {options['port']}")
+
+        try:
+            result = scan(driver, ids=range(options['first'], options['last'] + 1),
+                          baudrates=options['baudrates'], timeout=options['timeout'] and options['timeout'] / 1000.0,
+                          expected=options['expected'])
+        finally:
+            driver.disconnect()
+
+        for device in result['devices']:
+            self.stdout.write(f'ID {device.modbus_id:3d} @ {device.baudrate:6d} baud: '
+                              f'model {device.model_number:#06x}, firmware {device.firmware_version}')
+        for slave_id, baudrate in result['conflicts']:
+            self.stdout.write(self.style.WARNING(
+                f'ID {slave_id} @ {baudrate} baud: garbled or duplicate reply (two devices with the same ID?)'))
+        self.stdout.write(f"{len(result['devices'])} device(s), {result['probes']} probes "
+                          f"in {result['duration']:.1f} s")
+
+        if not options['no_sync']:
+            sync = sync_actuators(result['devices'])
+            self.stdout.write(self.style.SUCCESS(f"ActuatorConfig: created {sync['created']}, updated {sync['updated']}"))
+            if sync['missing']:
+                self.stdout.write(self.style.WARNING(f"Configured but not found: {sync['missing']}"))
+        baudrates = {device.baudrate for device in result['devices']}
+        if len(baudrates) > 1:
+            self.stdout.write(self.style.WARNING(f'Devices at different baud rates {sorted(baudrates)}: '
+                                                 'the control loop talks at a single rate'))
@@ -1,10 +1,37 @@
 from django.core.management.base import BaseCommand
-from apps.hardware.services import ControlLoop
+from apps.hardware.models import ActuatorConfig
+from apps.hardware.services import ControlLoop, MightyZapDriver, ProfilometerDriver
+from apps.hardware.services.bus_config import configured_baudrate
+from apps.hardware.services.simulator import HardwareSimulator
 
 class Command(BaseCommand):
     help = 'Runs the main control loop for actuators and profilometer'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pipelined', action='store_true',
+            help='Acquire the next profilometer sample while the actuator commands are on the bus',
+        )
+        parser.add_argument(
+            '--simulate', action='store_true',
+            help='Run against the in-process hardware simulator (configured actuator IDs)',
+        )
+        parser.add_argument('--actuator-port', help='Serial port of the actuator bus (e.g. a run_simulator pty)')
+        parser.add_argument('--profilometer-port', help='Serial port of the profilometer')
+
     def handle(self, *args, **kwargs):
         self.stdout.write(self.style.SUCCESS('Initializing Control Loop...'))
-        loop = ControlLoop()
+        driver = profilometer_driver = None
+        if kwargs['simulate']:
+            ids = list(ActuatorConfig.objects.order_by('modbus_id').values_list('modbus_id', flat=True)) or [1, 2, 3]
+            driver, profilometer_driver = MightyZapDriver(simulated=False), ProfilometerDriver()
+            HardwareSimulator(ids, baudrate=configured_baudrate(), noise=0.01).attach(driver, profilometer_driver)
+            self.stdout.write(f'Simulated hardware: actuators {ids}')
+        if kwargs['actuator_port']:
+            driver = MightyZapDriver(port=kwargs['actuator_port'], simulated=False)
+            driver.connect()
+        if kwargs['profilometer_port']:
+            profilometer_driver = ProfilometerDriver(port=kwargs['profilometer_port'])
+            profilometer_driver.connect()
+        loop = ControlLoop(pipelined=kwargs['pipelined'], driver=driver, profilometer_driver=profilometer_driver)
         loop.start()
@@ -0,0 +1,51 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand, CommandError
+from apps.hardware.models import ActuatorConfig
+from apps.hardware.services.bus_config import configured_baudrate
+from apps.hardware.services.profilometer import DEFAULT_BAUDRATE as PROFILOMETER_BAUDRATE, MEASURED_VALUE_COUNT
+from apps.hardware.services.simulator import HardwareSimulator
+
+
+class Command(BaseCommand):
+    help = 'Serves simulated MightyZAP actuators and an OX100 profilometer on pseudo-terminals'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ids', type=int, nargs='+', help='Actuator Modbus IDs (default: configured actuators)')
+        parser.add_argument('--baudrate', type=int, help='Actuator baud rate at startup (default: configured bus rate)')
+        parser.add_argument('--profilometer-baudrate', type=int, default=PROFILOMETER_BAUDRATE)
+        parser.add_argument('--base', type=float, default=10.0, help='Profile value with every actuator at 2048')
+        parser.add_argument('--gain', type=float, default=0.01, help='Profile change per actuator count')
+        parser.add_argument('--disturbance', type=float, nargs='+',
+                            help=f'Fixed offset of each of the {MEASURED_VALUE_COUNT} profile points')
+        parser.add_argument('--noise', type=float, default=0.01, help='Measurement noise (standard deviation)')
+        parser.add_argument('--seed', type=int)
+
+    def handle(self, *args, **options):
+        if options['disturbance'] and len(options['disturbance']) != MEASURED_VALUE_COUNT:
+            raise CommandError(f'--disturbance takes {MEASURED_VALUE_COUNT} values')
+        ids = options['ids'] or list(
+            ActuatorConfig.objects.order_by('modbus_id').values_list('modbus_id', flat=True)) or [1, 2, 3]
+        simulator = HardwareSimulator(
+            ids, baudrate=options['baudrate'] or configured_baudrate(), profilometer_baudrate=options['profilometer_baudrate'],
+            seed=options['seed'], base=options['base'], gain=options['gain'],
+            disturbance=options['disturbance'], noise=options['noise'],
+        )
+        actuator_bridge, profilometer_bridge = simulator.ptys()
+        self.stdout.write(self.style.SUCCESS(f'Actuators {ids} on {actuator_bridge.port}'))
+        self.stdout.write(self.style.SUCCESS(f'Profilometer on {profilometer_bridge.port}'))
+        self.stdout.write(
+            f'python manage.py run_control --actuator-port {actuator_bridge.port} '
+            f'--profilometer-port {profilometer_bridge.port}'
+        )
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: stop.set())
+        try:
+            stop.wait()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            actuator_bridge.stop()
+            profilometer_bridge.stop()
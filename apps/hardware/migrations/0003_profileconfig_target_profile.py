@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0002_profileconfig_is_simulated_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='profileconfig',
+            name='target_profile',
+            field=models.JSONField(blank=True, default=list, help_text='Target value per profile point, across the nozzle (empty = flat target_value)'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0003_profileconfig_target_profile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PositionPreset',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('positions', models.JSONField(default=dict, help_text='Position per actuator Modbus ID, e.g. {"1": 2000, "2": 2100}')),
+            ],
+        ),
+    ]
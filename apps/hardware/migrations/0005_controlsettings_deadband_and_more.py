@@ -0,0 +1,23 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0004_positionpreset'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlsettings',
+            name='deadband',
+            field=models.PositiveIntegerField(default=5, help_text='Skip a write when the new goal is within this many counts of the last commanded goal'),
+        ),
+        migrations.AddField(
+            model_name='controlsettings',
+            name='refresh_interval_ms',
+            field=models.PositiveIntegerField(default=2000, help_text='Resend every goal at least this often, even when suppressed'),
+        ),
+    ]
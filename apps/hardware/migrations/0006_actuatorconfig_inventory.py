@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0005_controlsettings_deadband_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='actuatorconfig',
+            name='baudrate',
+            field=models.PositiveIntegerField(blank=True, help_text='Baud rate the actuator answered at in the last discovery', null=True),
+        ),
+        migrations.AddField(
+            model_name='actuatorconfig',
+            name='firmware_version',
+            field=models.PositiveIntegerField(blank=True, help_text='Firmware Version register (0x0001)', null=True),
+        ),
+        migrations.AddField(
+            model_name='actuatorconfig',
+            name='model_number',
+            field=models.PositiveIntegerField(blank=True, help_text='Model Number register (0x0000)', null=True),
+        ),
+    ]
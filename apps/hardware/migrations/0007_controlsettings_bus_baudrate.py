@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hardware', '0006_actuatorconfig_inventory'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='controlsettings',
+            name='bus_baudrate',
+            field=models.PositiveIntegerField(choices=[(9600, '9600 bps'), (19200, '19200 bps'), (38400, '38400 bps'), (57600, '57600 bps'), (115200, '115200 bps')], default=57600, help_text='Baud rate of the actuator bus, set by configure_bus together with the actuators'),
+        ),
+    ]
@@ -0,0 +1,174 @@
+"""
+Enquadramento MODBUS RTU compartilhado pelo driver e pelas ferramentas de teste.
+
+Módulo sem dependências do Django, para poder ser importado também pelo
+script `test_rs485_actuators.py`. O CRC16 usa uma tabela de 256 entradas
+(um lookup por byte em vez de 8 iterações) e pode ser calculado de forma
+incremental, pedaço a pedaço, conforme os bytes chegam da serial.
+"""
+import functools
+import struct
+import time
+
+CRC16_POLY = 0xA001  # Polinômio MODBUS refletido (X^16 + X^15 + X^2 + 1)
+CRC16_INIT = 0xFFFF
+
+# Temporização MODBUS RTU: 1 caractere = start + 8 dados + paridade/stop = 11 bits.
+# Acima de 19200 bps a especificação fixa o silêncio entre frames em 1.75 ms.
+BITS_PER_CHAR = 11
+MIN_FRAME_SILENCE = 0.00175
+
+# Códigos do registrador Baud Rate do MightyZAP. Ficam aqui, e não no driver,
+# para que os models montem as opções de taxa sem importar os serviços.
+BAUD_RATE_CODES = {
+    0x10: 115200,
+    0x20: 57600,
+    0x30: 38400,
+    0x40: 19200,
+    0x80: 9600,
+}
+
+
+def _build_crc_table():
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ CRC16_POLY
+            else:
+                crc >>= 1
+        table.append(crc)
+    return tuple(table)
+
+
+_CRC_TABLE = _build_crc_table()
+
+
+def crc16(data, crc: int = CRC16_INIT) -> int:
+    """
+    Calcula o CRC16 MODBUS por tabela.
+
+    Aceita bytes, bytearray ou memoryview. Para cálculo incremental, passe o
+    valor retornado pelo pedaço anterior em `crc`. Sobre um frame completo
+    (dados + CRC recebido) o resultado é 0 quando o CRC confere.
+
+    Args:
+        data: Bytes a processar
+        crc: Valor inicial ou parcial do CRC
+
+    Returns:
+        CRC16 como inteiro
+    """
+    table = _CRC_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_bitwise(data, crc: int = CRC16_INIT) -> int:
+    """Implementação de referência bit a bit (usada em testes e benchmark)."""
+    for byte in data:
+        crc ^= byte
+        for _ in range(8):
+            if crc & 0x0001:
+                crc = (crc >> 1) ^ CRC16_POLY
+            else:
+                crc >>= 1
+    return crc
+
+
+def calculate_crc16(data: bytes) -> bytes:
+    """Calcula CRC16 MODBUS e retorna os 2 bytes na ordem do frame (little-endian)."""
+    return crc16(data).to_bytes(2, 'little')
+
+
+@functools.lru_cache(maxsize=4096)
+def build_request(slave_id: int, function_code: int, address: int, data: int) -> bytes:
+    """
+    Monta um frame de requisição com CRC.
+
+    Os frames ficam em cache: requisições repetidas a cada ciclo (ex: "ler
+    posição do ID n") não recalculam o CRC.
+
+    Args:
+        slave_id: ID do dispositivo (0-247)
+        function_code: Código da função MODBUS
+        address: Endereço do registrador
+        data: Quantidade de registros (leitura) ou valor (escrita)
+
+    Returns:
+        Frame pronto para transmissão
+    """
+    frame = struct.pack('>BBHH', slave_id, function_code, address, data)
+    return frame + calculate_crc16(frame)
+
+
+def frame_silence(baudrate: int) -> float:
+    """Silêncio de 3.5 caracteres que delimita frames RTU no baudrate dado (s)."""
+    return max(3.5 * BITS_PER_CHAR / baudrate, MIN_FRAME_SILENCE)
+
+
+def expected_response_length(function_code: int, data: int) -> int:
+    """
+    Calcula o tamanho esperado da resposta (com CRC) para uma requisição.
+
+    Args:
+        function_code: Código da função MODBUS da requisição
+        data: Campo de dados da requisição (quantidade de registros na leitura)
+
+    Returns:
+        Número de bytes do frame de resposta normal
+    """
+    if function_code in (0x03, 0x04):
+        # id + func + byte_count + 2 * registros + crc
+        return 5 + 2 * data
+    # 0x06 e 0x10 respondem com eco de 8 bytes
+    return 8
+
+
+def read_frame(port, function_code: int, expected_length: int, response_timeout: float) -> tuple:
+    """
+    Lê um frame de resposta sem esperas fixas.
+
+    A porta deve estar configurada com timeout de leitura igual ao silêncio
+    entre frames (ver frame_silence): cada read() retorna assim que os bytes
+    pedidos chegam ou o barramento silencia. A leitura termina ao atingir o
+    tamanho esperado, ou quando há silêncio de 3.5 caracteres após o início da
+    resposta. Uma resposta de exceção (função | 0x80) encurta o frame para 5
+    bytes e o byte_count das leituras é usado para confirmar o tamanho.
+
+    Args:
+        port: Porta serial (pyserial ou compatível)
+        function_code: Código da função enviada
+        expected_length: Tamanho esperado da resposta normal (com CRC)
+        response_timeout: Tempo máximo de espera pelo início da resposta (s)
+
+    Returns:
+        Tupla (bytes recebidos, CRC acumulado). O CRC é calculado pedaço a
+        pedaço durante a recepção e vale 0 para um frame íntegro.
+    """
+    response = bytearray()
+    crc = CRC16_INIT
+    deadline = time.monotonic() + response_timeout
+
+    while len(response) < expected_length:
+        chunk = port.read(expected_length - len(response))
+
+        if chunk:
+            response += chunk
+            crc = crc16(chunk, crc)
+            if len(response) >= 2 and response[1] == function_code | 0x80:
+                expected_length = 5
+            elif len(response) >= 3 and function_code in (0x03, 0x04):
+                expected_length = 5 + response[2]
+            continue
+
+        if response:
+            break  # Silêncio após o início do frame: fim da resposta
+
+        if time.monotonic() >= deadline:
+            break  # Dispositivo não respondeu
+
+    return bytes(response), crc
+
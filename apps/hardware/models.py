@@ -1,5 +1,10 @@
 from django.db import models
 
+from apps.hardware.modbus import BAUD_RATE_CODES
+
+# Values of the MightyZAP Baud Rate register (bps)
+BUS_BAUDRATES = sorted(BAUD_RATE_CODES.values())
+
 class ActuatorConfig(models.Model):
     name = models.CharField(max_length=50)
     modbus_id = models.PositiveIntegerField(unique=True)
@@ -10,10 +15,23 @@ class ActuatorConfig(models.Model):
     
     # Offsets/Correction
     offset = models.IntegerField(default=0)
+
+    # Device inventory, filled in by bus discovery
+    model_number = models.PositiveIntegerField(null=True, blank=True, help_text="Model Number register (0x0000)")
+    firmware_version = models.PositiveIntegerField(null=True, blank=True, help_text="Firmware Version register (0x0001)")
+    baudrate = models.PositiveIntegerField(null=True, blank=True, help_text="Baud rate the actuator answered at in the last discovery")
     
     def __str__(self):
         return f"{self.name} (ID: {self.modbus_id})"
 
+class PositionPreset(models.Model):
+    """Named set of actuator positions (recipe), applied in one batch"""
+    name = models.CharField(max_length=50, unique=True)
+    positions = models.JSONField(default=dict, help_text='Position per actuator Modbus ID, e.g. {"1": 2000, "2": 2100}')
+
+    def __str__(self):
+        return self.name
+
 class ProfileConfig(models.Model):
     """Configuration for the Profilometer reading"""
     name = models.CharField(max_length=50, default="Main Profilometer")
@@ -23,6 +41,7 @@ class ProfileConfig(models.Model):
     
     target_value = models.FloatField(help_text="Target profile reading value", default=0.0)
     tolerance = models.FloatField(help_text="Acceptable deviation (+/-)", default=0.5)
+    target_profile = models.JSONField(default=list, blank=True, help_text="Target value per profile point, across the nozzle (empty = flat target_value)")
     
     # Simulation
     is_simulated = models.BooleanField(default=False, help_text="Use simulated value instead of partial sensor reading")
@@ -40,6 +59,14 @@ class ControlSettings(models.Model):
     ki = models.FloatField(default=0.0, help_text="Integral Gain")
     kd = models.FloatField(default=0.0, help_text="Derivative Gain")
 
+    # Write suppression
+    deadband = models.PositiveIntegerField(default=5, help_text="Skip a write when the new goal is within this many counts of the last commanded goal")
+    refresh_interval_ms = models.PositiveIntegerField(default=2000, help_text="Resend every goal at least this often, even when suppressed")
+
+    # Actuator bus
+    bus_baudrate = models.PositiveIntegerField(default=57600, choices=[(b, f"{b} bps") for b in BUS_BAUDRATES],
+                                               help_text="Baud rate of the actuator bus, set by configure_bus together with the actuators")
+
     def __str__(self):
         return f"Control Settings (Active: {self.is_active})"
 
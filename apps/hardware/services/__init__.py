@@ -1,3 +1,4 @@
 from .mighty_zap import MightyZapDriver
+from .bus import BusWorker
 from .profilometer import ProfilometerDriver
 from .control_loop import ControlLoop
@@ -0,0 +1,235 @@
+import json
+import platform
+import tempfile
+import threading
+import time
+import timeit
+
+import numpy as np
+from django.test import override_settings
+
+from apps.hardware.modbus import build_request, crc16, crc16_bitwise, read_frame
+from apps.hardware.models import ActuatorConfig, ControlSettings, ProfileConfig
+from .config_cache import ConfigSnapshot
+from .control_loop import ControlLoop
+from .mighty_zap import ADDR_GOAL_POSITION, DEFAULT_BAUDRATE, MightyZapDriver, STATE_BLOCK_COUNT, STATE_BLOCK_START
+from .profilometer import ProfilometerDriver
+from .simulator import HardwareSimulator
+
+# Regression check: relative change against the baseline above which a metric is flagged
+DEFAULT_TOLERANCE = 0.25
+MICRO_REPEAT = 5     # Micro-benchmarks keep the best run, which is the least disturbed by the OS
+LOOP_TIMEOUT = 30.0  # s; the loop benchmark gives up if the cycles do not complete by then
+
+# Metric directions
+LOWER = 'lower'
+HIGHER = 'higher'
+
+
+def metric(value, unit, better=LOWER) -> dict:
+    return {'value': round(float(value), 4), 'unit': unit, 'better': better}
+
+
+def latency_metrics(prefix, samples) -> dict:
+    """Percentiles (ms) and throughput (1/s) of a list of durations in seconds."""
+    samples = np.asarray(samples, dtype=np.float64)
+    p50, p90, p99 = np.percentile(samples, (50, 90, 99)) * 1000.0
+    return {
+        f'{prefix}.p50': metric(p50, 'ms'),
+        f'{prefix}.p90': metric(p90, 'ms'),
+        f'{prefix}.p99': metric(p99, 'ms'),
+        f'{prefix}.rate': metric(samples.size / samples.sum(), '1/s', HIGHER),
+    }
+
+
+def per_call(function, number, repeat=MICRO_REPEAT) -> float:
+    """Duration of function() in microseconds: best of `repeat` runs of `number` calls."""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e6
+
+
+def bench_crc(number=10000) -> dict:
+    """CRC16 cost per frame and throughput; the bit-by-bit version is the reference."""
+    reply = bytes([1, 0x03, 14]) + bytes(range(14))
+    block = bytes(range(256))
+    table_block = per_call(lambda: crc16(block), number)
+    results = {
+        'crc.table_17B': metric(per_call(lambda: crc16(reply), number), 'us'),
+        'crc.bitwise_17B': metric(per_call(lambda: crc16_bitwise(reply), number), 'us'),
+        'crc.table_throughput': metric(len(block) / table_block, 'MB/s', HIGHER),
+    }
+    build_request.cache_clear()
+    results['crc.build_request_cached'] = metric(per_call(lambda: build_request(1, 0x03, 0x0020, 1), number), 'us')
+    return results
+
+
+class _ReplayPort:
+    """Serial port stand-in that hands out a fixed reply in two chunks, forever."""
+
+    def __init__(self, reply):
+        self.reply = reply
+        self.pending = []
+
+    def read(self, size=1):
+        if not self.pending:
+            self.pending = [self.reply[:3], self.reply[3:]]
+        chunk = self.pending.pop(0)
+        if len(chunk) > size:
+            self.pending.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
+
+def bench_framing(number=10000) -> dict:
+    """read_frame on an in-memory port: frame assembly and incremental CRC, without I/O."""
+    frame = bytes([1, 0x03, 2 * STATE_BLOCK_COUNT]) + bytes(2 * STATE_BLOCK_COUNT)
+    port = _ReplayPort(frame + crc16(frame).to_bytes(2, 'little'))
+    length = len(port.reply)
+    return {
+        'framing.read_state_reply': metric(per_call(lambda: read_frame(port, 0x03, length, 0.1), number), 'us'),
+    }
+
+
+def _timed(function, count):
+    """Wall-clock and CPU (this thread) duration of each call, in seconds."""
+    wall, cpu = np.empty(count), np.empty(count)
+    for i in range(count):
+        start, start_cpu = time.perf_counter(), time.thread_time()
+        function()
+        wall[i], cpu[i] = time.perf_counter() - start, time.thread_time() - start_cpu
+    return wall, cpu
+
+
+def bench_driver(count=300, baudrate=DEFAULT_BAUDRATE) -> dict:
+    """
+    _send_modbus_command against the simulated bus, in real time.
+
+    Latency and transaction rate include the line time at `baudrate`; the
+    CPU figure is the processor time of one transaction (driver and
+    simulated device, including the sleep calls but not the time asleep).
+    """
+    operations = {
+        'read_state': (1, 0x03, STATE_BLOCK_START, STATE_BLOCK_COUNT),
+        'write_goal': (1, 0x06, ADDR_GOAL_POSITION, 2048),
+    }
+    driver = MightyZapDriver(baudrate=baudrate)
+    HardwareSimulator((1,), baudrate=baudrate).attach(driver)
+
+    results = {}
+    for name, args in operations.items():
+        wall, cpu = _timed(lambda: driver._send_modbus_command(*args), count)
+        results.update(latency_metrics(f'driver.{name}', wall))
+        results[f'driver.{name}.cpu'] = metric(np.median(cpu) * 1e6, 'us')
+    return results
+
+
+class _StaticConfig:
+    """Config cache stand-in returning a fixed snapshot (no database)."""
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def get(self):
+        return self.snapshot
+
+
+class _BenchmarkLoop(ControlLoop):
+    """ControlLoop that stops after a number of completed cycles, keeping their durations."""
+
+    def __init__(self, cycles, **kwargs):
+        super().__init__(**kwargs)
+        self.cycles = cycles
+        self.cycle_times = []
+
+    def record_cycle(self, *args):
+        super().record_cycle(*args)
+        self.cycle_times.append(self.scheduler.clock() - self.scheduler.cycle_start)
+        if len(self.cycle_times) >= self.cycles:
+            self.running = False
+
+
+def bench_loop(n_actuators=3, cycles=30, interval_ms=100) -> dict:
+    """
+    End-to-end ControlLoop cycles on the simulated buses, real time.
+
+    Telemetry, live state, mailbox and metrics go to a temporary directory,
+    so a running control process is not disturbed.
+    """
+    ids = list(range(1, n_actuators + 1))
+    snapshot = ConfigSnapshot(
+        version=0,
+        settings=ControlSettings(is_active=True, loop_interval_ms=interval_ms, kp=1.0, ki=0.5),
+        profile_config=ProfileConfig(target_value=12.0, tolerance=0.05, is_simulated=False),
+        actuators=[ActuatorConfig(name=f'Actuator {i}', modbus_id=i) for i in ids],
+    )
+
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+            HARDWARE_TELEMETRY_DIR=directory,
+            HARDWARE_LIVE_STATE_FILE=f'{directory}/live.state',
+            HARDWARE_MAILBOX_FILE=f'{directory}/mailbox',
+            HARDWARE_METRICS_FILE=f'{directory}/metrics'):
+        driver, profilometer = MightyZapDriver(), ProfilometerDriver()
+        HardwareSimulator(ids, noise=0.01, seed=0).attach(driver, profilometer)
+        loop = _BenchmarkLoop(cycles, driver=driver, profilometer_driver=profilometer)
+        loop.config_cache = _StaticConfig(snapshot)
+        loop.running = True
+        thread = threading.Thread(target=loop.loop, name='benchmark loop', daemon=True)
+        thread.start()
+        thread.join(LOOP_TIMEOUT)
+        loop.running = False
+        thread.join()
+        loop.bus.stop()
+        if loop.telemetry:
+            loop.telemetry.close()
+        if loop.live_state:
+            loop.live_state.close()
+        if loop.metrics:
+            loop.metrics.close()
+
+    if len(loop.cycle_times) < cycles:
+        raise RuntimeError(f"Control loop completed {len(loop.cycle_times)} of {cycles} cycles")
+
+    prefix = f'loop.{n_actuators}_actuators'
+    results = latency_metrics(f'{prefix}.cycle', loop.cycle_times)
+    del results[f'{prefix}.cycle.rate']  # Paced by the scheduler, not by the work
+    for phase, timing in loop.scheduler.phases.items():
+        results[f'{prefix}.{phase}'] = metric(timing.mean * 1000.0, 'ms')
+    results[f'{prefix}.overruns'] = metric(loop.scheduler.overruns, 'cycles')
+    return results
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE) -> list:
+    """
+    Metrics that got worse than the baseline by more than `tolerance`.
+
+    Returns:
+        List of (name, baseline value, value, relative change) for the regressions
+    """
+    regressions = []
+    for name, current in results.items():
+        reference = baseline.get(name)
+        if not reference or not reference['value']:
+            continue
+        change = (current['value'] - reference['value']) / abs(reference['value'])
+        worse = change if current['better'] == LOWER else -change
+        if worse > tolerance:
+            regressions.append((name, reference['value'], current['value'], change))
+    return regressions
+
+
+def load_baseline(path) -> dict:
+    with open(path) as f:
+        return json.load(f)['results']
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as f:
+        json.dump({'environment': environment(), 'results': results}, f, indent=2, sort_keys=True)
+
+
+def environment() -> dict:
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'node': platform.node(),
+    }
@@ -0,0 +1,125 @@
+import itertools
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+
+from .mighty_zap import get_driver
+
+logger = logging.getLogger(__name__)
+
+# Prioridades das transações (menor valor = atendido primeiro)
+PRIORITY_CONTROL = 0      # Tráfego do loop de controle
+PRIORITY_UI = 1           # Comandos vindos da interface web
+PRIORITY_DIAGNOSTIC = 2   # Varreduras, benchmarks e testes
+_PRIORITY_STOP = -1
+
+
+class BusWorker:
+    """
+    Dono exclusivo do barramento RS-485.
+
+    Uma única thread executa todas as transações do driver, retiradas de uma
+    fila de prioridade. O barramento é half-duplex: serializar tudo aqui
+    impede que requisições concorrentes intercalem bytes na linha. Uma
+    transação em andamento nunca é interrompida, então a latência do loop de
+    controle fica limitada a uma transação de menor prioridade.
+    """
+
+    def __init__(self, driver):
+        """
+        Args:
+            driver: Instância de MightyZapDriver a ser usada exclusivamente pela thread
+        """
+        self.driver = driver
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()  # Mantém ordem FIFO dentro da mesma prioridade
+        self._thread = None
+
+    def start(self):
+        """Inicia a thread dona do barramento."""
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='rs485-bus', daemon=True)
+        self._thread.start()
+        logger.info("Thread do barramento RS-485 iniciada")
+
+    def stop(self, timeout=None):
+        """Para a thread; requisições ainda na fila são canceladas."""
+        if not self._thread:
+            return
+        self._queue.put((_PRIORITY_STOP, next(self._sequence), None, None, None, None))
+        self._thread.join(timeout)
+        self._thread = None
+
+    def submit(self, operation, *args, priority=PRIORITY_UI, **kwargs) -> Future:
+        """
+        Enfileira uma operação no barramento.
+
+        Args:
+            operation: Nome de um método do driver (ex: 'set_position') ou um
+                callable que recebe o driver como primeiro argumento. O callable
+                roda inteiro sem ser intercalado, útil para sequências que
+                precisam do barramento de forma exclusiva.
+            priority: PRIORITY_CONTROL, PRIORITY_UI ou PRIORITY_DIAGNOSTIC
+
+        Returns:
+            Future com o resultado da operação
+        """
+        future = Future()
+        self._queue.put((priority, next(self._sequence), operation, args, kwargs, future))
+        return future
+
+    def call(self, operation, *args, priority=PRIORITY_UI, timeout=None, **kwargs):
+        """Enfileira a operação e aguarda o resultado."""
+        return self.submit(operation, *args, priority=priority, **kwargs).result(timeout)
+
+    def _run(self):
+        while True:
+            priority, _, operation, args, kwargs, future = self._queue.get()
+
+            if priority == _PRIORITY_STOP:
+                break
+
+            if not future.set_running_or_notify_cancel():
+                continue
+
+            try:
+                if isinstance(operation, str):
+                    result = getattr(self.driver, operation)(*args, **kwargs)
+                else:
+                    result = operation(self.driver, *args, **kwargs)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        # Cancela o que sobrou na fila
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item[-1] is not None:
+                item[-1].cancel()
+
+        logger.info("Thread do barramento RS-485 finalizada")
+
+
+# Instância global para uso pelo sistema
+_bus_instance = None
+_bus_lock = threading.Lock()
+
+
+def get_bus() -> BusWorker:
+    """
+    Retorna o dono singleton do barramento, já iniciado, sobre o driver global.
+    """
+    global _bus_instance
+
+    with _bus_lock:
+        if _bus_instance is None:
+            _bus_instance = BusWorker(get_driver())
+            _bus_instance.start()
+
+    return _bus_instance
@@ -0,0 +1,175 @@
+import logging
+import time
+
+import numpy as np
+
+from apps.hardware.modbus import BAUD_RATE_CODES, BITS_PER_CHAR
+from apps.hardware.models import ActuatorConfig, ControlSettings
+from .discovery import probe_timeout
+from .link_stats import OUTCOME_OK
+from .mighty_zap import ADDR_BAUD_RATE, ADDR_GOAL_POSITION, DEFAULT_BAUDRATE, STATE_BLOCK_COUNT
+
+logger = logging.getLogger(__name__)
+
+BAUD_CODES = {baudrate: code for code, baudrate in BAUD_RATE_CODES.items()}
+CAPACITY_CYCLES = 20   # Bus cycles measured before and after a change
+RESTART_WAIT = 0.5     # s before probing restarted actuators
+VERIFY_TIMEOUT = 3.0   # s for every actuator to answer after a restart
+
+# Characters on the line for one read_state (request + reply)
+STATE_READ_CHARS = 8 + 5 + 2 * STATE_BLOCK_COUNT
+
+# Migration outcomes
+MIGRATED = 'migrated'
+UNCHANGED = 'unchanged'
+ROLLED_BACK = 'rolled_back'
+FAILED = 'failed'
+
+
+def configured_baudrate() -> int:
+    """Actuator bus baud rate stored in ControlSettings (the factory default when there are none)."""
+    settings = ControlSettings.objects.first()
+    return settings.bus_baudrate if settings else DEFAULT_BAUDRATE
+
+
+def measure_capacity(driver, ids, cycles=CAPACITY_CYCLES) -> dict:
+    """
+    Bus time of the control cycle traffic: read_state and a goal write per actuator.
+
+    The goals written are the ones the actuators already hold, so nothing
+    moves. The turnaround of each actuator is its read time minus the line
+    time of request and reply, i.e. device reply delay plus host latency;
+    the timeouts are the adaptive response timeouts the driver has learnt.
+
+    Returns:
+        Dict with baudrate, cycle_ms (median), cycles_per_second, errors,
+        turnaround_ms and timeout_ms per actuator; None when an actuator
+        does not answer
+    """
+    goals = {}
+    for actuator_id in ids:
+        goal = driver.read_register(actuator_id, ADDR_GOAL_POSITION)
+        if goal is None:
+            return None
+        goals[actuator_id] = goal
+
+    line_time = STATE_READ_CHARS * BITS_PER_CHAR / driver.baudrate
+    cycle = np.empty(cycles)
+    reads = np.empty((cycles, len(ids)))
+    errors = 0
+    for k in range(cycles):
+        start = time.perf_counter()
+        for j, actuator_id in enumerate(ids):
+            read_start = time.perf_counter()
+            if driver.read_state(actuator_id) is None:
+                errors += 1
+            reads[k, j] = time.perf_counter() - read_start
+        errors += sum(not ok for ok in driver.set_positions(goals).values())
+        cycle[k] = time.perf_counter() - start
+
+    cycle_ms = float(np.median(cycle)) * 1000.0
+    turnaround = np.median(reads, axis=0) - line_time
+    return {
+        'baudrate': driver.baudrate,
+        'cycle_ms': round(cycle_ms, 3),
+        'cycles_per_second': round(1000.0 / cycle_ms, 1),
+        'errors': errors,
+        'turnaround_ms': {i: round(float(t) * 1000.0, 3) for i, t in zip(ids, turnaround)},
+        'timeout_ms': {i: round(driver.stats[i].timeout(driver.response_timeout) * 1000.0, 2) for i in ids},
+    }
+
+
+def _unreachable(driver, ids) -> list:
+    return [i for i in ids if driver.probe(i, probe_timeout(driver.baudrate))[0] != OUTCOME_OK]
+
+
+def _wait_for(driver, ids, timeout=VERIFY_TIMEOUT) -> list:
+    """Waits for restarted actuators to answer at the driver's rate; returns the ones that never did."""
+    time.sleep(RESTART_WAIT)
+    pending = list(ids)
+    deadline = time.monotonic() + timeout
+    while pending and time.monotonic() < deadline:
+        pending = _unreachable(driver, pending)
+    return pending
+
+
+def _persist(baudrate, ids):
+    ActuatorConfig.objects.filter(modbus_id__in=ids).update(baudrate=baudrate)
+    settings = ControlSettings.objects.first()
+    if settings is None:
+        ControlSettings.objects.create(bus_baudrate=baudrate)
+    else:
+        settings.bus_baudrate = baudrate
+        settings.save()  # Notifies the config cache of every process
+
+
+def migrate_baudrate(driver, ids, baudrate, cycles=CAPACITY_CYCLES, persist=True,
+                     verify_timeout=VERIFY_TIMEOUT) -> dict:
+    """
+    Moves the actuators and the driver together to `baudrate`.
+
+    Every actuator must answer at the current rate. The new Baud Rate
+    register value is written to all of them first: a refused write
+    restores the ones already written, none of which has restarted yet.
+    Then they are restarted (0xF8), the driver follows and each actuator
+    must answer at the new rate within `verify_timeout`. If one does not,
+    the others are moved back the same way and the driver returns to the
+    original rate. On success the rate is stored in ControlSettings, which
+    the control loop follows. Bus capacity is measured before and after.
+
+    Returns:
+        Dict with status (MIGRATED, UNCHANGED, ROLLED_BACK or FAILED),
+        from/to rates, before/after capacity, error and 'lost' (actuators
+        answering at neither rate after a rollback)
+    """
+    if baudrate not in BAUD_CODES:
+        raise ValueError(f"Unsupported baud rate {baudrate}")
+    original = driver.baudrate
+    report = {'status': FAILED, 'from': original, 'to': baudrate,
+              'before': None, 'after': None, 'error': None, 'lost': []}
+
+    missing = _unreachable(driver, ids)
+    if missing:
+        report['error'] = f"Not answering at {original} baud: {missing}"
+        return report
+    report['before'] = measure_capacity(driver, ids, cycles)
+    if baudrate == original:
+        report['status'] = UNCHANGED
+        return report
+
+    written = []
+    for actuator_id in ids:
+        if not driver.write_register(actuator_id, ADDR_BAUD_RATE, BAUD_CODES[baudrate]):
+            for restored in written:
+                driver.write_register(restored, ADDR_BAUD_RATE, BAUD_CODES[original])
+            report['error'] = f"Actuator {actuator_id} refused the baud rate write"
+            return report
+        written.append(actuator_id)
+
+    for actuator_id in ids:
+        driver.restart(actuator_id)
+    driver.set_baudrate(baudrate)
+    missing = _wait_for(driver, ids, verify_timeout)
+    if not missing:
+        report['after'] = measure_capacity(driver, ids, cycles)
+        report['status'] = MIGRATED
+        if persist:
+            _persist(baudrate, ids)
+        logger.info(f"Actuator bus moved from {original} to {baudrate} baud")
+        return report
+
+    # Rollback: the actuators that moved go back; the others may still be at
+    # the original rate (restart missed) with the new value in their register
+    report['status'] = ROLLED_BACK
+    report['error'] = f"Not answering at {baudrate} baud: {missing}"
+    for actuator_id in ids:
+        if actuator_id not in missing:
+            driver.write_register(actuator_id, ADDR_BAUD_RATE, BAUD_CODES[original])
+            driver.restart(actuator_id)
+    driver.set_baudrate(original)
+    report['lost'] = _wait_for(driver, ids, verify_timeout)
+    for actuator_id in missing:
+        if actuator_id not in report['lost']:
+            driver.write_register(actuator_id, ADDR_BAUD_RATE, BAUD_CODES[original])
+    logger.warning(f"Baud rate change to {baudrate} rolled back: {report['error']}, lost {report['lost']}")
+    return report
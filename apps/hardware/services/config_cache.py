@@ -0,0 +1,105 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings as django_settings
+
+from apps.hardware.models import ControlSettings, ActuatorConfig, ProfileConfig
+
+logger = logging.getLogger(__name__)
+
+# Immutable view of the configuration used by one control cycle
+ConfigSnapshot = namedtuple('ConfigSnapshot', ['version', 'settings', 'profile_config', 'actuators'])
+
+
+def version_file_path():
+    return getattr(django_settings, 'HARDWARE_CONFIG_VERSION_FILE', None)
+
+
+def _file_stamp(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def touch_version_file(path=None):
+    """Marks the configuration as changed for every process watching the version file."""
+    path = path or version_file_path()
+    if not path:
+        return
+    now = time.time_ns()
+    try:
+        with open(path, 'a'):
+            pass
+        os.utime(path, ns=(now, now))
+    except OSError as e:
+        logger.warning(f"Could not update config version file {path}: {e}")
+
+
+class ConfigCache:
+    """
+    In-memory snapshot of ControlSettings, ProfileConfig and ActuatorConfig.
+
+    get() is meant to be called every control tick: it returns the current
+    snapshot without touching the database unless the configuration changed.
+    Changes are detected through a local version counter (bumped by the
+    post_save/post_delete handlers in this process) and the mtime of a
+    version file, touched by the same handlers in any other process (e.g. the
+    admin running in the web server). Checking it costs one stat() call.
+    Readers never lock: a refresh builds a new snapshot and swaps the reference.
+    """
+
+    def __init__(self, version_path=None):
+        self.version_path = version_path or version_file_path()
+        self._snapshot = None
+        self._version = 0
+        self._loaded_version = -1
+        self._loaded_stamp = None
+        self._refresh_lock = threading.Lock()
+
+    def invalidate(self):
+        self._version += 1
+
+    def get(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if (snapshot is None or self._loaded_version != self._version
+                or self._loaded_stamp != _file_stamp(self.version_path)):
+            snapshot = self.refresh()
+        return snapshot
+
+    def refresh(self) -> ConfigSnapshot:
+        with self._refresh_lock:
+            version = self._version
+            stamp = _file_stamp(self.version_path)
+            snapshot = ConfigSnapshot(
+                version=version,
+                settings=ControlSettings.objects.first(),
+                profile_config=ProfileConfig.objects.first(),
+                actuators=tuple(ActuatorConfig.objects.order_by('modbus_id')),
+            )
+            self._snapshot = snapshot
+            self._loaded_version = version
+            self._loaded_stamp = stamp
+        logger.debug(f"Configuration snapshot reloaded (version {version})")
+        return snapshot
+
+
+_cache_instance = None
+
+
+def get_config_cache() -> ConfigCache:
+    """Returns the process-wide configuration cache."""
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = ConfigCache()
+    return _cache_instance
+
+
+def config_changed(sender, **kwargs):
+    """post_save/post_delete handler for the configuration models."""
+    if _cache_instance is not None:
+        _cache_instance.invalidate()
+    touch_version_file()
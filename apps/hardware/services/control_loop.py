@@ -1,65 +1,362 @@
 import time
 import logging
-from apps.hardware.models import ControlSettings, ActuatorConfig, ProfileConfig
-from .mighty_zap import get_driver
-from .profilometer import ProfilometerDriver
+
+import numpy as np
+from django.conf import settings as django_settings
+
+from .bus import BusWorker, get_bus, PRIORITY_CONTROL
+from .profilometer import ProfilometerDriver, BackgroundProfileReader
+from .profile_analysis import ProfileAnalyzer
+from .config_cache import get_config_cache
+from .pid import PIDBank
+from .scheduler import FixedRateScheduler
+from .telemetry import TelemetryRecorder, NO_VALUE
+from .live_state import LiveStateWriter
+from .metrics import MetricsRecorder
+from .mailbox import MailboxServer
+from .write_filter import WriteFilter
 
 logger = logging.getLogger(__name__)
 
+TIMING_LOG_INTERVAL = 10.0  # Seconds between loop timing summaries
+
 class ControlLoop:
-    def __init__(self):
-        self.actuator_driver = get_driver()  # Usa instância singleton
-        self.profilometer_driver = ProfilometerDriver()
+    def __init__(self, pipelined=False, driver=None, profilometer_driver=None):
+        """
+        Args:
+            pipelined: Acquire the next profile while the actuator commands are on the bus
+            driver: Actuator driver to own (default: the global driver)
+            profilometer_driver: Connected profilometer driver (default: one on the default port)
+        """
+        # All actuator traffic goes through the bus owner thread
+        if driver is None:
+            self.bus = get_bus()
+        else:
+            self.bus = BusWorker(driver)
+            self.bus.start()
+        self.config_cache = get_config_cache()  # Per-tick config without ORM queries
+        if profilometer_driver is None:
+            profilometer_driver = ProfilometerDriver()
+            profilometer_driver.connect()
+        self.profilometer_driver = profilometer_driver
+        # Pipelined mode: the profilometer sample for the next cycle is acquired
+        # on its own thread while this cycle's actuator traffic is on the bus
+        self.profile_reader = BackgroundProfileReader(self.profilometer_driver) if pipelined else None
+        # This process owns the serial ports; the web workers post their commands in the mailbox
+        self.mailbox_server = MailboxServer(self.bus)
         self.running = False
+        self._analyzer = None
+        self._analyzer_key = None
+        self.pid = None
+        self._pid_key = None
+        self._last_update = None
+        self._states = None
+        self.scheduler = FixedRateScheduler(0.1)
+        self._timing_logged_at = None
+        self.telemetry = None
+        self.write_filter = None
+        self.live_state = None
+        self._live_state_failed = False
+        self.metrics = None
+        self._metrics_failed = False
+
+    def get_analyzer(self, profile_config, n_zones):
+        """Returns the profile analyzer, rebuilt only when the zones or the target change."""
+        target = profile_config.target_profile or profile_config.target_value
+        key = (n_zones, repr(target))
+        if key != self._analyzer_key:
+            self._analyzer = ProfileAnalyzer(n_zones, target)
+            self._analyzer_key = key
+        return self._analyzer
+
+    def get_pid(self, actuators):
+        """Returns the PID bank, rebuilt (and so re-initialised) when the actuator set changes."""
+        key = tuple(a.modbus_id for a in actuators)
+        if key != self._pid_key:
+            self.pid = PIDBank(len(actuators))
+            self._pid_key = key
+            self._last_update = None
+        return self.pid
+
+    def get_write_filter(self, actuators):
+        """Returns the write filter, rebuilt when the actuator set changes (counters kept across pauses)."""
+        ids = [a.modbus_id for a in actuators]
+        if self.write_filter is None or self.write_filter.actuator_ids != ids:
+            self.write_filter = WriteFilter(ids)
+        return self.write_filter
+
+    def reset_pid(self):
+        """Drops the controller state; the next active cycle starts bumpless from the current positions."""
+        self.pid = None
+        self._pid_key = None
+        self._last_update = None
+
+    def compute_goals(self, settings, actuators, zone_targets, errors, states):
+        """
+        Runs one PID step for every zone with a valid measurement and actuator state.
+
+        Controllers seen for the first time (startup, re-activation, new
+        actuator set) are initialised bumpless: they hold the current position
+        (clamped to the actuator's min/max) this cycle and start correcting
+        from the next one.
+
+        Returns:
+            dict {modbus_id: goal position} for the zones that were updated
+        """
+        pid = self.get_pid(actuators)
+        positions = np.array([np.nan if state is None else state.position for state in states], dtype=np.float64)
+        measurements = zone_targets - errors
+        valid = ~np.isnan(positions) & ~np.isnan(errors)
+
+        for actuator, state, error in zip(actuators, states, errors):
+            if state is None:
+                logger.warning(f"Skipping actuator {actuator.modbus_id}: state read failed")
+            elif np.isnan(error):
+                logger.warning(f"Skipping actuator {actuator.modbus_id}: no valid profile points in its zone")
+
+        now = time.monotonic()
+        dt = settings.loop_interval_ms / 1000.0 if self._last_update is None else max(now - self._last_update, 1e-3)
+        self._last_update = now
+
+        out_min = np.array([a.min_position for a in actuators], dtype=np.float64)
+        out_max = np.array([a.max_position for a in actuators], dtype=np.float64)
+
+        # A rod outside its configured range is brought back into it on the first goal
+        starting = valid & ~pid.initialized
+        if starting.any():
+            pid.reset(np.clip(positions, out_min, out_max), zone_targets, measurements, settings.kp, mask=starting)
+
+        outputs = pid.update(zone_targets, measurements, dt, settings.kp, settings.ki, settings.kd,
+                             out_min, out_max, mask=valid & ~starting)
+
+        return {
+            actuator.modbus_id: int(round(outputs[i]))
+            for i, actuator in enumerate(actuators) if valid[i]
+        }
 
     def start(self):
-        logger.info("Starting Control Loop...")
+        logger.info(f"Starting Control Loop{' (pipelined)' if self.profile_reader else ''}...")
         self.running = True
-        self.loop()
+        self.mailbox_server.start()
+        try:
+            self.loop()
+        finally:
+            self.mailbox_server.stop()
+            if self.profile_reader:
+                self.profile_reader.close()
+            if self.telemetry:
+                self.telemetry.close()
+            if self.metrics:
+                self.bus.driver.metrics = None
+                self.scheduler.metrics = None
+                self.metrics.close()
+                self.metrics = None
+
+    def read_profile(self, profile_config):
+        if self.profile_reader:
+            return self.profile_reader.read(profile_config)
+        return self.profilometer_driver.read_profile(profile_config)
+
+    def pause(self):
+        """Resets the per-run state so the next active cycle starts fresh."""
+        self.reset_pid()
+        self.scheduler.reset()
+        if self.profile_reader:
+            self.profile_reader.reset()
 
     def loop(self):
+        scheduler = self.scheduler
+        metrics = self.get_metrics()
         while self.running:
             try:
-                settings = ControlSettings.objects.first()
+                started = scheduler.clock()
+                config = self.config_cache.get()
+                if metrics:
+                    metrics.phase('config', scheduler.clock() - started)
+                settings = config.settings
+                self.apply_bus_baudrate(settings)
                 if not settings or not settings.is_active:
                     logger.info("Control inactive. Waiting...")
+                    self.pause()
+                    self.publish_status(active=False)
                     time.sleep(1)
                     continue
 
-                # Read Profilometer
-                current_value = self.profilometer_driver.read_value()
-                
                 # Get Target
-                profile_config = ProfileConfig.objects.first()
+                profile_config = config.profile_config
                 if not profile_config:
                     logger.warning("No Profile Configuration found.")
+                    self.pause()
                     time.sleep(1)
                     continue
-                
-                target = profile_config.target_value
-                error = target - current_value
-                
-                logger.info(f"Target: {target}, Current: {current_value:.2f}, Error: {error:.2f}")
-
-                # Simple Logic: If error is positive, move actuators one way, else other way
-                # This is a placeholder for real PID
-                actuators = ActuatorConfig.objects.all()
-                for actuator in actuators:
-                    # Logic: New Position = Current Position + (Error * KP)
-                    # For simulation, we just calculate a dummy new position
-                    current_pos = self.actuator_driver.get_position(actuator.modbus_id)
-                    
-                    # Disclaimer: This logic assumes direct correlation which might be inverse
-                    correction = int(error * settings.kp * 10) 
-                    new_pos = max(actuator.min_position, min(actuator.max_position, current_pos + correction))
-                    
-                    self.actuator_driver.set_position(actuator.modbus_id, new_pos)
-
-                time.sleep(settings.loop_interval_ms / 1000.0)
+
+                # Fixed rate: wait for this cycle's deadline rather than sleeping a full
+                # interval after the work, so I/O time does not stretch the period
+                scheduler.set_period(settings.loop_interval_ms / 1000.0)
+                scheduler.wait()
+                self.log_timing()
+
+                # Read Profilometer (honours ProfileConfig.is_simulated)
+                profile = self.read_profile(profile_config)
+                scheduler.lap('profile')
+                if profile is None:
+                    logger.warning("No valid profilometer measurement")
+                    continue
+
+                # One zone per actuator, ordered across the nozzle by Modbus ID
+                actuators = config.actuators
+                if not actuators:
+                    continue
+
+                # Per-zone deviation (target - measured) drives each actuator individually
+                analyzer = self.get_analyzer(profile_config, len(actuators))
+                errors = analyzer.zone_errors(profile)
+                scheduler.lap('analysis')
+
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug(f"Target: {profile_config.target_value}, Zone errors: {np.round(errors, 2).tolist()}")
+
+                # Read phase runs as one bus job so UI traffic cannot interleave with it.
+                # On overrun it is the phase dropped: the PID only needs the positions
+                # to (re)initialise, so the previous states are good enough for a cycle.
+                # They are not recorded though: telemetry and the live state get
+                # NO_VALUE for the positions and currents of a cycle without a read
+                if (self._states is not None and len(self._states) == len(actuators)
+                        and scheduler.time_left() < scheduler.estimate('read') + scheduler.estimate('write')):
+                    scheduler.skip('read')
+                    read_states = [None] * len(actuators)
+                else:
+                    # Only a state read during this cycle (e.g. by a UI job) may stand in
+                    # for the bus read: telemetry and the live state record it as current
+                    cycle_start = scheduler.cycle_start
+                    self._states = self.bus.call(
+                        lambda driver: [driver.read_state(actuator.modbus_id, max_age=time.monotonic() - cycle_start)
+                                        for actuator in actuators],
+                        priority=PRIORITY_CONTROL,
+                    )
+                    read_states = self._states
+                    scheduler.lap('read')
+
+                goals = self.compute_goals(settings, actuators, analyzer.zone_targets, errors, self._states)
+                scheduler.lap('compute')
+
+                # Write phase: goals that would not move anything (deadband, zone in
+                # tolerance) are skipped, with a periodic forced refresh. What is left
+                # goes out together; broadcast is only allowed when every configured
+                # actuator gets a goal this cycle
+                write_filter = self.get_write_filter(actuators)
+                to_send = write_filter.filter(goals, errors, settings.deadband, profile_config.tolerance,
+                                              settings.refresh_interval_ms / 1000.0, scheduler.cycle_start)
+                if metrics:
+                    metrics.count('writes_sent', len(to_send))
+                    metrics.count('writes_suppressed', len(goals) - len(to_send))
+                if to_send:
+                    results = self.bus.call('set_positions', to_send, broadcast=len(to_send) == len(actuators),
+                                            priority=PRIORITY_CONTROL)
+                    write_filter.record(to_send, results, scheduler.lap('write'), scheduler.cycle_start)
+                else:
+                    scheduler.lap('write')
+
+                self.record_cycle(profile_config, actuators, profile, errors, goals, read_states)
+                self.publish_status(active=True)
 
             except KeyboardInterrupt:
                 logger.info("Stopping Control Loop...")
                 self.running = False
             except Exception as e:
                 logger.error(f"Error in control loop: {e}")
+                if metrics:
+                    metrics.count('loop_errors')
+                self.pause()
                 time.sleep(1)
+
+    def apply_bus_baudrate(self, settings):
+        """Keeps the driver at ControlSettings.bus_baudrate (changed by configure_bus with the actuators)."""
+        baudrate = getattr(settings, 'bus_baudrate', None)
+        if baudrate and baudrate != self.bus.driver.baudrate:
+            logger.info(f"Actuator bus baud rate: {self.bus.driver.baudrate} -> {baudrate}")
+            self.bus.call('set_baudrate', baudrate, priority=PRIORITY_CONTROL)
+
+    def get_telemetry(self, actuators):
+        """Returns the telemetry recorder, restarted (new file) when the actuator set changes."""
+        ids = [a.modbus_id for a in actuators]
+        if self.telemetry is None or self.telemetry.actuator_ids != ids:
+            if self.telemetry:
+                self.telemetry.close()
+            self.telemetry = TelemetryRecorder(django_settings.HARDWARE_TELEMETRY_DIR, ids)
+        return self.telemetry
+
+    def get_live_state(self):
+        """Returns the live state publisher, or None when the file cannot be created."""
+        if self.live_state is None and not self._live_state_failed:
+            try:
+                self.live_state = LiveStateWriter()
+            except OSError as e:
+                logger.warning(f"Live state disabled: {e}")
+                self._live_state_failed = True
+        return self.live_state
+
+    def get_metrics(self):
+        """
+        Returns the metrics recorder, or None when the file cannot be created.
+
+        The recorder is shared with the scheduler (phases, overruns) and the
+        actuator driver (bus transactions).
+        """
+        if self.metrics is None and not self._metrics_failed:
+            try:
+                self.metrics = MetricsRecorder()
+            except OSError as e:
+                logger.warning(f"Metrics disabled: {e}")
+                self._metrics_failed = True
+                return None
+            self.scheduler.metrics = self.metrics
+            self.bus.driver.metrics = self.metrics
+        return self.metrics
+
+    def record_cycle(self, profile_config, actuators, profile, errors, goals, states):
+        """
+        Stores the cycle in the telemetry ring and publishes it as the live state.
+
+        `states` holds the actuator states read this cycle; None entries (failed
+        or skipped reads) are recorded as NO_VALUE.
+        """
+        finite = np.isfinite(profile)
+        measured = float(profile[finite].mean()) if finite.any() else np.nan
+        timestamp = time.time()
+        cycle_time = self.scheduler.clock() - self.scheduler.cycle_start
+        if self.metrics:
+            self.metrics.phase('cycle', cycle_time)
+        commanded = [goals.get(a.modbus_id, NO_VALUE) for a in actuators]
+        positions = [NO_VALUE if state is None else state.position for state in states]
+        currents = [NO_VALUE if state is None else state.current for state in states]
+
+        self.get_telemetry(actuators).record(
+            timestamp, cycle_time, profile_config.target_value, measured, commanded, positions, currents,
+        )
+        live_state = self.get_live_state()
+        if live_state:
+            live_state.publish(
+                timestamp, cycle_time, profile_config.target_value, measured, profile,
+                [a.modbus_id for a in actuators], errors, commanded, positions, currents,
+            )
+
+    def publish_status(self, active):
+        live_state = self.get_live_state()
+        if live_state:
+            scheduler = self.scheduler
+            live_state.publish_status(time.time(), active, scheduler.overruns,
+                                      scheduler.skipped_cycles, scheduler.jitter_max)
+
+    def log_timing(self):
+        """Logs the scheduler statistics every TIMING_LOG_INTERVAL seconds."""
+        now = self.scheduler.cycle_start
+        if self._timing_logged_at is None:
+            self._timing_logged_at = now
+        elif now - self._timing_logged_at >= TIMING_LOG_INTERVAL:
+            self._timing_logged_at = now
+            writes = self.write_filter.summary() if self.write_filter else {}
+            logger.info(f"Loop timing: {self.scheduler.summary()}, writes: {writes}")
+            link = self.bus.call('link_stats', priority=PRIORITY_CONTROL)
+            if link:
+                logger.info(f"Link stats: {link}")
@@ -0,0 +1,165 @@
+import logging
+import time
+from collections import namedtuple
+
+from apps.hardware.modbus import BAUD_RATE_CODES, BITS_PER_CHAR, expected_response_length
+from apps.hardware.models import ActuatorConfig
+from .link_stats import OUTCOME_CRC_ERROR, OUTCOME_OK
+
+logger = logging.getLogger(__name__)
+
+ALL_IDS = range(1, 248)
+CHUNK_IDS = 16          # Probes per bus job of a Discovery; the bus is free between chunks
+
+# Reply delay the MightyZAP manual recommends for reads (a safe value, not a minimum)
+READ_DELAY = 0.010
+# Characters on the line for one probe: request, then the Model Number + Firmware Version reply
+PROBE_CHARS = 8 + expected_response_length(0x03, 2)
+
+DiscoveredDevice = namedtuple('DiscoveredDevice', ['modbus_id', 'baudrate', 'model_number', 'firmware_version'])
+
+
+def probe_timeout(baudrate) -> float:
+    """
+    Time to the first reply byte allowed per probe at `baudrate` (s).
+
+    Line time of request and reply plus the manual's read delay, so a slow
+    actuator is not left out of the inventory at the low rates. An absent ID
+    costs this much: a full sweep of one rate takes about 247 times that.
+    """
+    return PROBE_CHARS * BITS_PER_CHAR / baudrate + READ_DELAY
+
+
+def baudrate_order(current) -> list:
+    """Supported baud rates, the driver's current one first (where the devices usually are)."""
+    return [current] + [b for b in sorted(BAUD_RATE_CODES.values(), reverse=True) if b != current]
+
+
+def scan(driver, ids=ALL_IDS, baudrates=None, timeout=None, expected=None) -> dict:
+    """
+    Sweeps the actuator bus for MightyZAP devices.
+
+    Every ID is probed once at every baud rate, reading its model number
+    and firmware version. The line is half duplex and the UART listens at a
+    single rate, so the rates are swept one after the other; the driver is
+    back at its own rate afterwards.
+
+    Args:
+        driver: Connected MightyZapDriver (on the bus thread when the bus is shared)
+        ids: IDs to probe (default 1-247)
+        baudrates: Rates to try (default: all supported, current first)
+        timeout: Response timeout of each probe (s; default probe_timeout() of each rate)
+        expected: Stop as soon as this many devices were found
+
+    Returns:
+        Dict with 'devices' (DiscoveredDevice list), 'conflicts' ((id,
+        baudrate) pairs with a corrupted reply or already found at another
+        rate, usually two devices sharing an ID), 'probes' and 'duration' (s)
+    """
+    original = driver.baudrate
+    baudrates = baudrates or baudrate_order(original)
+    devices, conflicts, seen = [], [], set()
+    probes = 0
+    started = time.monotonic()
+    try:
+        for baudrate in baudrates:
+            if driver.baudrate != baudrate:
+                driver.set_baudrate(baudrate)
+            rate_timeout = probe_timeout(baudrate) if timeout is None else timeout
+            for slave_id in ids:
+                probes += 1
+                outcome, identity = driver.probe(slave_id, rate_timeout)
+                if outcome == OUTCOME_OK and identity is not None:
+                    if slave_id in seen:
+                        conflicts.append((slave_id, baudrate))
+                    seen.add(slave_id)
+                    devices.append(DiscoveredDevice(slave_id, baudrate, *identity))
+                elif outcome == OUTCOME_CRC_ERROR:
+                    conflicts.append((slave_id, baudrate))
+                if expected and len(devices) >= expected:
+                    return _result(devices, conflicts, probes, started)
+            logger.debug(f"Discovery at {baudrate} baud: {sum(d.baudrate == baudrate for d in devices)} device(s)")
+    finally:
+        if driver.baudrate != original:
+            driver.set_baudrate(original)
+    return _result(devices, conflicts, probes, started)
+
+
+def _result(devices, conflicts, probes, started):
+    return {'devices': devices, 'conflicts': conflicts, 'probes': probes, 'duration': time.monotonic() - started}
+
+
+def sync_actuators(devices) -> dict:
+    """
+    Records discovered devices in ActuatorConfig.
+
+    New IDs get a configuration with the default limits; known ones keep
+    their calibration and only get the inventory fields updated. An ID
+    found at several rates is recorded once, at the first rate scanned.
+    Configured actuators that were not found are reported, never deleted.
+
+    Returns:
+        Dict of ID lists: 'created', 'updated', 'missing'
+    """
+    created, updated = [], []
+    for device in devices:
+        if device.modbus_id in created or device.modbus_id in updated:
+            continue
+        actuator, is_new = ActuatorConfig.objects.get_or_create(
+            modbus_id=device.modbus_id, defaults={'name': f'Actuator {device.modbus_id}'})
+        actuator.model_number = device.model_number
+        actuator.firmware_version = device.firmware_version
+        actuator.baudrate = device.baudrate
+        actuator.save()
+        (created if is_new else updated).append(device.modbus_id)
+
+    found = {device.modbus_id for device in devices}
+    missing = list(ActuatorConfig.objects.exclude(modbus_id__in=found).order_by('modbus_id')
+                   .values_list('modbus_id', flat=True))
+    return {'created': created, 'updated': updated, 'missing': missing}
+
+
+class Discovery:
+    """
+    Full sweep and sync for the web API, run by the control process.
+
+    The sweep is split in bus jobs of CHUNK_IDS probes at one rate, each
+    ending back at the driver's own rate (see MailboxServer). Between
+    chunks the bus serves the control loop (heartbeat, baud rate changes)
+    and UI commands: they wait for one chunk instead of the whole sweep.
+    """
+
+    def __init__(self, baudrate, ids=ALL_IDS, baudrates=None):
+        """
+        Args:
+            baudrate: Current rate of the driver, swept first
+            ids: IDs to probe (default 1-247)
+            baudrates: Rates to try (default: all supported)
+        """
+        self.chunks = [(ids[first:first + CHUNK_IDS], rate)
+                       for rate in baudrates or baudrate_order(baudrate)
+                       for first in range(0, len(ids), CHUNK_IDS)]
+        self.devices, self.conflicts, self.seen = [], [], set()
+        self.probes = 0
+        self.started = time.monotonic()
+
+    def next_chunk(self):
+        """(ids, baudrate) of the next scan() job, or None when the sweep is complete."""
+        return self.chunks.pop(0) if self.chunks else None
+
+    def add(self, result):
+        """Merges the scan() result of a chunk."""
+        self.probes += result['probes']
+        self.conflicts += result['conflicts']
+        for device in result['devices']:
+            if device.modbus_id in self.seen:
+                self.conflicts.append((device.modbus_id, device.baudrate))
+            self.seen.add(device.modbus_id)
+            self.devices.append(device)
+
+    def finish(self) -> list:
+        """Syncs the devices found into ActuatorConfig; returns their IDs, in scan order."""
+        sync = sync_actuators(self.devices)
+        logger.info(f"Discovery: {len(self.devices)} device(s), {self.probes} probes "
+                    f"in {time.monotonic() - self.started:.1f} s, conflicts {self.conflicts}, sync {sync}")
+        return list(dict.fromkeys(device.modbus_id for device in self.devices))
@@ -0,0 +1,129 @@
+import numpy as np
+
+# Janela das estatísticas móveis (transações por escravo)
+WINDOW = 128
+MIN_SAMPLES = 8             # Abaixo disso usa o timeout configurado no driver
+PERCENTILE_REFRESH = 16     # Recalcula o p99 a cada N latências novas
+
+TIMEOUT_MARGIN = 3.0        # Timeout adaptativo = p99 da latência x margem
+MIN_TIMEOUT = 0.01          # s
+SUSPECT_AFTER = 3           # Falhas seguidas até tratar o escravo como fora do ar
+RECOVERY_PROBE_EVERY = 10   # Uma a cada N transações de um escravo suspeito usa o timeout cheio
+
+RETRY_BUDGET = 3            # Retentativas acumuláveis por escravo
+SUCCESSES_PER_RETRY = 10    # Transações bem-sucedidas que devolvem uma retentativa
+MAX_RETRIES = 1             # Retentativas por transação
+
+# Resultado de uma transação
+OUTCOME_OK = 0
+OUTCOME_TIMEOUT = 1
+OUTCOME_CRC_ERROR = 2
+OUTCOME_EXCEPTION = 3       # Exceção MODBUS: o escravo respondeu, não é falha do link
+OUTCOME_INVALID = 4         # Frame de outro ID ou tamanho inesperado
+
+
+class SlaveStats:
+    """
+    Estatísticas de transação de um escravo MODBUS e a política derivada.
+
+    Guarda, em buffers circulares pré-alocados, a latência das últimas
+    respostas válidas e o resultado das últimas transações. A partir deles:
+
+    - timeout(): p99 da latência x TIMEOUT_MARGIN, limitado entre
+      MIN_TIMEOUT e o timeout configurado; um escravo com SUSPECT_AFTER
+      falhas seguidas recebe só MIN_TIMEOUT, então um atuador morto custa
+      milissegundos por ciclo em vez do timeout cheio. MIN_TIMEOUT é o
+      próprio atraso de leitura do manual, curto demais para um atuador
+      lento mas vivo: a cada RECOVERY_PROBE_EVERY transações uma usa o
+      timeout configurado, e a primeira resposta tira o escravo do estado
+      suspeito;
+    - take_retry(): orçamento de retentativas (token bucket), gasto a cada
+      retentativa e reposto aos poucos pelas transações bem-sucedidas, para
+      que um escravo com falhas não multiplique o tráfego.
+    """
+
+    def __init__(self):
+        self.latencies = np.zeros(WINDOW)
+        self.outcomes = np.zeros(WINDOW, dtype=np.uint8)
+        self.transactions = 0
+        self.samples = 0
+        self.timeouts = 0
+        self.crc_errors = 0
+        self.retries = 0
+        self.consecutive_failures = 0
+        self.retry_credit = RETRY_BUDGET * SUCCESSES_PER_RETRY
+        self._p99 = None
+        self._samples_at_p99 = 0
+
+    def record(self, outcome: int, latency: float):
+        """Registra uma transação (latência em s, usada só quando OK)."""
+        self.outcomes[self.transactions % WINDOW] = outcome
+        self.transactions += 1
+        if outcome == OUTCOME_OK or outcome == OUTCOME_EXCEPTION:
+            self.consecutive_failures = 0
+            if outcome == OUTCOME_OK:
+                self.latencies[self.samples % WINDOW] = latency
+                self.samples += 1
+                self.retry_credit = min(RETRY_BUDGET * SUCCESSES_PER_RETRY, self.retry_credit + 1)
+            return
+        self.consecutive_failures += 1
+        if outcome == OUTCOME_TIMEOUT:
+            self.timeouts += 1
+        elif outcome == OUTCOME_CRC_ERROR:
+            self.crc_errors += 1
+
+    def percentile(self, q: float):
+        """Percentil da latência (s) na janela, ou None sem amostras."""
+        n = min(self.samples, WINDOW)
+        if not n:
+            return None
+        return float(np.percentile(self.latencies[:n], q))
+
+    def p99(self):
+        if self._p99 is None or self.samples - self._samples_at_p99 >= PERCENTILE_REFRESH:
+            self._p99 = self.percentile(99)
+            self._samples_at_p99 = self.samples
+        return self._p99
+
+    @property
+    def suspect(self) -> bool:
+        return self.consecutive_failures >= SUSPECT_AFTER
+
+    def timeout(self, default: float) -> float:
+        """Timeout de resposta a usar na próxima transação (s)."""
+        if self.suspect:
+            failures = self.consecutive_failures - SUSPECT_AFTER
+            if failures % RECOVERY_PROBE_EVERY == RECOVERY_PROBE_EVERY - 1:
+                return default
+            return MIN_TIMEOUT
+        if self.samples < MIN_SAMPLES:
+            return default
+        return min(default, max(MIN_TIMEOUT, self.p99() * TIMEOUT_MARGIN))
+
+    def take_retry(self) -> bool:
+        """Consome uma retentativa do orçamento, se houver."""
+        if self.suspect or self.retry_credit < SUCCESSES_PER_RETRY:
+            return False
+        self.retry_credit -= SUCCESSES_PER_RETRY
+        self.retries += 1
+        return True
+
+    def rate(self, outcome: int) -> float:
+        """Fração das transações da janela com esse resultado."""
+        n = min(self.transactions, WINDOW)
+        return float(np.count_nonzero(self.outcomes[:n] == outcome)) / n if n else 0.0
+
+    def summary(self, default_timeout: float) -> dict:
+        p50, p99 = self.percentile(50), self.percentile(99)
+        return {
+            'transactions': self.transactions,
+            'timeouts': self.timeouts,
+            'crc_errors': self.crc_errors,
+            'retries': self.retries,
+            'timeout_rate': round(self.rate(OUTCOME_TIMEOUT), 4),
+            'crc_error_rate': round(self.rate(OUTCOME_CRC_ERROR), 4),
+            'p50_ms': None if p50 is None else round(p50 * 1000.0, 2),
+            'p99_ms': None if p99 is None else round(p99 * 1000.0, 2),
+            'timeout_ms': round(self.timeout(default_timeout) * 1000.0, 2),
+            'suspect': self.suspect,
+        }
@@ -0,0 +1,134 @@
+import logging
+import os
+
+import numpy as np
+from django.conf import settings as django_settings
+
+from .profilometer import MEASURED_VALUE_COUNT
+
+logger = logging.getLogger(__name__)
+
+MAX_ACTUATORS = 16
+READ_RETRIES = 100
+
+# Fixed-size layout of the live state, shared through a memory-mapped file.
+# `seq` is a sequence lock: odd while the writer is updating the record.
+LIVE_STATE_DTYPE = np.dtype([
+    ('seq', '<u4'),
+    ('n_actuators', '<u4'),
+    ('cycle', '<u8'),
+    ('timestamp', '<f8'),                           # Unix time of the last update (s)
+    ('active', 'u1'),                               # ControlSettings.is_active as seen by the loop
+    ('overruns', '<u4'),
+    ('skipped_cycles', '<u4'),
+    ('jitter_max', '<f4'),                          # s
+    ('cycle_time', '<f4'),                          # s
+    ('target', '<f4'),
+    ('measured', '<f4'),
+    ('profile', '<f4', (MEASURED_VALUE_COUNT,)),
+    ('actuator_ids', '<i2', (MAX_ACTUATORS,)),
+    ('error', '<f4', (MAX_ACTUATORS,)),             # Zone error (target - measured)
+    ('commanded', '<i2', (MAX_ACTUATORS,)),
+    ('position', '<i2', (MAX_ACTUATORS,)),
+    ('current', '<i2', (MAX_ACTUATORS,)),
+])
+
+
+def live_state_path():
+    return getattr(django_settings, 'HARDWARE_LIVE_STATE_FILE', None)
+
+
+def _map(path, mode):
+    return np.memmap(path, dtype=LIVE_STATE_DTYPE, mode=mode, shape=(1,))
+
+
+class LiveStateWriter:
+    """
+    Publishes the latest control cycle and the loop status into a
+    memory-mapped file.
+
+    Written by the control process once per cycle; any number of readers in
+    other processes (the web workers) map the same file and copy the record
+    without system calls or locks. The file keeps its inode across restarts
+    of the control process, so existing readers stay valid.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or live_state_path())
+        with open(self.path, 'a+b') as f:
+            f.truncate(LIVE_STATE_DTYPE.itemsize)
+        self._map = _map(self.path, 'r+')
+        self.state = self._map[0]
+        self._map[:] = np.zeros(1, dtype=LIVE_STATE_DTYPE)
+
+    def publish(self, timestamp, cycle_time, target, measured, profile,
+                actuator_ids, errors, commanded, positions, currents):
+        """Writes one cycle; actuator arguments are sequences in actuator_ids order."""
+        state = self.state
+        n = min(len(actuator_ids), MAX_ACTUATORS)
+        seq = int(state['seq'])
+        state['seq'] = seq + 1
+        state['n_actuators'] = n
+        state['cycle'] += 1
+        state['timestamp'] = timestamp
+        state['cycle_time'] = cycle_time
+        state['target'] = target
+        state['measured'] = measured
+        state['profile'] = profile
+        state['actuator_ids'][:n] = actuator_ids[:n]
+        state['error'][:n] = errors[:n]
+        state['commanded'][:n] = commanded[:n]
+        state['position'][:n] = positions[:n]
+        state['current'][:n] = currents[:n]
+        state['seq'] = seq + 2
+
+    def publish_status(self, timestamp, active, overruns=0, skipped_cycles=0, jitter_max=0.0):
+        """Updates the loop status; also called while the loop is inactive, as a heartbeat."""
+        state = self.state
+        seq = int(state['seq'])
+        state['seq'] = seq + 1
+        state['timestamp'] = timestamp
+        state['active'] = active
+        state['overruns'] = overruns
+        state['skipped_cycles'] = skipped_cycles
+        state['jitter_max'] = jitter_max
+        state['seq'] = seq + 2
+
+    def close(self):
+        self._map.flush()
+        del self.state, self._map
+
+
+class LiveStateReader:
+    """Consistent snapshots of the live state published by LiveStateWriter."""
+
+    def __init__(self, path=None):
+        self.path = str(path or live_state_path())
+        self._map = None
+
+    def _open(self):
+        try:
+            if os.path.getsize(self.path) < LIVE_STATE_DTYPE.itemsize:
+                return False
+            self._map = _map(self.path, 'r')
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def read(self):
+        """
+        Returns a copy of the record (numpy.void), or None when nothing was
+        published yet or no consistent copy could be taken.
+        """
+        if self._map is None and not self._open():
+            return None
+
+        for _ in range(READ_RETRIES):
+            seq = self._map['seq'][0]
+            if seq & 1:
+                continue
+            snapshot = self._map.copy()[0]
+            if self._map['seq'][0] == seq:
+                return snapshot if snapshot['timestamp'] else None
+        logger.debug("Live state busy, no consistent snapshot")
+        return None
@@ -0,0 +1,377 @@
+import fcntl
+import logging
+import os
+import secrets
+import tempfile
+import threading
+import time
+
+import numpy as np
+from django.conf import settings as django_settings
+
+from .bus import PRIORITY_DIAGNOSTIC, PRIORITY_UI
+from .discovery import Discovery, scan
+from .live_state import MAX_ACTUATORS
+
+logger = logging.getLogger(__name__)
+
+MAILBOX_SLOTS = 64
+PENDING_TIMEOUT = 5.0       # Commands not picked up by the control process by then are dropped
+POLL_INTERVAL = 0.01        # How often the control process checks for new commands
+MAX_SLAVE_ID = 247          # Modbus addresses; 0 is the broadcast ID
+MAX_POSITION = 4095         # MightyZAP goal position range starts at 0
+
+# Slot states
+SLOT_FREE = 0
+SLOT_POSTED = 1
+SLOT_RUNNING = 2
+SLOT_DONE = 3
+SLOT_FAILED = 4
+
+# Operations
+OP_SET_POSITION = 1
+OP_SET_POSITIONS = 2
+OP_DISCOVER = 3
+OPERATIONS = {OP_SET_POSITION: 'set_position', OP_SET_POSITIONS: 'set_positions', OP_DISCOVER: 'discover'}
+OPERATION_CODES = {name: code for code, name in OPERATIONS.items()}
+
+JOB_STATUS = {SLOT_POSTED: 'pending', SLOT_RUNNING: 'running', SLOT_DONE: 'done', SLOT_FAILED: 'failed'}
+
+SLOT_DTYPE = np.dtype([
+    ('state', 'u1'),
+    ('op', 'u1'),
+    ('broadcast', 'u1'),
+    ('count', 'u1'),
+    ('found', '<u2'),                       # Devices found by a discover command
+    ('token', '<u4'),                       # Distinguishes successive commands in the same slot
+    ('submitted', '<f8'),
+    ('started', '<f8'),
+    ('finished', '<f8'),
+    ('ids', '<i2', (MAX_ACTUATORS,)),
+    ('positions', '<i2', (MAX_ACTUATORS,)),
+    ('ok', 'u1', (MAX_ACTUATORS,)),
+    ('error', 'S64'),
+])
+
+
+class MailboxFull(Exception):
+    pass
+
+
+def mailbox_path():
+    return getattr(django_settings, 'HARDWARE_MAILBOX_FILE', None)
+
+
+class CommandMailbox:
+    """
+    Actuator commands from the web workers to the control process.
+
+    A fixed array of slots in a memory-mapped file. Web workers post
+    commands (allocation is serialised between them with flock) and read
+    their status; only the control process, which owns the RS-485 bus,
+    executes them. Slot ownership follows the state: posters only take
+    free or finished slots (the oldest result first), the control process
+    only touches posted and running ones, so the two sides never write the
+    same slot at the same time.
+
+    Job ids are "<slot>-<token>"; a reused slot gets a new token, so an old
+    id reports as unknown instead of returning someone else's result.
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or mailbox_path())
+        size = SLOT_DTYPE.itemsize * MAILBOX_SLOTS
+        while True:
+            self._file = open(self.path, 'a+b')
+            with self._locked():
+                stat = os.fstat(self._file.fileno())
+                if stat.st_ino != os.stat(self.path).st_ino:
+                    pass  # Replaced by another process while waiting for the lock
+                elif stat.st_size == 0:
+                    self._file.truncate(size)  # New file: start empty
+                    break
+                elif stat.st_size == size:
+                    break
+                else:
+                    # Left with another slot layout. Processes still running the old
+                    # code may have it mapped, and shrinking a mapped file makes them
+                    # fault (SIGBUS): swap in a new file, the old one lives on unlinked
+                    self._replace(size, stat.st_mode)
+            self._file.close()
+        self.slots = np.memmap(self.path, dtype=SLOT_DTYPE, mode='r+', shape=(MAILBOX_SLOTS,))
+
+    def _replace(self, size, mode):
+        directory, name = os.path.split(self.path)
+        fd, temp_path = tempfile.mkstemp(prefix=f'.{name}.', dir=directory or '.')
+        try:
+            os.fchmod(fd, mode & 0o777)  # Same access for the web workers as the old file
+            os.ftruncate(fd, size)
+            os.replace(temp_path, self.path)
+        except OSError:
+            os.unlink(temp_path)
+            raise
+        finally:
+            os.close(fd)
+
+    def _locked(self):
+        return _FileLock(self._file)
+
+    # Web side
+
+    def submit(self, operation, goals, broadcast=False) -> str:
+        """
+        Posts a command.
+
+        Args:
+            operation: 'set_position' (one goal), 'set_positions' or 'discover' (no goals)
+            goals: Dict {actuator_id: position}
+            broadcast: Allow the broadcast ID for set_positions
+
+        Returns:
+            Job id
+
+        Raises:
+            ValueError: Too many goals, or an id or position out of range
+                (the slot fields are int16)
+        """
+        if len(goals) > MAX_ACTUATORS:
+            raise ValueError(f"At most {MAX_ACTUATORS} actuators per command")
+        for actuator_id, position in goals.items():
+            if not 0 <= actuator_id <= MAX_SLAVE_ID:
+                raise ValueError(f"Actuator id {actuator_id} outside 0..{MAX_SLAVE_ID}")
+            if not 0 <= position <= MAX_POSITION:
+                raise ValueError(f"Position {position} outside 0..{MAX_POSITION}")
+        now = time.time()
+        with self._locked():
+            index = self._free_slot()
+            slot = self.slots[index]
+            token = secrets.randbits(32)
+            n = len(goals)
+            slot['op'] = OPERATION_CODES[operation]
+            slot['broadcast'] = bool(broadcast)
+            slot['count'] = n
+            slot['found'] = 0
+            slot['token'] = token
+            slot['submitted'] = now
+            slot['started'] = 0.0
+            slot['finished'] = 0.0
+            slot['ids'][:n] = list(goals.keys())
+            slot['positions'][:n] = list(goals.values())
+            slot['ok'][:] = 0
+            slot['error'] = b''
+            slot['state'] = SLOT_POSTED  # Last: publishes the command
+        return f"{index}-{token}"
+
+    def _free_slot(self):
+        states = self.slots['state']
+        free = np.flatnonzero(states == SLOT_FREE)
+        if free.size:
+            return int(free[0])
+        # Reuse the command that finished longest ago
+        finished = np.flatnonzero((states == SLOT_DONE) | (states == SLOT_FAILED))
+        if finished.size:
+            return int(finished[np.argmin(self.slots['finished'][finished])])
+        raise MailboxFull("Command mailbox full")
+
+    def status(self, job_id):
+        """
+        Returns the job status dict for the API, or None for an unknown id.
+        """
+        try:
+            index, token = (int(part) for part in job_id.split('-'))
+        except (AttributeError, ValueError):
+            return None
+        if not 0 <= index < MAILBOX_SLOTS:
+            return None
+        slot = self.slots[index].copy()
+        if slot['token'] != token or slot['state'] == SLOT_FREE:
+            return None
+
+        state = int(slot['state'])
+        n = int(slot['count'])
+        data = {
+            'job_id': job_id,
+            'operation': OPERATIONS.get(int(slot['op'])),
+            'status': JOB_STATUS[state],
+            'result': None,
+            'error': slot['error'].decode() or None,
+            'queued_ms': None,
+            'duration_ms': None,
+        }
+        if state == SLOT_POSTED and time.time() - slot['submitted'] > PENDING_TIMEOUT:
+            data['status'] = JOB_STATUS[SLOT_FAILED]
+            data['error'] = 'Control process not responding'
+        if slot['started']:
+            data['queued_ms'] = round(float(slot['started'] - slot['submitted']) * 1000.0, 2)
+        if slot['finished']:
+            data['duration_ms'] = round(float(slot['finished'] - slot['started']) * 1000.0, 2)
+        if state in (SLOT_DONE, SLOT_FAILED):
+            if slot['op'] == OP_DISCOVER:
+                # The IDs found are in the inventory (ActuatorConfig), not in the slot
+                data['result'] = {'found': int(slot['found'])}
+            else:
+                data['result'] = {str(i): bool(ok) for i, ok in zip(slot['ids'][:n].tolist(), slot['ok'][:n])}
+        return data
+
+    # Control process side
+
+    def take_posted(self):
+        """Marks posted commands as running and returns their slot indexes, oldest first."""
+        posted = np.flatnonzero(self.slots['state'] == SLOT_POSTED)
+        if not posted.size:
+            return []
+        posted = posted[np.argsort(self.slots['submitted'][posted])]
+        now = time.time()
+        taken = []
+        for index in posted.tolist():
+            slot = self.slots[index]
+            if now - slot['submitted'] > PENDING_TIMEOUT:
+                self.finish(index, {}, error='Expired before execution')
+                continue
+            slot['started'] = now
+            slot['state'] = SLOT_RUNNING
+            taken.append(index)
+        return taken
+
+    def recover(self):
+        """Fails the commands left running by a previous control process."""
+        for index in np.flatnonzero(self.slots['state'] == SLOT_RUNNING).tolist():
+            self.finish(index, {}, error='Control process restarted')
+
+    def command(self, index):
+        """(operation, goals, broadcast) of a slot."""
+        slot = self.slots[index]
+        n = int(slot['count'])
+        goals = dict(zip(slot['ids'][:n].tolist(), slot['positions'][:n].tolist()))
+        return OPERATIONS.get(int(slot['op'])), goals, bool(slot['broadcast'])
+
+    def finish(self, index, results, error=None):
+        """Stores the per-actuator results ({id: ok}, for discover the IDs found) and completes the command."""
+        slot = self.slots[index]
+        n = int(slot['count'])
+        if slot['op'] == OP_DISCOVER:
+            slot['found'] = len(results)
+        slot['ok'][:n] = [bool(results.get(i)) for i in slot['ids'][:n].tolist()]
+        slot['error'] = (error or '').encode()[:64]
+        slot['finished'] = time.time()
+        if not slot['started']:
+            slot['started'] = slot['finished']
+        slot['state'] = SLOT_FAILED if error else SLOT_DONE
+
+    def close(self):
+        del self.slots
+        self._file.close()
+
+
+class _FileLock:
+    def __init__(self, f):
+        self.f = f
+
+    def __enter__(self):
+        fcntl.flock(self.f, fcntl.LOCK_EX)
+
+    def __exit__(self, *exc):
+        fcntl.flock(self.f, fcntl.LOCK_UN)
+
+
+class MailboxServer:
+    """
+    Runs in the control process: executes mailbox commands on the bus.
+
+    A small thread polls the mailbox every POLL_INTERVAL and submits each
+    command to the bus owner thread at UI priority, so control traffic
+    still goes first; results are written back when the bus finishes.
+    A discovery goes to the bus one chunk of probes at a time, the next
+    chunk submitted by the poll that sees the previous one done.
+    """
+
+    def __init__(self, bus, mailbox=None):
+        self.bus = bus
+        self.mailbox = mailbox or CommandMailbox()
+        self._stop = threading.Event()
+        self._thread = None
+        self._discovery = None  # (slot index, Discovery, future of its chunk on the bus)
+
+    def start(self):
+        self.mailbox.recover()
+        self._thread = threading.Thread(target=self._run, name='mailbox', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        if self._discovery is not None:
+            self.mailbox.finish(self._discovery[0], {}, error='Control process stopped')
+            self._discovery = None
+
+    def poll(self):
+        """Dispatches the commands posted since the last poll."""
+        self._advance_discovery()
+        for index in self.mailbox.take_posted():
+            operation, goals, broadcast = self.mailbox.command(index)
+            if operation in ('set_position', 'set_positions') and goals:
+                # set_positions reports the echo of each write, so a silent actuator shows as failed
+                future = self.bus.submit('set_positions', goals, broadcast=broadcast, priority=PRIORITY_UI)
+            elif operation == 'discover':
+                if self._discovery is not None:
+                    self.mailbox.finish(index, {}, error='Discovery already running')
+                else:
+                    self._discovery = (index, Discovery(self.bus.driver.baudrate), None)
+                    self._advance_discovery()
+                continue
+            else:
+                self.mailbox.finish(index, {}, error=f'Unknown operation {operation}')
+                continue
+            future.add_done_callback(lambda f, index=index: self._done(index, f))
+
+    def _done(self, index, future):
+        if future.cancelled():
+            self.mailbox.finish(index, {}, error='Cancelled')
+        elif future.exception() is not None:
+            self.mailbox.finish(index, {}, error=str(future.exception()))
+        else:
+            self.mailbox.finish(index, future.result())
+
+    def _advance_discovery(self):
+        """Submits the next chunk of the discovery in progress; syncs and stores the result after the last."""
+        if self._discovery is None:
+            return
+        index, sweep, future = self._discovery
+        try:
+            while future is None or future.done():
+                if future is not None:
+                    sweep.add(future.result())
+                chunk = sweep.next_chunk()
+                if chunk is None:
+                    self._discovery = None
+                    self.mailbox.finish(index, dict.fromkeys(sweep.finish(), True))
+                    return
+                ids, baudrate = chunk
+                future = self.bus.submit(scan, ids=ids, baudrates=[baudrate], priority=PRIORITY_DIAGNOSTIC)
+        except Exception as e:
+            self._discovery = None
+            self.mailbox.finish(index, {}, error=str(e) or type(e).__name__)
+            return
+        self._discovery = (index, sweep, future)
+
+    def _run(self):
+        while not self._stop.wait(POLL_INTERVAL):
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Mailbox error: {e}")
+
+
+_mailbox_instance = None
+_mailbox_lock = threading.Lock()
+
+
+def get_mailbox() -> CommandMailbox:
+    """Returns the process-wide mailbox."""
+    global _mailbox_instance
+    with _mailbox_lock:
+        if _mailbox_instance is None:
+            _mailbox_instance = CommandMailbox()
+    return _mailbox_instance
@@ -0,0 +1,127 @@
+import bisect
+import os
+import time
+
+import numpy as np
+from django.conf import settings as django_settings
+
+from .link_stats import OUTCOME_CRC_ERROR, OUTCOME_EXCEPTION, OUTCOME_INVALID, OUTCOME_OK, OUTCOME_TIMEOUT
+
+
+# Histogram upper bounds (s); the last bucket (+Inf) is implicit
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+# Control cycle phases: 'sleep' is the wait for the deadline, 'cycle' the work of a whole cycle
+PHASES = ('config', 'sleep', 'profile', 'analysis', 'read', 'compute', 'write', 'cycle')
+PHASE_INDEX = {name: i for i, name in enumerate(PHASES)}
+
+COUNTERS = ('cycles', 'overruns', 'skipped_cycles', 'writes_sent', 'writes_suppressed', 'loop_errors')
+COUNTER_INDEX = {name: i for i, name in enumerate(COUNTERS)}
+
+# Bus transactions, by slave ID (0-247) and outcome (link_stats.OUTCOME_* values)
+MAX_SLAVES = 248
+OUTCOMES = {
+    OUTCOME_OK: 'ok',
+    OUTCOME_TIMEOUT: 'timeout',
+    OUTCOME_CRC_ERROR: 'crc_error',
+    OUTCOME_EXCEPTION: 'exception',
+    OUTCOME_INVALID: 'invalid',
+}
+
+# Fixed layout shared through a memory-mapped file. Buckets hold per-bucket
+# (not cumulative) counts; each value is written by the control process only.
+METRICS_DTYPE = np.dtype([
+    ('started', '<f8'),                                         # Unix time the recorder was opened
+    ('counters', '<u8', (len(COUNTERS),)),
+    ('skipped_phases', '<u8', (len(PHASES),)),
+    ('phase_buckets', '<u8', (len(PHASES), len(BUCKETS) + 1)),
+    ('phase_sum', '<f8', (len(PHASES),)),
+    ('bus_buckets', '<u8', (MAX_SLAVES, len(BUCKETS) + 1)),
+    ('bus_sum', '<f8', (MAX_SLAVES,)),
+    ('bus_outcomes', '<u8', (MAX_SLAVES, len(OUTCOMES))),
+    ('bus_retries', '<u8', (MAX_SLAVES,)),
+])
+
+
+def metrics_path():
+    return getattr(django_settings, 'HARDWARE_METRICS_FILE', None)
+
+
+def _map(path, mode):
+    return np.memmap(path, dtype=METRICS_DTYPE, mode=mode, shape=(1,))
+
+
+class MetricsRecorder:
+    """
+    Counters and fixed-bucket histograms of the control process.
+
+    Everything lives in a preallocated memory-mapped record: recording is
+    an index lookup and an in-place increment, nothing grows per call, and
+    the web workers read the same file for the metrics endpoint. Counters
+    start from zero whenever the control process starts (Prometheus handles
+    the reset).
+    """
+
+    def __init__(self, path=None):
+        self.path = str(path or metrics_path())
+        with open(self.path, 'a+b') as f:
+            f.truncate(METRICS_DTYPE.itemsize)
+        self._map = _map(self.path, 'r+')
+        self._map[:] = np.zeros(1, dtype=METRICS_DTYPE)
+        record = self._map[0]
+        record['started'] = time.time()
+        # Views into the mapped record, so each update is a single in-place write
+        self.counters = record['counters']
+        self.skipped_phases = record['skipped_phases']
+        self.phase_buckets = record['phase_buckets']
+        self.phase_sum = record['phase_sum']
+        self.bus_buckets = record['bus_buckets']
+        self.bus_sum = record['bus_sum']
+        self.bus_outcomes = record['bus_outcomes']
+        self.bus_retries = record['bus_retries']
+
+    def count(self, name, n=1):
+        self.counters[COUNTER_INDEX[name]] += n
+
+    def phase(self, name, seconds):
+        """Observes the duration of a cycle phase."""
+        i = PHASE_INDEX[name]
+        self.phase_buckets[i, bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.phase_sum[i] += seconds
+
+    def skipped(self, name):
+        self.skipped_phases[PHASE_INDEX[name]] += 1
+
+    def transaction(self, slave_id, outcome, seconds):
+        """Observes one bus transaction (request to end of reply or timeout)."""
+        self.bus_buckets[slave_id, bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.bus_sum[slave_id] += seconds
+        self.bus_outcomes[slave_id, outcome] += 1
+
+    def retry(self, slave_id):
+        self.bus_retries[slave_id] += 1
+
+    def close(self):
+        self._map.flush()
+        del self.counters, self.skipped_phases, self.phase_buckets, self.phase_sum
+        del self.bus_buckets, self.bus_sum, self.bus_outcomes, self.bus_retries, self._map
+
+
+class MetricsReader:
+    """Snapshots of the metrics published by MetricsRecorder, for other processes."""
+
+    def __init__(self, path=None):
+        self.path = str(path or metrics_path())
+        self._map = None
+
+    def read(self):
+        """Returns a copy of the record (numpy.void), or None when no recorder ever ran."""
+        if self._map is None:
+            try:
+                if os.path.getsize(self.path) < METRICS_DTYPE.itemsize:
+                    return None
+                self._map = _map(self.path, 'r')
+            except (OSError, ValueError):
+                return None
+        snapshot = self._map.copy()[0]
+        return snapshot if snapshot['started'] else None
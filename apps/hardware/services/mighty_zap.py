@@ -1,8 +1,26 @@
 import logging
 import time
 import struct
+from collections import namedtuple
+
 import serial
 
+from apps.hardware.modbus import (
+    build_request,
+    expected_response_length,
+    frame_silence,
+    read_frame,
+)
+from apps.hardware.services.link_stats import (
+    MAX_RETRIES,
+    OUTCOME_CRC_ERROR,
+    OUTCOME_EXCEPTION,
+    OUTCOME_INVALID,
+    OUTCOME_OK,
+    OUTCOME_TIMEOUT,
+    SlaveStats,
+)
+
 # Tenta importar RPi.GPIO para controle de direção do MAX485
 try:
     import RPi.GPIO as GPIO
@@ -13,30 +31,113 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 # Endereços MODBUS para MightyZAP (Conforme manual FC_MODBUS)
+ADDR_MODEL_NUMBER = 0x0000        # Model Number (R)
+ADDR_FIRMWARE_VERSION = 0x0001    # Version of Firmware (R)
+ADDR_ID = 0x0002                  # ID (R/W, não volátil)
+ADDR_BAUD_RATE = 0x0003           # Baud Rate (R/W, não volátil, vale após o restart)
 ADDR_GOAL_POSITION = 0x001E       # Goal Position (R/W)
 ADDR_PRESENT_POSITION = 0x0020   # Present Position (R)
 ADDR_PRESENT_CURRENT = 0x0024    # Present Current (R)
 ADDR_PRESENT_MOTOR_OP_MODE = 0x0026  # Motor Operating Mode (R)
 
+# Bloco contíguo lido por read_state: de Present Position até Motor Operating Mode.
+# O mapa de dados do manual FC_MODBUS (4.2.3) não define os registradores
+# 0x0021-0x0023 e 0x0025 entre eles, então um firmware pode recusar o bloco
+# com uma exceção MODBUS; nesse caso read_state passa a ler os três
+# registradores separadamente (ver MightyZapDriver.read_state).
+STATE_BLOCK_START = ADDR_PRESENT_POSITION
+STATE_BLOCK_COUNT = ADDR_PRESENT_MOTOR_OP_MODE - ADDR_PRESENT_POSITION + 1
+
+# Estado instantâneo de um atuador (posição 0-4095, corrente em mA, modo de operação)
+ActuatorState = namedtuple('ActuatorState', ['position', 'current', 'op_mode'])
+
+# Identificação de um dispositivo (registradores Model Number e Firmware Version)
+DeviceIdentity = namedtuple('DeviceIdentity', ['model_number', 'firmware_version'])
+
+# Entrada do cache do driver: instante (monotônico) da leitura/eco e o valor
+CacheEntry = namedtuple('CacheEntry', ['timestamp', 'value'])
+
+# ID de broadcast: todos os atuadores executam o comando e nenhum responde.
+# O FC_MODBUS do MightyZAP não suporta escrita múltipla (0x10), então o
+# broadcast é a única forma de atualizar vários atuadores com um único frame.
+BROADCAST_ID = 0
+
+# Funções especiais do FC_MODBUS (sem resposta: o atuador reinicia)
+FC_MEMORY_RESET = 0xF6
+FC_RESTART = 0xF8
+
 # Configuração padrão do GPIO para controle de direção RS485
 DEFAULT_DE_RE_PIN = 18  # GPIO 18 (BCM) - controle DE/RE do MAX485
 
 # Configuração serial padrão
 DEFAULT_SERIAL_PORT = '/dev/serial0'  # UART do Raspberry Pi
 DEFAULT_BAUDRATE = 57600
+DEFAULT_RESPONSE_TIMEOUT = 0.5  # Tempo máximo até o primeiro byte da resposta (s)
+DEFAULT_CACHE_MAX_AGE = 0.1     # Idade máxima padrão dos valores em cache (s)
 
 
-def calculate_crc16(data: bytes) -> bytes:
-    """Calcula CRC16 MODBUS."""
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return struct.pack('<H', crc)  # Little-endian
+def check_response(response: bytes, crc: int, slave_id: int, function_code: int) -> bytes:
+    """
+    Valida um frame de resposta recebido.
+
+    Args:
+        response: Frame completo recebido (com CRC)
+        crc: CRC acumulado sobre o frame (0 quando íntegro)
+        slave_id: ID para o qual a requisição foi enviada
+        function_code: Código da função enviada
+
+    Returns:
+        Resposta sem CRC ou bytes vazios se o frame for inválido
+    """
+    # Valida resposta (mínimo 5 bytes: id + func + data + crc)
+    if len(response) < 5:
+        return b''
+
+    # Verifica CRC (resíduo zero sobre dados + CRC recebido)
+    if crc != 0:
+        logger.warning(f"CRC inválido na resposta do atuador {slave_id}")
+        return b''
+
+    if response[0] != slave_id:
+        logger.warning(f"Resposta de ID inesperado {response[0]} (esperado {slave_id})")
+        return b''
+
+    if response[1] == function_code | 0x80:
+        logger.warning(f"Exceção MODBUS {response[2]:#04x} do atuador {slave_id}")
+        return b''
+
+    return response[:-2]  # Retorna sem CRC
+
+
+def classify_response(response: bytes, crc: int, slave_id: int, function_code: int) -> int:
+    """Classifica o resultado de uma transação para as estatísticas do link (OUTCOME_*)."""
+    if not response:
+        return OUTCOME_TIMEOUT
+    if len(response) < 5 or crc != 0:
+        return OUTCOME_CRC_ERROR  # Frame truncado ou corrompido
+    if response[0] != slave_id:
+        return OUTCOME_INVALID
+    if response[1] == function_code | 0x80:
+        return OUTCOME_EXCEPTION
+    return OUTCOME_OK
+
+
+def decode_state(response: bytes):
+    """
+    Decodifica a resposta da leitura em bloco de read_state.
+
+    Returns:
+        ActuatorState ou None se a resposta não tiver o tamanho do bloco
+    """
+    if len(response) != 3 + 2 * STATE_BLOCK_COUNT:
+        return None
+
+    registers = struct.unpack_from(f'>{STATE_BLOCK_COUNT}H', response, 3)
+    return ActuatorState(
+        position=registers[ADDR_PRESENT_POSITION - STATE_BLOCK_START],
+        current=registers[ADDR_PRESENT_CURRENT - STATE_BLOCK_START],
+        op_mode=registers[ADDR_PRESENT_MOTOR_OP_MODE - STATE_BLOCK_START],
+    )
 
 
 class MightyZapDriver:
@@ -48,7 +149,8 @@ class MightyZapDriver:
     """
 
     def __init__(self, port=DEFAULT_SERIAL_PORT, baudrate=DEFAULT_BAUDRATE,
-                 de_re_pin=DEFAULT_DE_RE_PIN, simulated=False):
+                 de_re_pin=DEFAULT_DE_RE_PIN, simulated=False,
+                 response_timeout=DEFAULT_RESPONSE_TIMEOUT, cache_max_age=DEFAULT_CACHE_MAX_AGE):
         """
         Inicializa o driver.
 
@@ -57,13 +159,36 @@ class MightyZapDriver:
             baudrate: Taxa de transmissão (padrão 57600)
             de_re_pin: Pino GPIO (BCM) para controle DE/RE do MAX485
             simulated: Se True, apenas simula sem comunicação real
+            response_timeout: Tempo máximo de espera pelo início da resposta (s);
+                com estatísticas suficientes cada escravo usa um timeout menor
+            cache_max_age: Idade máxima padrão aceita por cached_state/cached_position (s)
         """
         self.port = port
         self.baudrate = baudrate
         self.de_re_pin = de_re_pin
         self.simulated = simulated
+        self.response_timeout = response_timeout
+        self.frame_silence = frame_silence(baudrate)
         self.serial = None
         self.gpio_initialized = False
+        self._bus_idle_at = 0.0  # Instante (monotônico) em que o barramento fica livre
+
+        # Cache por atuador, atualizado a cada leitura e eco de escrita bem-sucedidos
+        # e invalidado em erros: {actuator_id: CacheEntry}
+        self.cache_max_age = cache_max_age
+        self.state_cache = {}
+        self.position_cache = {}
+        self.goal_cache = {}
+
+        # Atuadores que responderam à leitura em bloco com exceção MODBUS
+        self.block_read_unsupported = set()
+        # Resultado (OUTCOME_*) da última transação; None sem transação
+        self.last_outcome = None
+
+        # Estatísticas de transação e política de timeout/retentativa por escravo
+        self.stats = {}
+        # Histogramas e contadores exportados (metrics.MetricsRecorder), quando houver
+        self.metrics = None
 
     def connect(self):
         """Conecta à porta serial e configura GPIO."""
@@ -83,14 +208,15 @@ class MightyZapDriver:
             else:
                 logger.warning("RPi.GPIO não disponível - controle de direção desabilitado")
 
-            # Abre porta serial
+            # Abre porta serial. O timeout de leitura é o silêncio entre frames:
+            # cada read() retorna assim que o frame chega ou o barramento silencia.
             self.serial = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
                 stopbits=serial.STOPBITS_ONE,
-                timeout=0.5
+                timeout=self.frame_silence
             )
 
             logger.info(f"Conectado à porta serial {self.port} @ {self.baudrate} baud")
@@ -114,6 +240,59 @@ class MightyZapDriver:
             self.gpio_initialized = False
             logger.info("GPIO liberado")
 
+    def set_baudrate(self, baudrate: int):
+        """
+        Muda a taxa de transmissão do driver (e da porta, se já aberta).
+
+        Estatísticas e cache são descartados: latências e timeouts medidos
+        a outra taxa não valem mais.
+        """
+        self.baudrate = baudrate
+        self.frame_silence = frame_silence(baudrate)
+        if self.serial:
+            self.serial.baudrate = baudrate
+            self.serial.timeout = self.frame_silence
+        self.stats.clear()
+        self.invalidate()
+
+    def _cached(self, cache, actuator_id, max_age):
+        entry = cache.get(actuator_id)
+        if entry is None:
+            return None
+        max_age = self.cache_max_age if max_age is None else max_age
+        if time.monotonic() - entry.timestamp > max_age:
+            return None
+        return entry.value
+
+    def cached_state(self, actuator_id: int, max_age: float = None):
+        """
+        Último ActuatorState lido, sem transação no barramento.
+
+        Args:
+            actuator_id: ID MODBUS do atuador
+            max_age: Idade máxima aceita (s); padrão cache_max_age
+
+        Returns:
+            ActuatorState ou None se não houver leitura recente o bastante
+        """
+        return self._cached(self.state_cache, actuator_id, max_age)
+
+    def cached_position(self, actuator_id: int, max_age: float = None):
+        """Última posição lida (por get_position ou read_state), ou None."""
+        return self._cached(self.position_cache, actuator_id, max_age)
+
+    def cached_goal(self, actuator_id: int, max_age: float = None):
+        """Última posição alvo confirmada por eco de escrita, ou None."""
+        return self._cached(self.goal_cache, actuator_id, max_age)
+
+    def invalidate(self, actuator_id: int = None):
+        """Descarta o cache de um atuador (ou de todos)."""
+        for cache in (self.state_cache, self.position_cache, self.goal_cache):
+            if actuator_id is None:
+                cache.clear()
+            else:
+                cache.pop(actuator_id, None)
+
     def _set_transmit_mode(self):
         """Coloca MAX485 em modo transmissão (DE/RE = HIGH)."""
         if self.gpio_initialized and GPIO_AVAILABLE:
@@ -131,6 +310,11 @@ class MightyZapDriver:
         """
         Envia comando MODBUS RTU e retorna resposta.
 
+        O timeout de resposta é o adaptativo do escravo (ver SlaveStats) e
+        timeouts, erros de CRC e frames inválidos são repetidos enquanto o
+        orçamento de retentativas do escravo permitir. Leituras e a escrita
+        0x06 são idempotentes, então repetir é seguro.
+
         Args:
             slave_id: ID do dispositivo (1-247)
             function_code: Código da função MODBUS (0x03=ler, 0x06=escrever)
@@ -140,67 +324,237 @@ class MightyZapDriver:
         Returns:
             Resposta do dispositivo (sem CRC) ou bytes vazios em caso de erro
         """
+        self.last_outcome = None
         if self.simulated or not self.serial:
             return b''
 
-        # Monta frame MODBUS RTU
-        frame = struct.pack('>BBHH', slave_id, function_code, start_address, data)
-        frame += calculate_crc16(frame)
+        stats = self.stats.get(slave_id)
+        if stats is None:
+            stats = self.stats[slave_id] = SlaveStats()
+
+        # Monta frame MODBUS RTU (frames repetidos vêm do cache)
+        frame = build_request(slave_id, function_code, start_address, data)
+        expected_length = expected_response_length(function_code, data)
+
+        for attempt in range(MAX_RETRIES + 1):
+            try:
+                response, crc, latency = self._transact(
+                    frame, function_code, expected_length, stats.timeout(self.response_timeout))
+            except serial.SerialException as e:
+                logger.error(f"Erro de comunicação serial: {e}")
+                return b''
+
+            outcome = self.last_outcome = classify_response(response, crc, slave_id, function_code)
+            stats.record(outcome, latency)
+            if self.metrics is not None:
+                self.metrics.transaction(slave_id, outcome, latency)
+            if outcome in (OUTCOME_OK, OUTCOME_EXCEPTION):
+                break
+            if attempt == MAX_RETRIES or not stats.take_retry():
+                break
+            if self.metrics is not None:
+                self.metrics.retry(slave_id)
+            logger.debug(f"Repetindo transação com o atuador {slave_id}")
+
+        return check_response(response, crc, slave_id, function_code)
+
+    def _transact(self, frame: bytes, function_code: int, expected_length: int, response_timeout: float):
+        """Uma transação no barramento: (resposta, CRC acumulado, latência em s)."""
+        # Garante o silêncio de 3.5 caracteres desde o último frame
+        idle_wait = self._bus_idle_at - time.monotonic()
+        if idle_wait > 0:
+            time.sleep(idle_wait)
+
+        # Limpa buffers
+        self.serial.reset_input_buffer()
+        self.serial.reset_output_buffer()
+
+        # Transmite
+        self._set_transmit_mode()
+        self.serial.write(frame)
+        self.serial.flush()  # Aguarda transmissão completa
+
+        # Muda para recepção
+        self._set_receive_mode()
+        sent_at = time.monotonic()
+
+        # Lê até completar o frame esperado ou o barramento silenciar
+        try:
+            response, crc = read_frame(self.serial, function_code, expected_length, response_timeout)
+        finally:
+            self._bus_idle_at = time.monotonic() + self.frame_silence
+        return response, crc, time.monotonic() - sent_at
+
+    def probe(self, slave_id: int, timeout: float):
+        """
+        Procura um dispositivo: uma leitura de Model Number e Firmware Version.
 
+        Feita para varreduras: uma única tentativa, com o timeout dado, fora
+        das estatísticas do link e das métricas (um ID vazio não é um
+        escravo com problemas).
+
+        Args:
+            slave_id: ID a testar (1-247)
+            timeout: Tempo máximo até o primeiro byte da resposta (s)
+
+        Returns:
+            Tupla (OUTCOME_*, DeviceIdentity ou None)
+        """
+        if self.simulated or not self.serial:
+            return OUTCOME_TIMEOUT, None
+
+        frame = build_request(slave_id, 0x03, ADDR_MODEL_NUMBER, 2)
         try:
-            # Limpa buffers
-            self.serial.reset_input_buffer()
-            self.serial.reset_output_buffer()
+            response, crc, _ = self._transact(frame, 0x03, expected_response_length(0x03, 2), timeout)
+        except serial.SerialException as e:
+            logger.error(f"Erro de comunicação serial: {e}")
+            return OUTCOME_TIMEOUT, None
 
-            # Transmite
-            self._set_transmit_mode()
-            self.serial.write(frame)
-            self.serial.flush()  # Aguarda transmissão completa
+        outcome = classify_response(response, crc, slave_id, 0x03)
+        if outcome != OUTCOME_OK or len(response) != 9:
+            return outcome, None
+        return outcome, DeviceIdentity(*struct.unpack_from('>2H', response, 3))
 
-            # Muda para recepção
-            self._set_receive_mode()
+    def link_stats(self) -> dict:
+        """Estatísticas de transação por escravo: {slave_id: dict}."""
+        return {slave_id: stats.summary(self.response_timeout)
+                for slave_id, stats in sorted(self.stats.items())}
 
-            # Aguarda e lê resposta
-            time.sleep(0.05)  # Tempo para dispositivo responder
+    def _send_broadcast(self, function_code: int, start_address: int, data: int) -> bool:
+        """Envia um comando MODBUS RTU para o ID de broadcast (sem resposta)."""
+        return self._send_without_reply(BROADCAST_ID, function_code, start_address, data)
 
-            if self.serial.in_waiting > 0:
-                response = self.serial.read(self.serial.in_waiting)
+    def _send_without_reply(self, slave_id: int, function_code: int, start_address: int, data: int) -> bool:
+        """
+        Envia um comando MODBUS RTU que não tem resposta (broadcast, 0xF6, 0xF8).
 
-                # Valida resposta (mínimo 5 bytes: id + func + data + crc)
-                if len(response) >= 5:
-                    # Verifica CRC
-                    received_crc = response[-2:]
-                    calculated_crc = calculate_crc16(response[:-2])
+        Returns:
+            True se o frame foi transmitido
+        """
+        if self.simulated or not self.serial:
+            return False
 
-                    if received_crc == calculated_crc:
-                        return response[:-2]  # Retorna sem CRC
-                    else:
-                        logger.warning(f"CRC inválido na resposta do atuador {slave_id}")
+        frame = build_request(slave_id, function_code, start_address, data)
 
-            return b''
+        try:
+            idle_wait = self._bus_idle_at - time.monotonic()
+            if idle_wait > 0:
+                time.sleep(idle_wait)
+
+            self._set_transmit_mode()
+            self.serial.write(frame)
+            self.serial.flush()
+            self._set_receive_mode()
+
+            # Ninguém responde: o barramento fica livre após o silêncio
+            self._bus_idle_at = time.monotonic() + self.frame_silence
+            return True
 
         except serial.SerialException as e:
             logger.error(f"Erro de comunicação serial: {e}")
-            return b''
+            return False
+
+    def read_register(self, actuator_id: int, address: int) -> int | None:
+        """Lê um registrador (0x03); None em caso de erro."""
+        response = self._send_modbus_command(actuator_id, 0x03, address, 1)
+        if len(response) != 5:
+            return None
+        return struct.unpack_from('>H', response, 3)[0]
+
+    def write_register(self, actuator_id: int, address: int, value: int) -> bool:
+        """Escreve um registrador (0x06); True quando o eco confirma a escrita."""
+        return bool(self._send_modbus_command(actuator_id, 0x06, address, value))
+
+    def restart(self, actuator_id: int) -> bool:
+        """
+        Reinicia o atuador (função 0xF8, sem resposta).
+
+        Registradores não voláteis alterados, como ID e Baud Rate, só passam
+        a valer depois do restart; o atuador fica mudo enquanto reinicia.
+
+        Returns:
+            True se o frame foi transmitido
+        """
+        self.invalidate(actuator_id)
+        return self._send_without_reply(actuator_id, FC_RESTART, 0, 0)
+
+    def set_positions(self, goals: dict, broadcast: bool = False) -> dict:
+        """
+        Define a posição de vários atuadores na mesma fase de escrita.
+
+        Quando `broadcast` é True e todos os alvos são iguais, envia um único
+        frame para o ID de broadcast e todos os atuadores partem juntos. Caso
+        contrário envia as escritas 0x06 em sequência, cada uma liberada assim
+        que o eco chega.
+
+        Args:
+            goals: Dicionário {actuator_id: posição}
+            broadcast: Indica que `goals` cobre todos os atuadores do barramento,
+                permitindo o uso do ID de broadcast
+
+        Returns:
+            Dicionário {actuator_id: bool} indicando o sucesso de cada escrita
+            (no broadcast o sucesso indica apenas a transmissão, sem eco)
+        """
+        goals = {actuator_id: max(0, min(4095, int(position)))
+                 for actuator_id, position in goals.items()}
+        if not goals:
+            return {}
+
+        if self.simulated:
+            logger.info(f"[SIMULAÇÃO] Posições em grupo: {goals}")
+            return {actuator_id: True for actuator_id in goals}
+
+        if not self.serial or not self.serial.is_open:
+            logger.error("Porta serial não conectada")
+            return {actuator_id: False for actuator_id in goals}
+
+        positions = set(goals.values())
+        if broadcast and len(goals) > 1 and len(positions) == 1:
+            sent = self._send_broadcast(0x06, ADDR_GOAL_POSITION, positions.pop())
+            # Sem eco não há confirmação do alvo
+            for actuator_id in goals:
+                self.goal_cache.pop(actuator_id, None)
+            return {actuator_id: sent for actuator_id in goals}
+
+        results = {}
+        for actuator_id, position in goals.items():
+            response = self._send_modbus_command(
+                slave_id=actuator_id,
+                function_code=0x06,
+                start_address=ADDR_GOAL_POSITION,
+                data=position
+            )
+            results[actuator_id] = bool(response)
+            if response:
+                self.goal_cache[actuator_id] = CacheEntry(time.monotonic(), position)
+            else:
+                self.invalidate(actuator_id)
+                logger.warning(f"Sem resposta do atuador {actuator_id}")
 
-    def set_position(self, actuator_id: int, position: int):
+        return results
+
+    def set_position(self, actuator_id: int, position: int) -> bool:
         """
         Define a posição do atuador.
 
         Args:
             actuator_id: ID MODBUS do atuador (1-247)
             position: Posição desejada (0-4095)
+
+        Returns:
+            True quando o eco confirma a escrita
         """
         # Limita posição ao range válido
         position = max(0, min(4095, int(position)))
 
         if self.simulated:
             logger.info(f"[SIMULAÇÃO] Atuador {actuator_id} -> posição {position}")
-            return
+            return True
 
         if not self.serial or not self.serial.is_open:
             logger.error("Porta serial não conectada")
-            return
+            return False
 
         logger.info(f"Enviando posição {position} para atuador {actuator_id}")
 
@@ -213,27 +567,38 @@ class MightyZapDriver:
         )
 
         if response:
+            self.goal_cache[actuator_id] = CacheEntry(time.monotonic(), position)
             logger.debug(f"Resposta recebida: {response.hex()}")
-        else:
-            logger.warning(f"Sem resposta do atuador {actuator_id}")
+            return True
+
+        self.invalidate(actuator_id)
+        logger.warning(f"Sem resposta do atuador {actuator_id}")
+        return False
 
-    def get_position(self, actuator_id: int) -> int:
+    def get_position(self, actuator_id: int, max_age: float = 0) -> int | None:
         """
         Lê a posição atual do atuador.
 
         Args:
             actuator_id: ID MODBUS do atuador (1-247)
+            max_age: Aceita a posição em cache se mais nova que isso (s);
+                0 força a leitura no barramento
 
         Returns:
-            Posição atual (0-4095) ou 0 em caso de erro
+            Posição atual (0-4095) ou None em caso de erro
         """
+        if max_age:
+            cached = self.cached_position(actuator_id, max_age)
+            if cached is not None:
+                return cached
+
         if self.simulated:
             logger.info(f"[SIMULAÇÃO] Lendo posição do atuador {actuator_id}")
             return 0
 
         if not self.serial or not self.serial.is_open:
             logger.error("Porta serial não conectada")
-            return 0
+            return None
 
         # Função 0x03 = Read Holding Registers
         response = self._send_modbus_command(
@@ -246,11 +611,80 @@ class MightyZapDriver:
         if len(response) >= 5:
             # Resposta: slave_id + func + byte_count + data (2 bytes)
             position = struct.unpack('>H', response[3:5])[0]
+            self.position_cache[actuator_id] = CacheEntry(time.monotonic(), position)
             logger.debug(f"Posição atual do atuador {actuator_id}: {position}")
             return position
 
+        self.invalidate(actuator_id)
         logger.warning(f"Falha ao ler posição do atuador {actuator_id}")
-        return 0
+        return None
+
+    def read_state(self, actuator_id: int, max_age: float = 0):
+        """
+        Lê posição, corrente e modo de operação em uma única transação.
+
+        Usa uma leitura 0x03 de múltiplos registradores cobrindo o bloco
+        Present Position .. Motor Operating Mode. Se o atuador responder ao
+        bloco com exceção MODBUS, ele é marcado em block_read_unsupported e
+        os três registradores passam a ser lidos um a um.
+
+        Args:
+            actuator_id: ID MODBUS do atuador (1-247)
+            max_age: Aceita o estado em cache se mais novo que isso (s);
+                0 força a leitura no barramento
+
+        Returns:
+            ActuatorState ou None em caso de erro
+        """
+        if max_age:
+            cached = self.cached_state(actuator_id, max_age)
+            if cached is not None:
+                return cached
+
+        if self.simulated:
+            logger.info(f"[SIMULAÇÃO] Lendo estado do atuador {actuator_id}")
+            return ActuatorState(0, 0, 0)
+
+        if not self.serial or not self.serial.is_open:
+            logger.error("Porta serial não conectada")
+            return None
+
+        if actuator_id in self.block_read_unsupported:
+            state = self._read_state_registers(actuator_id)
+        else:
+            response = self._send_modbus_command(
+                slave_id=actuator_id,
+                function_code=0x03,
+                start_address=STATE_BLOCK_START,
+                data=STATE_BLOCK_COUNT
+            )
+            state = decode_state(response)
+            if state is None and self.last_outcome == OUTCOME_EXCEPTION:
+                logger.warning(f"Atuador {actuator_id} recusou a leitura em bloco; "
+                               f"lendo registradores separadamente")
+                self.block_read_unsupported.add(actuator_id)
+                state = self._read_state_registers(actuator_id)
+
+        if state is not None:
+            now = time.monotonic()
+            self.state_cache[actuator_id] = CacheEntry(now, state)
+            self.position_cache[actuator_id] = CacheEntry(now, state.position)
+            logger.debug(f"Estado do atuador {actuator_id}: {state}")
+            return state
+
+        self.invalidate(actuator_id)
+        logger.warning(f"Falha ao ler estado do atuador {actuator_id}")
+        return None
+
+    def _read_state_registers(self, actuator_id: int):
+        """Lê o estado com uma leitura por registrador; None se alguma falhar."""
+        values = []
+        for address in (ADDR_PRESENT_POSITION, ADDR_PRESENT_CURRENT, ADDR_PRESENT_MOTOR_OP_MODE):
+            value = self.read_register(actuator_id, address)
+            if value is None:
+                return None
+            values.append(value)
+        return ActuatorState(*values)
 
 
 # Instância global para uso pelo sistema
@@ -0,0 +1,96 @@
+import numpy as np
+
+# Actuator counts per unit of profile error, the scale used by the former P-only law
+POSITION_SCALE = 10.0
+
+# Time constant (s) of the first-order low-pass filter applied to the derivative term
+DEFAULT_DERIVATIVE_FILTER = 0.2
+
+
+class PIDBank:
+    """
+    Discrete positional PID controllers, one per actuator zone.
+
+    All state lives in one compact (4, n) float array: integral, last
+    measurement, filtered derivative and last output, so a whole cycle is a
+    handful of vectorised operations.
+
+    - Output is the absolute goal position of each actuator; the integral
+      term carries the operating point (bias).
+    - Derivative acts on the measurement, not on the error, so setpoint
+      changes do not kick the actuators, and is low-pass filtered.
+    - Anti-windup: when the output saturates at min/max position the integral
+      is back-calculated so that it sits exactly at the limit, and it is
+      always clamped to the actuator range.
+    - Bumpless transfer: reset() seeds the integral so that the first output
+      equals the current actuator position.
+    """
+
+    def __init__(self, size: int, derivative_filter: float = DEFAULT_DERIVATIVE_FILTER):
+        self.size = size
+        self.derivative_filter = derivative_filter
+        self.state = np.zeros((4, size))
+        self.integral, self.last_measurement, self.derivative, self.output = self.state
+        self.initialized = np.zeros(size, dtype=bool)
+
+    def reset(self, positions, setpoint, measurement, kp: float, mask=None):
+        """
+        Bumpless (re)initialisation from the current actuator positions.
+
+        Args:
+            positions: Current actuator positions (counts)
+            setpoint: Zone setpoints
+            measurement: Zone measurements
+            kp: Proportional gain in use
+            mask: Boolean mask of the controllers to reset (default: all)
+        """
+        mask = np.ones(self.size, dtype=bool) if mask is None else mask
+        positions = np.asarray(positions, dtype=np.float64)
+        measurement = np.asarray(measurement, dtype=np.float64)
+        error = np.asarray(setpoint, dtype=np.float64) - measurement
+
+        np.copyto(self.integral, positions - kp * POSITION_SCALE * error, where=mask)
+        np.copyto(self.last_measurement, measurement, where=mask)
+        np.copyto(self.derivative, 0.0, where=mask)
+        np.copyto(self.output, positions, where=mask)
+        self.initialized |= mask
+
+    def update(self, setpoint, measurement, dt: float, kp: float, ki: float, kd: float,
+               out_min, out_max, mask=None) -> np.ndarray:
+        """
+        Advances the controllers by one cycle.
+
+        Args:
+            setpoint: Zone setpoints
+            measurement: Zone measurements
+            dt: Time since the previous update (s)
+            kp, ki, kd: Gains (scalars or per-zone arrays)
+            out_min, out_max: Actuator position limits
+            mask: Boolean mask of the controllers to update (default: all);
+                masked-out controllers keep their state and last output
+
+        Returns:
+            Goal positions (float array, the controllers' `output`)
+        """
+        mask = self.initialized.copy() if mask is None else mask & self.initialized
+        measurement = np.asarray(measurement, dtype=np.float64)
+        error = np.asarray(setpoint, dtype=np.float64) - measurement
+
+        alpha = self.derivative_filter / (self.derivative_filter + dt)
+        raw_derivative = (measurement - self.last_measurement) / dt
+        derivative = alpha * self.derivative + (1.0 - alpha) * raw_derivative
+
+        proportional = kp * POSITION_SCALE * error
+        derivative_term = -kd * POSITION_SCALE * derivative
+        integral = self.integral + ki * POSITION_SCALE * error * dt
+
+        unsaturated = integral + proportional + derivative_term
+        output = np.clip(unsaturated, out_min, out_max)
+        # Back-calculation: drop the part of the integral that pushed past the limit
+        integral = np.clip(integral - (unsaturated - output), out_min, out_max)
+
+        np.copyto(self.integral, integral, where=mask)
+        np.copyto(self.derivative, derivative, where=mask)
+        np.copyto(self.last_measurement, measurement, where=mask)
+        np.copyto(self.output, output, where=mask)
+        return self.output
@@ -0,0 +1,114 @@
+import numpy as np
+
+DEFAULT_GRID_SIZE = 64
+DEFAULT_OUTLIER_THRESHOLD = 3.5  # Robust z-score (median/MAD) above which a point is rejected
+MAD_TO_SIGMA = 1.4826
+
+
+def zone_weight_matrix(n_zones: int, grid_size: int) -> np.ndarray:
+    """
+    Overlapping triangular weights, one row per actuator zone.
+
+    Zone i peaks at the centre of the i-th equal slice of the profile and
+    fades out at the neighbouring centres, so every grid point is shared by
+    at most two adjacent actuators. Rows are normalised to sum to 1.
+    """
+    grid = np.linspace(0.0, 1.0, grid_size)
+    centres = (np.arange(n_zones) + 0.5) / n_zones
+    width = 1.0 / n_zones
+    weights = np.clip(1.0 - np.abs(grid[None, :] - centres[:, None]) / width, 0.0, None)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+
+class ProfileAnalyzer:
+    """
+    Turns a sampled profile into a per-zone deviation vector.
+
+    Pipeline (vectorised, no per-point Python loops):
+      1. mask dropouts (non-finite values) and outliers, using a robust
+         z-score of the deviation from the target;
+      2. resample the valid points onto a fixed grid;
+      3. average the deviation over each actuator zone with the zone weights,
+         renormalising by the weight that actually landed on valid points.
+
+    Positions are normalised to 0..1 across the nozzle width. Deviations are
+    target - measured, matching the sign of the scalar error in ControlLoop.
+    """
+
+    def __init__(self, n_zones: int, target, positions=None, grid_size=DEFAULT_GRID_SIZE,
+                 outlier_threshold=DEFAULT_OUTLIER_THRESHOLD, weights=None):
+        """
+        Args:
+            n_zones: Number of actuator zones
+            target: Target profile (sequence) or a scalar for a flat target
+            positions: Normalised positions of the profile samples (default: evenly spaced)
+            grid_size: Number of points of the resampling grid
+            outlier_threshold: Robust z-score limit for outlier rejection
+            weights: Optional (n_zones, grid_size) zone weight matrix
+        """
+        self.n_zones = n_zones
+        self.grid = np.linspace(0.0, 1.0, grid_size)
+        self.positions = None if positions is None else np.asarray(positions, dtype=np.float64)
+        self.outlier_threshold = outlier_threshold
+        self.weights = zone_weight_matrix(n_zones, grid_size) if weights is None else np.asarray(weights, dtype=np.float64)
+        self.target = self._resample_target(target)
+        # Zone setpoints: the target averaged with the same zone weights
+        self.zone_targets = self.weights @ self.target
+
+        # Scratch buffers reused every cycle
+        self._deviation = np.empty(grid_size)
+        self._valid = np.empty(grid_size)
+
+    def _resample_target(self, target) -> np.ndarray:
+        target = np.atleast_1d(np.asarray(target, dtype=np.float64))
+        if target.size == 1:
+            return np.full(self.grid.size, target[0])
+        return np.interp(self.grid, np.linspace(0.0, 1.0, target.size), target)
+
+    def _sample_positions(self, n_points: int) -> np.ndarray:
+        if self.positions is not None and self.positions.size == n_points:
+            return self.positions
+        return np.linspace(0.0, 1.0, n_points)
+
+    def valid_mask(self, profile, positions=None) -> np.ndarray:
+        """Boolean mask of points that are neither dropouts nor outliers."""
+        profile = np.asarray(profile, dtype=np.float64)
+        positions = self._sample_positions(profile.size) if positions is None else positions
+        valid = np.isfinite(profile)
+        if valid.sum() < 3:
+            return valid
+
+        deviation = np.interp(positions, self.grid, self.target) - profile
+        median = np.median(deviation[valid])
+        mad = np.median(np.abs(deviation[valid] - median)) * MAD_TO_SIGMA
+        if mad > 0:
+            with np.errstate(invalid='ignore'):
+                valid &= np.abs(deviation - median) <= self.outlier_threshold * mad
+        return valid
+
+    def zone_errors(self, profile, positions=None) -> np.ndarray:
+        """
+        Computes the deviation (target - measured) of each zone.
+
+        Args:
+            profile: Measured profile samples
+            positions: Normalised sample positions (default: evenly spaced)
+
+        Returns:
+            Array of n_zones deviations; NaN for zones without valid points
+        """
+        profile = np.asarray(profile, dtype=np.float64)
+        positions = self._sample_positions(profile.size) if positions is None else np.asarray(positions)
+        valid = self.valid_mask(profile, positions)
+        if not valid.any():
+            return np.full(self.n_zones, np.nan)
+
+        # Resample valid points onto the grid; grid points far from any valid
+        # sample (interpolated validity below 0.5) do not count
+        np.subtract(self.target, np.interp(self.grid, positions[valid], profile[valid]), out=self._deviation)
+        np.greater_equal(np.interp(self.grid, positions, valid.astype(np.float64)), 0.5, out=self._valid)
+
+        weighted = self.weights @ (self._deviation * self._valid)
+        coverage = self.weights @ self._valid
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(coverage > 0, weighted / coverage, np.nan)
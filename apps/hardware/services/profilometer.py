@@ -1,19 +1,225 @@
 import logging
-import random
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import serial
+
+from apps.hardware.modbus import build_request, expected_response_length, frame_silence, read_frame
 from apps.hardware.models import ProfileConfig
 
 logger = logging.getLogger(__name__)
 
+# Baumer OX100 RS485 defaults (operating manual, "Set up RS485 interface with Modbus RTU")
+DEFAULT_SERIAL_PORT = '/dev/ttyUSB1'
+DEFAULT_BAUDRATE = 19200
+DEFAULT_SLAVE_ID = 1
+DEFAULT_RESPONSE_TIMEOUT = 0.2
+
+# Input registers (FC 04): "All Measurement Values (32 bits)", addresses 200..223
+FC_READ_INPUT_REGISTERS = 0x04
+REG_MEASUREMENTS = 200
+MEASUREMENT_REGISTERS = 24
+
+# Register offsets inside the measurement block
+OFFSET_STATUS = 0
+OFFSET_QUALITY = 1
+OFFSET_VALUES = 3           # Measured values 1..7, Float32, low word first
+MEASURED_VALUE_COUNT = 7
+OFFSET_RATE = 17            # Measurement rate, Float32
+OFFSET_TIMESTAMP_S = 19     # UInt32
+OFFSET_TIMESTAMP_US = 21    # UInt32
+
+STATUS_VALID = 0x0004       # Bit 2: measured values allow for interpretation
+QUALITY_NO_SIGNAL = 2
+
+
 class ProfilometerDriver:
-    def __init__(self):
-        pass
+    """
+    Driver for the Baumer OX100 smart profile sensor over RS485 / Modbus RTU.
+
+    The sensor does not expose raw profile points over Modbus; it publishes
+    the results of up to 7 measurement tools configured in its web interface.
+    Configure those tools as heights at fixed positions across the nozzle and
+    the 7 values form the sampled profile. One FC 04 read of the 24-register
+    measurement block returns all of them plus status, rate and timestamp,
+    decoded in place into a preallocated NumPy buffer.
+    """
+
+    def __init__(self, port=DEFAULT_SERIAL_PORT, baudrate=DEFAULT_BAUDRATE,
+                 slave_id=DEFAULT_SLAVE_ID, response_timeout=DEFAULT_RESPONSE_TIMEOUT):
+        self.port = port
+        self.baudrate = baudrate
+        self.slave_id = slave_id
+        self.response_timeout = response_timeout
+        self.frame_silence = frame_silence(baudrate)
+        self.serial = None
+        self._request = build_request(slave_id, FC_READ_INPUT_REGISTERS, REG_MEASUREMENTS, MEASUREMENT_REGISTERS)
+        self._expected_length = expected_response_length(FC_READ_INPUT_REGISTERS, MEASUREMENT_REGISTERS)
+
+        # Registers are stored as host words; Float32/UInt32 values span two
+        # registers with the less significant word first, so little-endian
+        # views over the word buffer decode them without copies.
+        self._registers = np.zeros(MEASUREMENT_REGISTERS, dtype='<u2')
+        self.profile = self._registers[OFFSET_VALUES:OFFSET_VALUES + 2 * MEASURED_VALUE_COUNT].view('<f4')
+        self._rate = self._registers[OFFSET_RATE:OFFSET_RATE + 2].view('<f4')
+        self._timestamp = self._registers[OFFSET_TIMESTAMP_S:OFFSET_TIMESTAMP_US + 2].view('<u4')
+        self._simulated_profile = np.zeros(MEASURED_VALUE_COUNT, dtype=np.float32)
+
+    def connect(self):
+        """Opens the sensor serial port (8E1, as configured in the OX100)."""
+        try:
+            self.serial = serial.Serial(
+                port=self.port,
+                baudrate=self.baudrate,
+                bytesize=serial.EIGHTBITS,
+                parity=serial.PARITY_EVEN,
+                stopbits=serial.STOPBITS_ONE,
+                timeout=self.frame_silence
+            )
+            logger.info(f"Profilometer connected on {self.port} @ {self.baudrate} baud")
+            return True
+        except serial.SerialException as e:
+            logger.error(f"Could not open profilometer port {self.port}: {e}")
+            return False
+
+    def disconnect(self):
+        if self.serial and self.serial.is_open:
+            self.serial.close()
 
-    def read_value(self):
+    @property
+    def status(self) -> int:
+        return int(self._registers[OFFSET_STATUS])
+
+    @property
+    def quality(self) -> int:
+        return int(self._registers[OFFSET_QUALITY])
+
+    @property
+    def measurement_rate(self) -> float:
+        return float(self._rate[0])
+
+    @property
+    def timestamp(self) -> float:
+        """Sensor timestamp of the last measurement, in seconds."""
+        return int(self._timestamp[0]) + int(self._timestamp[1]) * 1e-6
+
+    def read_measurements(self) -> bool:
+        """
+        Reads the whole measurement block in one Modbus transaction.
+
+        Returns True when a valid frame was decoded into the register buffer.
+        """
+        if not self.serial or not self.serial.is_open:
+            return False
+
+        try:
+            self.serial.reset_input_buffer()
+            self.serial.write(self._request)
+            self.serial.flush()
+            response, crc = read_frame(self.serial, FC_READ_INPUT_REGISTERS,
+                                       self._expected_length, self.response_timeout)
+        except serial.SerialException as e:
+            logger.error(f"Profilometer serial error: {e}")
+            return False
+
+        if crc != 0 or len(response) != self._expected_length or response[0] != self.slave_id:
+            logger.warning("Invalid or missing profilometer response")
+            return False
+
+        # Big-endian Modbus words, byte-swapped straight into the preallocated buffer
+        np.copyto(self._registers, np.frombuffer(response, dtype='>u2', count=MEASUREMENT_REGISTERS, offset=3))
+        return True
+
+    def is_valid(self) -> bool:
+        return bool(self.status & STATUS_VALID) and self.quality != QUALITY_NO_SIGNAL
+
+    def read_profile(self, profile_config=None):
+        """
+        Reads the sampled profile (measured values 1..7).
+
+        Returns a float32 array that is reused by the next read (copy it to
+        keep it), or None when the sensor has no valid measurement.
+        """
+        if profile_config is None:
+            profile_config = ProfileConfig.objects.first()
+
+        if profile_config and profile_config.is_simulated:
+            self._simulated_profile.fill(profile_config.simulated_value)
+            return self._simulated_profile
+
+        if self.read_measurements() and self.is_valid():
+            return self.profile
+        return None
+
+    def read_value(self, profile_config=None):
         """
         Reads the current value from the profilometer.
-        Returns a float.
+        Returns a float (measured value 1), or None without a valid measurement.
+        """
+        if profile_config is None:
+            profile_config = ProfileConfig.objects.first()
+
+        if profile_config and profile_config.is_simulated:
+            return profile_config.simulated_value
+
+        if self.read_measurements() and self.is_valid():
+            return float(self.profile[0])
+
+        logger.warning("No valid profilometer measurement")
+        return None
+
+
+class BackgroundProfileReader:
+    """
+    Acquires profilometer samples on a dedicated worker thread.
+
+    The OX100 and the actuators are on separate serial links, so a sample
+    can be acquired while the actuator commands of the current cycle are on
+    the RS-485 bus. read() returns the sample started during the previous
+    cycle (waiting for it only if it is not finished yet) and immediately
+    starts the next one; the cycle time is then bounded by the slower
+    device instead of the sum of both. The price is one cycle of extra
+    measurement latency.
+
+    Samples are copied into two preallocated buffers used alternately, so
+    the array returned by read() stays untouched while the next acquisition
+    runs (until the following read()).
+    """
+
+    def __init__(self, driver: ProfilometerDriver):
+        self.driver = driver
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='profilometer')
+        self._buffers = np.zeros((2, MEASURED_VALUE_COUNT), dtype=np.float32)
+        self._next_buffer = 0
+        self._pending = None
+
+    def _acquire(self, profile_config, out):
+        profile = self.driver.read_profile(profile_config)
+        if profile is None:
+            return None
+        np.copyto(out, profile)
+        return out
+
+    def _submit(self, profile_config):
+        out = self._buffers[self._next_buffer]
+        self._next_buffer ^= 1
+        self._pending = self._executor.submit(self._acquire, profile_config, out)
+
+    def read(self, profile_config):
+        """
+        Returns the sample acquired since the previous call (None when the
+        sensor had no valid measurement) and starts the next acquisition.
         """
-        # TODO: Implement real driver logic here (Serial read)
-        # For now, we return 0.0 or a fixed value as the "real" driver is not connected
-        logger.warning("Real Profilometer driver not implemented - returning 0.0")
-        return 0.0
+        if self._pending is None:
+            self._submit(profile_config)
+        profile = self._pending.result()
+        self._submit(profile_config)
+        return profile
+
+    def reset(self):
+        """Drops the in-flight sample (e.g. after a pause, when it would be stale)."""
+        self._pending = None
+
+    def close(self):
+        self._pending = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,161 @@
+import time
+
+
+class PhaseTiming:
+    """Running duration statistics of one phase of the control cycle (seconds)."""
+
+    __slots__ = ('count', 'total', 'max', 'last')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, duration: float):
+        self.count += 1
+        self.total += duration
+        self.last = duration
+        if duration > self.max:
+            self.max = duration
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+
+class FixedRateScheduler:
+    """
+    Deadline-based scheduler for a fixed-rate loop on the monotonic clock.
+
+    Cycle k is due at start + k * period, whatever the previous cycles took,
+    so the rate does not drift with the work done in each cycle. When a cycle
+    overruns the next one starts immediately; if whole periods were missed
+    they are skipped (counted, not replayed) and the loop re-joins the
+    original grid.
+
+    Besides overruns it records start jitter (actual start - deadline) and
+    the duration of each named phase, marked with lap(). Phases that might
+    not fit in the remaining budget can be skipped by the caller using
+    time_left() and estimate().
+
+    With a `metrics` recorder (metrics.MetricsRecorder) cycles, overruns,
+    sleeps, phases and skipped phases are also counted there.
+    """
+
+    def __init__(self, period: float, clock=time.monotonic, sleep=time.sleep, metrics=None):
+        self.period = period
+        self.clock = clock
+        self.sleep = sleep
+        self.metrics = metrics
+        self.phases = {}
+        self.reset()
+
+    def reset(self):
+        """Restarts the deadline grid and clears the statistics (e.g. after a pause)."""
+        self.deadline = None
+        self.cycle_start = None
+        self._mark = None
+        self.cycles = 0
+        self.overruns = 0
+        self.skipped_cycles = 0
+        self.skipped_phases = {}
+        self.jitter_max = 0.0
+        self._jitter_total = 0.0
+        self.phases.clear()
+
+    def set_period(self, period: float):
+        if period != self.period:
+            self.period = period
+            self.deadline = None
+
+    def wait(self) -> bool:
+        """
+        Blocks until the next cycle is due.
+
+        Returns:
+            True when the cycle starts on time, False after an overrun
+        """
+        now = self.clock()
+        on_time = True
+        missed = 0
+        slept = 0.0
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.period
+            lateness = now - self.deadline
+            if lateness > 0:
+                on_time = False
+                self.overruns += 1
+                missed = int(lateness // self.period)
+                if missed:
+                    self.skipped_cycles += missed
+                    self.deadline += missed * self.period
+            else:
+                self.sleep(-lateness)
+                slept = self.clock() - now
+                now += slept
+
+        jitter = now - self.deadline
+        self._jitter_total += jitter
+        if jitter > self.jitter_max:
+            self.jitter_max = jitter
+        self.cycles += 1
+        self.cycle_start = self._mark = now
+
+        metrics = self.metrics
+        if metrics is not None:
+            metrics.count('cycles')
+            metrics.phase('sleep', slept)
+            if not on_time:
+                metrics.count('overruns')
+                metrics.count('skipped_cycles', missed)
+        return on_time
+
+    def lap(self, phase: str) -> float:
+        """Records the time since the previous lap (or the cycle start) as `phase`."""
+        now = self.clock()
+        duration = now - self._mark
+        self._mark = now
+        timing = self.phases.get(phase)
+        if timing is None:
+            timing = self.phases[phase] = PhaseTiming()
+        timing.add(duration)
+        if self.metrics is not None:
+            self.metrics.phase(phase, duration)
+        return duration
+
+    def skip(self, phase: str):
+        """Counts a phase left out to keep the cycle within its period."""
+        self.skipped_phases[phase] = self.skipped_phases.get(phase, 0) + 1
+        self._mark = self.clock()
+        if self.metrics is not None:
+            self.metrics.skipped(phase)
+
+    def time_left(self) -> float:
+        """Remaining budget of the current cycle (negative when already late)."""
+        return self.deadline + self.period - self.clock()
+
+    def estimate(self, phase: str) -> float:
+        """Worst observed duration of a phase, 0 when it never ran."""
+        timing = self.phases.get(phase)
+        return timing.max if timing else 0.0
+
+    @property
+    def jitter_mean(self) -> float:
+        return self._jitter_total / self.cycles if self.cycles else 0.0
+
+    def summary(self) -> dict:
+        return {
+            'cycles': self.cycles,
+            'overruns': self.overruns,
+            'skipped_cycles': self.skipped_cycles,
+            'skipped_phases': dict(self.skipped_phases),
+            'jitter_mean_ms': self.jitter_mean * 1000.0,
+            'jitter_max_ms': self.jitter_max * 1000.0,
+            'phases_ms': {
+                name: {'mean': t.mean * 1000.0, 'max': t.max * 1000.0, 'last': t.last * 1000.0}
+                for name, t in self.phases.items()
+            },
+        }
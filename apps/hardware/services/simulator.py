@@ -0,0 +1,534 @@
+import bisect
+import logging
+import math
+import os
+import select
+import struct
+import termios
+import threading
+import time
+import tty
+
+import numpy as np
+
+from apps.hardware.modbus import BAUD_RATE_CODES, BITS_PER_CHAR, calculate_crc16, crc16, frame_silence
+from .mighty_zap import (
+    ADDR_BAUD_RATE,
+    ADDR_FIRMWARE_VERSION,
+    ADDR_GOAL_POSITION,
+    ADDR_ID,
+    ADDR_MODEL_NUMBER,
+    ADDR_PRESENT_CURRENT,
+    ADDR_PRESENT_MOTOR_OP_MODE,
+    ADDR_PRESENT_POSITION,
+    BROADCAST_ID,
+    DEFAULT_BAUDRATE,
+    FC_MEMORY_RESET,
+    FC_RESTART,
+)
+from .profilometer import (
+    DEFAULT_BAUDRATE as PROFILOMETER_BAUDRATE,
+    DEFAULT_SLAVE_ID as PROFILOMETER_SLAVE_ID,
+    FC_READ_INPUT_REGISTERS,
+    MEASURED_VALUE_COUNT,
+    MEASUREMENT_REGISTERS,
+    OFFSET_QUALITY,
+    OFFSET_RATE,
+    OFFSET_STATUS,
+    OFFSET_TIMESTAMP_S,
+    OFFSET_VALUES,
+    REG_MEASUREMENTS,
+    STATUS_VALID,
+)
+
+logger = logging.getLogger(__name__)
+
+# Modbus exception codes
+ILLEGAL_FUNCTION = 0x01
+ILLEGAL_DATA_ADDRESS = 0x02
+ILLEGAL_DATA_VALUE = 0x03
+
+REQUEST_LENGTH = 8          # Every request used here (03, 04, 06, F6, F8) is 8 bytes
+DEFAULT_TURNAROUND = 0.0005 # Device processing time before the reply starts (s)
+
+# Simulated MightyZAP
+SIMULATED_MODEL_NUMBER = 0x0C1F
+SIMULATED_FIRMWARE_VERSION = 20
+DEFAULT_BAUD_CODE = 0x20    # 57600, factory default
+DEFAULT_MAX_SPEED = 2000.0  # counts/s
+DEFAULT_ACCELERATION = 20000.0  # counts/s^2
+START_COMPLIANCE_MARGIN = 7 # Manual defaults (counts)
+END_COMPLIANCE_MARGIN = 2
+IDLE_CURRENT = 30           # mA
+MOVING_CURRENT = 250        # mA at full speed
+RESTART_TIME = 0.3          # s without answering after F6/F8
+MOTION_STEP = 0.001         # Integration step of the motion model (s)
+
+BAUD_CODES = {baudrate: code for code, baudrate in BAUD_RATE_CODES.items()}
+TERMIOS_BAUDRATES = {getattr(termios, f'B{baudrate}'): baudrate
+                     for baudrate in BAUD_CODES if hasattr(termios, f'B{baudrate}')}
+
+
+def char_time(baudrate) -> float:
+    """Time one character occupies the line (s)."""
+    return BITS_PER_CHAR / baudrate
+
+
+class SimulatedSlave:
+    """
+    Base of the simulated devices: Modbus RTU request decoding and replies.
+
+    Subclasses implement read_registers / write_register / special; they
+    return None for an illegal address and raise ValueError for an illegal
+    value, which turn into Modbus exception replies.
+    """
+
+    def __init__(self, slave_id, baudrate, turnaround=DEFAULT_TURNAROUND):
+        self.slave_id = slave_id
+        self.baudrate = baudrate
+        self.turnaround = turnaround
+        self.online = True          # False: never answers (dead device / broken wire)
+        self.crc_error_rate = 0.0   # Fraction of replies corrupted on the line
+        self._offline_until = 0.0
+
+    def listening(self, baudrate, now) -> bool:
+        return self.online and baudrate == self.baudrate and now >= self._offline_until
+
+    def handle(self, frame: bytes, now: float):
+        """Executes a request (CRC already checked); returns the reply without CRC, or None."""
+        slave_id, function_code, address, data = struct.unpack('>BBHH', frame[:6])
+        try:
+            if function_code in (0x03, 0x04) and self.reads(function_code):
+                values = self.read_registers(address, data, now)
+                if values is None:
+                    return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+                return struct.pack(f'>BBB{len(values)}H', self.slave_id, function_code, 2 * len(values), *values)
+            if function_code == 0x06 and self.writes():
+                if not self.write_register(address, data, now):
+                    return self._exception(function_code, ILLEGAL_DATA_ADDRESS)
+                return frame[:6]
+            if self.special(function_code, data, now):
+                return None  # Special functions restart the device without replying
+        except ValueError:
+            return self._exception(function_code, ILLEGAL_DATA_VALUE)
+        return self._exception(function_code, ILLEGAL_FUNCTION)
+
+    def _exception(self, function_code, code):
+        return bytes([self.slave_id, function_code | 0x80, code])
+
+    def reads(self, function_code) -> bool:
+        return False
+
+    def writes(self) -> bool:
+        return False
+
+    def read_registers(self, address, count, now):
+        return None
+
+    def write_register(self, address, value, now) -> bool:
+        return False
+
+    def special(self, function_code, data, now) -> bool:
+        return False
+
+    def restart(self, now):
+        self._offline_until = now + RESTART_TIME
+
+
+class SimulatedActuator(SimulatedSlave):
+    """
+    MightyZAP linear actuator on the simulated bus.
+
+    Motion model: the rod accelerates towards the goal position at
+    `acceleration`, limited to `max_speed` and to the speed that still lets
+    it stop at the goal, and settles inside the end compliance margin; goals
+    closer than the start margin to a settled rod do not move it, as on the
+    real actuator. The current is an idle current plus a share proportional
+    to the speed. The state is integrated lazily up to the time of each
+    request, so no thread is needed.
+
+    Registers follow the driver's address map; ID and baud rate are stored
+    at once but only take effect after a restart (F8 / F6). With
+    `block_reads` off, reads touching the undefined registers between
+    Goal Position and Motor Operating Mode get an illegal address
+    exception, like firmware that rejects the state block.
+    """
+
+    def __init__(self, slave_id, baudrate=DEFAULT_BAUDRATE, position=2048, max_speed=DEFAULT_MAX_SPEED,
+                 acceleration=DEFAULT_ACCELERATION, turnaround=DEFAULT_TURNAROUND):
+        super().__init__(slave_id, baudrate, turnaround)
+        self.max_speed = max_speed
+        self.acceleration = acceleration
+        self.position = float(position)
+        self.goal = int(position)
+        self.velocity = 0.0
+        self.moving = False
+        self.updated_at = None
+        self.id_register = slave_id
+        self.baud_register = BAUD_CODES.get(baudrate, DEFAULT_BAUD_CODE)
+        self.block_reads = True
+        self._lock = threading.Lock()
+
+    @property
+    def current(self) -> int:
+        return int(IDLE_CURRENT + MOVING_CURRENT * abs(self.velocity) / self.max_speed)
+
+    def update(self, now):
+        """Advances the motion model to `now`."""
+        with self._lock:
+            if self.updated_at is None:
+                self.updated_at = now
+            if now <= self.updated_at:
+                return
+            elapsed, self.updated_at = now - self.updated_at, now
+            while elapsed > 0 and self._step(min(elapsed, MOTION_STEP)):
+                elapsed -= MOTION_STEP
+
+    def _step(self, dt) -> bool:
+        distance = self.goal - self.position
+        if not self.moving:
+            if abs(distance) < START_COMPLIANCE_MARGIN:
+                return False
+            self.moving = True
+        if abs(distance) <= END_COMPLIANCE_MARGIN:
+            self.velocity = 0.0
+            self.moving = False
+            return False
+
+        # Fastest speed from which the rod can still stop at the goal
+        target = math.copysign(min(self.max_speed, math.sqrt(2.0 * self.acceleration * abs(distance))), distance)
+        change = self.acceleration * dt
+        self.velocity += max(-change, min(change, target - self.velocity))
+        step = self.velocity * dt
+        self.position = self.goal if abs(step) >= abs(distance) and step * distance > 0 else self.position + step
+        return True
+
+    def reads(self, function_code):
+        return function_code == 0x03
+
+    def writes(self):
+        return True
+
+    def read_registers(self, address, count, now):
+        self.update(now)
+        registers = {
+            ADDR_MODEL_NUMBER: SIMULATED_MODEL_NUMBER,
+            ADDR_FIRMWARE_VERSION: SIMULATED_FIRMWARE_VERSION,
+            ADDR_ID: self.id_register,
+            ADDR_BAUD_RATE: self.baud_register,
+            ADDR_GOAL_POSITION: self.goal,
+            ADDR_PRESENT_POSITION: int(round(self.position)),
+            ADDR_PRESENT_CURRENT: self.current,
+            ADDR_PRESENT_MOTOR_OP_MODE: int(self.moving),
+        }
+        block = range(ADDR_GOAL_POSITION, ADDR_PRESENT_MOTOR_OP_MODE + 1) if self.block_reads else ()
+        addresses = range(address, address + count)
+        if not count or any(a not in registers and a not in block for a in addresses):
+            return None
+        return [registers.get(a, 0) for a in addresses]
+
+    def write_register(self, address, value, now):
+        if address == ADDR_GOAL_POSITION:
+            if value > 4095:
+                raise ValueError(value)
+            self.update(now)
+            self.goal = value
+        elif address == ADDR_ID:
+            if not 1 <= value <= 247:
+                raise ValueError(value)
+            self.id_register = value
+        elif address == ADDR_BAUD_RATE:
+            if value not in BAUD_RATE_CODES:
+                raise ValueError(value)
+            self.baud_register = value
+        else:
+            return False
+        return True
+
+    def special(self, function_code, data, now):
+        if function_code == FC_MEMORY_RESET:
+            # Option bit 0 keeps the baud rate, bit 1 keeps the ID
+            if not data & 0x01:
+                self.baud_register = DEFAULT_BAUD_CODE
+            if not data & 0x02:
+                self.id_register = 1
+        elif function_code != FC_RESTART:
+            return False
+        self.restart(now)
+        return True
+
+    def restart(self, now):
+        super().restart(now)
+        self.slave_id = self.id_register
+        self.baudrate = BAUD_RATE_CODES[self.baud_register]
+
+
+class SimulatedProfilometer(SimulatedSlave):
+    """
+    Baumer OX100 on the simulated bus: answers the FC 04 read of the
+    measurement block with a profile that follows the actuator positions.
+
+    The 7 measured values are base + disturbance + gain * (position - 2048)
+    averaged over the actuators with Gaussian weights around each sample
+    point, the actuators being spread evenly across the nozzle in the given
+    order. `disturbance` is a fixed per-point offset (the error the loop has
+    to correct) and `noise` the standard deviation of the measurement noise.
+    """
+
+    def __init__(self, actuators, slave_id=PROFILOMETER_SLAVE_ID, baudrate=PROFILOMETER_BAUDRATE,
+                 base=10.0, gain=0.01, disturbance=None, noise=0.0, rate=100.0, seed=None,
+                 turnaround=DEFAULT_TURNAROUND):
+        super().__init__(slave_id, baudrate, turnaround)
+        self.actuators = list(actuators)
+        self.base = base
+        self.gain = gain
+        self.disturbance = np.zeros(MEASURED_VALUE_COUNT) if disturbance is None else np.asarray(disturbance, dtype=np.float64)
+        self.noise = noise
+        self.rate = rate
+        self.rng = np.random.default_rng(seed)
+
+        n = len(self.actuators)
+        points = np.linspace(0.0, 1.0, MEASURED_VALUE_COUNT)
+        centres = (np.arange(n) + 0.5) / max(n, 1)
+        weights = np.exp(-0.5 * ((points[:, None] - centres[None, :]) * max(n, 1) / 0.6) ** 2)
+        self.weights = weights / weights.sum(axis=1, keepdims=True) if n else weights
+        self._registers = np.zeros(MEASUREMENT_REGISTERS, dtype='<u2')
+
+    def profile(self, now) -> np.ndarray:
+        positions = np.empty(len(self.actuators))
+        for i, actuator in enumerate(self.actuators):
+            actuator.update(now)
+            positions[i] = actuator.position
+        profile = self.base + self.disturbance + self.gain * (self.weights @ (positions - 2048.0))
+        if self.noise:
+            profile = profile + self.rng.normal(0.0, self.noise, MEASURED_VALUE_COUNT)
+        return profile
+
+    def reads(self, function_code):
+        return function_code == FC_READ_INPUT_REGISTERS
+
+    def read_registers(self, address, count, now):
+        first = address - REG_MEASUREMENTS
+        if first < 0 or count == 0 or first + count > MEASUREMENT_REGISTERS:
+            return None
+        registers = self._registers
+        registers[OFFSET_STATUS] = STATUS_VALID
+        registers[OFFSET_QUALITY] = 0
+        registers[OFFSET_VALUES:OFFSET_VALUES + 2 * MEASURED_VALUE_COUNT].view('<f4')[:] = self.profile(now)
+        registers[OFFSET_RATE:OFFSET_RATE + 2].view('<f4')[0] = self.rate
+        seconds, fraction = divmod(now, 1.0)
+        registers[OFFSET_TIMESTAMP_S:OFFSET_TIMESTAMP_S + 4].view('<u4')[:] = (int(seconds), int(fraction * 1e6))
+        return registers[first:first + count].tolist()
+
+
+class SimulatedBus:
+    """
+    A simulated RS-485 line: routes request frames to the devices listening
+    at the line's baud rate and returns their replies with CRC.
+
+    Requests with a bad CRC are ignored by every device, broadcasts (ID 0)
+    are executed by all devices without a reply.
+    """
+
+    def __init__(self, devices, seed=None):
+        self.devices = list(devices)
+        self.rng = np.random.default_rng(seed)
+        self._lock = threading.Lock()
+
+    def process(self, frame: bytes, baudrate, now):
+        """
+        Returns:
+            Tuple (reply with CRC or b'', device turnaround in s)
+        """
+        if len(frame) < REQUEST_LENGTH or crc16(frame[:REQUEST_LENGTH]) != 0:
+            return b'', 0.0
+        slave_id = frame[0]
+        with self._lock:
+            for device in self.devices:
+                if not device.listening(baudrate, now):
+                    continue
+                if slave_id == BROADCAST_ID:
+                    device.handle(frame, now)
+                elif device.slave_id == slave_id:
+                    reply = device.handle(frame, now)
+                    if reply is None:
+                        return b'', 0.0
+                    reply = bytearray(reply + calculate_crc16(reply))
+                    if device.crc_error_rate and self.rng.random() < device.crc_error_rate:
+                        reply[-1] ^= 0xFF
+                    return bytes(reply), device.turnaround
+        return b'', 0.0
+
+
+class SimulatedSerial:
+    """
+    In-process stand-in for a pyserial port on a SimulatedBus.
+
+    Follows the timing of the line: each character takes 11 bits at
+    `baudrate`, flush() returns when the request has been sent and the
+    reply bytes become readable one character time apart after the device
+    turnaround. read() honours `timeout` like pyserial. `clock` and `sleep`
+    can be replaced to run on simulated time.
+    """
+
+    def __init__(self, bus, baudrate, timeout=None, port='sim', clock=time.monotonic, sleep=time.sleep):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.port = port
+        self.clock = clock
+        self.sleep = sleep
+        self.is_open = True
+        self._rx = bytearray()
+        self._rx_times = []
+        self._tx_end = 0.0
+
+    def open(self):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    @property
+    def in_waiting(self) -> int:
+        return bisect.bisect_right(self._rx_times, self.clock())
+
+    def reset_input_buffer(self):
+        n = self.in_waiting
+        del self._rx[:n], self._rx_times[:n]
+
+    def reset_output_buffer(self):
+        pass
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        character = char_time(self.baudrate)
+        self._tx_end = max(self.clock(), self._tx_end) + len(data) * character
+        reply, turnaround = self.bus.process(data, self.baudrate, self._tx_end)
+        if reply:
+            start = self._tx_end + turnaround
+            self._rx += reply
+            self._rx_times.extend(start + (np.arange(len(reply)) + 1) * character)
+        return len(data)
+
+    def flush(self):
+        wait = self._tx_end - self.clock()
+        if wait > 0:
+            self.sleep(wait)
+
+    def read(self, size=1) -> bytes:
+        now = self.clock()
+        deadline = now + (self.timeout if self.timeout is not None else 0.0)
+        ready = self._rx_times[size - 1] if len(self._rx_times) >= size else math.inf
+        wake = min(ready, deadline)
+        if wake > now:
+            self.sleep(wake - now)
+        n = min(size, bisect.bisect_right(self._rx_times, wake))
+        data = bytes(self._rx[:n])
+        del self._rx[:n], self._rx_times[:n]
+        return data
+
+
+class PtyBridge:
+    """
+    Serves a SimulatedBus on a pseudo-terminal, so drivers in another
+    process (run_control) open `port` as if it were the RS-485 adapter.
+
+    The line baud rate is the one the client configured on the pty; replies
+    are written after the time the request, the device turnaround and the
+    reply would take on a real line at that rate.
+    """
+
+    def __init__(self, bus, baudrate):
+        self.bus = bus
+        self.baudrate = baudrate
+        self.master, self.slave = os.openpty()
+        tty.setraw(self.slave)
+        self.port = os.ttyname(self.slave)
+        self._stop = threading.Event()
+        self._thread = None
+
+    def line_baudrate(self) -> int:
+        try:
+            return TERMIOS_BAUDRATES.get(termios.tcgetattr(self.slave)[5], self.baudrate)
+        except termios.error:
+            return self.baudrate
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve, name=f'pty {self.port}', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        os.close(self.master)
+        os.close(self.slave)
+
+    def serve(self):
+        buffer = bytearray()
+        while not self._stop.is_set():
+            readable, _, _ = select.select([self.master], [], [], frame_silence(self.baudrate))
+            if not readable:
+                buffer.clear()  # Silence ends any partial frame
+                continue
+            buffer += os.read(self.master, 256)
+            baudrate = self.line_baudrate()  # As set by the client when it opened the port
+
+            while len(buffer) >= REQUEST_LENGTH:
+                frame = bytes(buffer[:REQUEST_LENGTH])
+                if crc16(frame) != 0:
+                    del buffer[0]  # Resynchronise on the next byte
+                    continue
+                del buffer[:REQUEST_LENGTH]
+                character = char_time(baudrate)
+                received = time.monotonic() + REQUEST_LENGTH * character
+                reply, turnaround = self.bus.process(frame, baudrate, received)
+                if reply:
+                    delay = received + turnaround + len(reply) * character - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                    os.write(self.master, reply)
+
+
+class HardwareSimulator:
+    """
+    The two simulated lines of the machine: the MightyZAP actuators and
+    the OX100 profilometer, whose profile follows the actuators.
+
+    attach() puts the drivers on in-process serial stand-ins; ptys() serves
+    both lines on pseudo-terminals for drivers in another process.
+    """
+
+    def __init__(self, actuator_ids=(1, 2, 3), baudrate=DEFAULT_BAUDRATE,
+                 profilometer_baudrate=PROFILOMETER_BAUDRATE, seed=None, **profile_options):
+        self.baudrate = baudrate
+        self.profilometer_baudrate = profilometer_baudrate
+        self.actuators = [SimulatedActuator(actuator_id, baudrate) for actuator_id in sorted(actuator_ids)]
+        self.profilometer = SimulatedProfilometer(self.actuators, baudrate=profilometer_baudrate,
+                                                  seed=seed, **profile_options)
+        self.actuator_bus = SimulatedBus(self.actuators, seed=seed)
+        self.profilometer_bus = SimulatedBus([self.profilometer], seed=seed)
+
+    def actuator(self, actuator_id):
+        return next(actuator for actuator in self.actuators if actuator.slave_id == actuator_id)
+
+    def attach(self, driver=None, profilometer_driver=None, clock=time.monotonic, sleep=time.sleep):
+        """Connects a MightyZapDriver and/or a ProfilometerDriver to the simulated lines."""
+        if driver is not None:
+            driver.simulated = False
+            driver.serial = SimulatedSerial(self.actuator_bus, driver.baudrate, driver.frame_silence,
+                                            port='sim://actuators', clock=clock, sleep=sleep)
+        if profilometer_driver is not None:
+            profilometer_driver.serial = SimulatedSerial(
+                self.profilometer_bus, profilometer_driver.baudrate, profilometer_driver.frame_silence,
+                port='sim://profilometer', clock=clock, sleep=sleep)
+
+    def ptys(self):
+        """Returns started PtyBridges (actuators, profilometer)."""
+        bridges = (PtyBridge(self.actuator_bus, self.baudrate),
+                   PtyBridge(self.profilometer_bus, self.profilometer_baudrate))
+        for bridge in bridges:
+            bridge.start()
+        return bridges
@@ -0,0 +1,167 @@
+import json
+import logging
+import os
+import struct
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 1024         # Records kept in memory
+DEFAULT_BATCH_SIZE = 128        # Records per file write
+DEFAULT_MAX_FILE_BYTES = 16 * 1024 * 1024
+DEFAULT_MAX_FILES = 8           # ~128 MiB in total; a 10 Hz day with 3 actuators is ~33 MiB
+
+FILE_MAGIC = b'TLM1'
+FILE_PREFIX = 'telemetry-'
+FILE_SUFFIX = '.bin'
+# Header: magic, length of the JSON metadata that follows
+_HEADER = struct.Struct('<4sI')
+
+NO_VALUE = -1                   # Actuator fields without data this cycle
+
+
+def telemetry_dtype(n_actuators: int) -> np.dtype:
+    """Record layout of one control cycle (packed, little-endian)."""
+    return np.dtype([
+        ('timestamp', '<f8'),                       # Unix time (s)
+        ('cycle_time', '<f4'),                      # Duration of the cycle (s)
+        ('target', '<f4'),
+        ('measured', '<f4'),                        # Mean of the valid profile points
+        ('commanded', '<i2', (n_actuators,)),       # Goal position sent, NO_VALUE if none
+        ('position', '<i2', (n_actuators,)),        # Position read back
+        ('current', '<i2', (n_actuators,)),
+    ])
+
+
+def read_telemetry(path) -> np.ndarray:
+    """
+    Loads a telemetry file as a structured array (memory-mapped, read-only).
+
+    Fields: see telemetry_dtype(); the actuator Modbus IDs of the columns are
+    in `read_telemetry_header(path)['actuators']`.
+    """
+    header, offset = _read_header(path)
+    dtype = telemetry_dtype(len(header['actuators']))
+    if os.path.getsize(path) - offset < dtype.itemsize:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', offset=offset)
+
+
+def read_telemetry_header(path) -> dict:
+    return _read_header(path)[0]
+
+
+def _read_header(path):
+    with open(path, 'rb') as f:
+        magic, length = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != FILE_MAGIC:
+            raise ValueError(f"{path} is not a telemetry file")
+        return json.loads(f.read(length)), _HEADER.size + length
+
+
+class TelemetryRecorder:
+    """
+    Per-cycle telemetry kept in a preallocated ring buffer and persisted in batches.
+
+    record() only stores a handful of values into the next slot of a
+    structured NumPy array: no allocation, no I/O. Every `batch_size`
+    records the new slice is appended to the current file with a single
+    write. Files are raw records after a small JSON header, so they can be
+    memory-mapped back with read_telemetry(). When a file reaches
+    `max_file_bytes` a new one is started and the oldest files beyond
+    `max_files` are deleted, bounding the disk usage.
+    """
+
+    def __init__(self, directory, actuator_ids, capacity=DEFAULT_CAPACITY, batch_size=DEFAULT_BATCH_SIZE,
+                 max_file_bytes=DEFAULT_MAX_FILE_BYTES, max_files=DEFAULT_MAX_FILES):
+        if capacity % batch_size:
+            raise ValueError("capacity must be a multiple of batch_size")
+        self.directory = str(directory)
+        self.actuator_ids = list(actuator_ids)
+        self.batch_size = batch_size
+        self.max_file_bytes = max_file_bytes
+        self.max_files = max_files
+        self.buffer = np.zeros(capacity, dtype=telemetry_dtype(len(self.actuator_ids)))
+        self.count = 0              # Records ever stored
+        self._flushed = 0           # Records already written to disk
+        self._file = None
+        self._file_size = 0
+        self.path = None
+
+    def record(self, timestamp, cycle_time, target, measured, commanded, position, current):
+        """Stores one cycle. Actuator arguments are sequences in actuator_ids order."""
+        row = self.buffer[self.count % self.buffer.size]
+        row['timestamp'] = timestamp
+        row['cycle_time'] = cycle_time
+        row['target'] = target
+        row['measured'] = measured
+        row['commanded'] = commanded
+        row['position'] = position
+        row['current'] = current
+        self.count += 1
+        if self.count - self._flushed >= self.batch_size:
+            self.flush()
+
+    def recent(self, n=None) -> np.ndarray:
+        """Copy of the last n records (all those still in memory by default), oldest first."""
+        available = min(self.count, self.buffer.size)
+        n = available if n is None else min(n, available)
+        end = self.count % self.buffer.size
+        return np.roll(self.buffer, -end)[self.buffer.size - n:] if n else self.buffer[:0].copy()
+
+    def flush(self):
+        """Appends the records not yet on disk to the current file."""
+        pending = self.count - self._flushed
+        if not pending:
+            return
+        if pending > self.buffer.size:
+            logger.warning(f"Telemetry ring overflow: {pending - self.buffer.size} records lost")
+            self._flushed = self.count - self.buffer.size
+            pending = self.buffer.size
+
+        start = self._flushed % self.buffer.size
+        end = start + pending
+        try:
+            if self._file is None or self._file_size >= self.max_file_bytes:
+                self._rotate()
+            if end <= self.buffer.size:
+                self.buffer[start:end].tofile(self._file)
+            else:
+                self.buffer[start:].tofile(self._file)
+                self.buffer[:end - self.buffer.size].tofile(self._file)
+            self._file.flush()
+            self._file_size += pending * self.buffer.itemsize
+        except OSError as e:
+            logger.warning(f"Telemetry write failed, {pending} records dropped: {e}")
+        self._flushed = self.count
+
+    def close(self):
+        self.flush()
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def _rotate(self):
+        if self._file:
+            self._file.close()
+        os.makedirs(self.directory, exist_ok=True)
+        name = f"{FILE_PREFIX}{time.strftime('%Y%m%d-%H%M%S')}-{self.count:010d}{FILE_SUFFIX}"
+        self.path = os.path.join(self.directory, name)
+        header = json.dumps({'actuators': self.actuator_ids, 'created': time.time()}).encode()
+        self._file = open(self.path, 'ab')
+        self._file.write(_HEADER.pack(FILE_MAGIC, len(header)) + header)
+        self._file_size = self._file.tell()
+        self._prune()
+
+    def _prune(self):
+        files = sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(FILE_PREFIX) and name.endswith(FILE_SUFFIX)
+        )
+        for name in files[:max(0, len(files) - self.max_files)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError as e:
+                logger.warning(f"Could not remove old telemetry file {name}: {e}")
@@ -0,0 +1,84 @@
+import numpy as np
+
+# Weight of the newest sample in the running per-write bus time estimate
+WRITE_COST_SMOOTHING = 0.1
+
+
+class WriteFilter:
+    """
+    Suppresses actuator writes that would not change anything.
+
+    A goal is not sent when it is within `deadband` counts of the last goal
+    the actuator acknowledged, or when its zone error is already within the
+    profile tolerance. Every actuator is still written at least once per
+    `refresh_interval`, so a lost or overwritten goal is corrected.
+
+    Keeps counters of sent and suppressed writes and a running estimate of
+    the bus time of one write, giving the bus time saved.
+    """
+
+    def __init__(self, actuator_ids):
+        self.actuator_ids = list(actuator_ids)
+        size = len(self.actuator_ids)
+        self.last_goal = np.full(size, np.nan)
+        self.last_sent = np.full(size, -np.inf)
+        self.sent = 0
+        self.suppressed = 0
+        self.write_cost = 0.0  # s per write
+
+    def filter(self, goals: dict, errors, deadband, tolerance, refresh_interval, now) -> dict:
+        """
+        Args:
+            goals: {modbus_id: goal} computed this cycle
+            errors: Zone errors, in actuator_ids order
+            deadband: Counts
+            tolerance: Profile units
+            refresh_interval: s
+            now: Monotonic time
+
+        Returns:
+            The subset of `goals` that has to be written
+        """
+        goal = np.array([goals.get(actuator_id, np.nan) for actuator_id in self.actuator_ids])
+        pending = ~np.isnan(goal)
+        with np.errstate(invalid='ignore'):
+            unchanged = np.abs(goal - self.last_goal) <= deadband
+            in_tolerance = np.abs(np.asarray(errors, dtype=np.float64)) <= tolerance
+        due = now - self.last_sent >= refresh_interval
+        send = pending & (due | ~(unchanged | in_tolerance))
+
+        self.suppressed += int(pending.sum() - send.sum())
+        return {self.actuator_ids[i]: goals[self.actuator_ids[i]] for i in np.flatnonzero(send)}
+
+    def record(self, sent: dict, results: dict, duration, now):
+        """
+        Registers the outcome of the writes returned by filter().
+
+        Args:
+            sent: {modbus_id: goal} that was written
+            results: {modbus_id: bool} from set_positions
+            duration: Bus time of the write phase (s)
+            now: Monotonic time
+        """
+        if not sent:
+            return
+        self.sent += len(sent)
+        cost = duration / len(sent)
+        self.write_cost = cost if not self.write_cost else (
+            self.write_cost + WRITE_COST_SMOOTHING * (cost - self.write_cost))
+        for i, actuator_id in enumerate(self.actuator_ids):
+            if results.get(actuator_id):
+                self.last_goal[i] = sent[actuator_id]
+                self.last_sent[i] = now
+
+    @property
+    def saved_time(self) -> float:
+        """Estimated bus time saved by the suppressed writes (s)."""
+        return self.suppressed * self.write_cost
+
+    def summary(self) -> dict:
+        return {
+            'sent': self.sent,
+            'suppressed': self.suppressed,
+            'saved_ms': round(self.saved_time * 1000.0, 1),
+        }
@@ -1,7 +1,79 @@
-from django.test import TestCase
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+from django.test import TestCase, SimpleTestCase
 from apps.hardware.models import ActuatorConfig, ProfileConfig, ControlSettings
+from apps.hardware.modbus import build_request, calculate_crc16, crc16, crc16_bitwise
+from apps.hardware.services.bus import BusWorker, PRIORITY_CONTROL, PRIORITY_DIAGNOSTIC, PRIORITY_UI
+from apps.hardware.services.mighty_zap import MightyZapDriver
+from apps.hardware.services.profilometer import ProfilometerDriver, BackgroundProfileReader
+from apps.hardware.services.profile_analysis import ProfileAnalyzer
+from apps.hardware.services.config_cache import ConfigCache, ConfigSnapshot, touch_version_file
+from apps.hardware.services.control_loop import ControlLoop
+from apps.hardware.services.pid import PIDBank, POSITION_SCALE
+from apps.hardware.services.scheduler import FixedRateScheduler
+from apps.hardware.services.live_state import LiveStateWriter, LiveStateReader, MAX_ACTUATORS
+from apps.hardware.services.metrics import MetricsRecorder, MetricsReader, PHASE_INDEX, COUNTER_INDEX
+from apps.hardware.services.mailbox import CommandMailbox, MAILBOX_SLOTS, PENDING_TIMEOUT, SLOT_DTYPE
+from apps.hardware.services.write_filter import WriteFilter
+from apps.hardware.services.link_stats import (
+    SlaveStats, MIN_TIMEOUT, OUTCOME_OK, OUTCOME_TIMEOUT, RECOVERY_PROBE_EVERY, SUSPECT_AFTER,
+)
+from apps.hardware.services.simulator import HardwareSimulator, DEFAULT_TURNAROUND, IDLE_CURRENT
+from apps.hardware.services import benchmark
+from apps.hardware.services.discovery import CHUNK_IDS, Discovery, scan, sync_actuators
+from apps.hardware.services import bus_config
+from apps.hardware.services.telemetry import NO_VALUE, TelemetryRecorder, read_telemetry, read_telemetry_header
 from django.core.management import call_command
 
+
+def temp_dir(test) -> str:
+    """Diretório temporário removido ao fim do teste."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    return directory.name
+
+
+def with_crc(frame: bytes) -> bytes:
+    return frame + calculate_crc16(frame)
+
+
+class FakeSerial:
+    """Porta serial de teste: entrega as respostas programadas em pedaços."""
+
+    def __init__(self, chunks=()):
+        self.chunks = list(chunks)
+        self.written = []
+        self.is_open = True
+
+    def reset_input_buffer(self):
+        pass
+
+    def reset_output_buffer(self):
+        pass
+
+    def write(self, data):
+        self.written.append(bytes(data))
+
+    def flush(self):
+        pass
+
+    def read(self, size=1):
+        if not self.chunks:
+            time.sleep(0.001)  # Simula o timeout de silêncio
+            return b''
+        chunk = self.chunks.pop(0)
+        if len(chunk) > size:
+            self.chunks.insert(0, chunk[size:])
+            chunk = chunk[:size]
+        return chunk
+
 class HardwareModelTests(TestCase):
     def test_actuator_creation(self):
         actuator = ActuatorConfig.objects.create(name="Test Actuator", modbus_id=1)
@@ -21,3 +93,926 @@ class HardwareModelTests(TestCase):
         self.assertEqual(ActuatorConfig.objects.count(), 3)
 
 
+class MightyZapTransactionTests(SimpleTestCase):
+    def make_driver(self, chunks):
+        driver = MightyZapDriver(response_timeout=0.05)
+        driver.serial = FakeSerial(chunks)
+        return driver
+
+    def test_read_assembles_split_reply(self):
+        reply = with_crc(bytes([1, 0x03, 0x02]) + struct.pack('>H', 2048))
+        driver = self.make_driver([reply[:2], reply[2:5], reply[5:]])
+        start = time.monotonic()
+        self.assertEqual(driver.get_position(1), 2048)
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertEqual(driver.serial.written[0], with_crc(bytes([1, 0x03, 0x00, 0x20, 0x00, 0x01])))
+
+    def test_read_state_uses_single_block_read(self):
+        registers = [1500, 0, 0, 0, 320, 0, 2]  # 0x20 .. 0x26
+        reply = with_crc(bytes([1, 0x03, 14]) + struct.pack('>7H', *registers))
+        driver = self.make_driver([reply])
+        state = driver.read_state(1)
+        self.assertEqual((state.position, state.current, state.op_mode), (1500, 320, 2))
+        self.assertEqual(driver.serial.written, [with_crc(bytes([1, 0x03, 0x00, 0x20, 0x00, 0x07]))])
+
+    def test_group_write_broadcasts_identical_goals(self):
+        driver = self.make_driver([])
+        results = driver.set_positions({1: 2000, 2: 2000, 3: 2000}, broadcast=True)
+        self.assertEqual(results, {1: True, 2: True, 3: True})
+        self.assertEqual(driver.serial.written, [with_crc(bytes([0, 0x06, 0x00, 0x1E, 0x07, 0xD0]))])
+
+    def test_group_write_falls_back_to_unicast(self):
+        echoes = [with_crc(struct.pack('>BBHH', i, 0x06, 0x1E, pos)) for i, pos in ((1, 100), (2, 200))]
+        driver = self.make_driver(echoes)
+        self.assertEqual(driver.set_positions({1: 100, 2: 200}, broadcast=True), {1: True, 2: True})
+        self.assertEqual(driver.serial.written, echoes)
+
+    def test_state_cache_skips_bus_and_is_invalidated_on_error(self):
+        reply = with_crc(bytes([1, 0x03, 14]) + struct.pack('>7H', 1500, 0, 0, 0, 320, 0, 2))
+        driver = self.make_driver([reply])
+        driver.read_state(1)
+        self.assertEqual(driver.read_state(1, max_age=1.0).position, 1500)
+        self.assertEqual(driver.get_position(1, max_age=1.0), 1500)
+        self.assertEqual(len(driver.serial.written), 1)  # Respondido pelo cache
+
+        self.assertIsNone(driver.read_state(1))  # Timeout: invalida o cache
+        self.assertIsNone(driver.cached_state(1, max_age=1.0))
+
+    def test_write_echo_updates_goal_cache(self):
+        echo = with_crc(struct.pack('>BBHH', 2, 0x06, 0x1E, 300))
+        driver = self.make_driver([echo])
+        self.assertTrue(driver.set_position(2, 300))
+        self.assertEqual(driver.cached_goal(2), 300)
+        driver.set_positions({2: 400, 3: 400}, broadcast=True)  # Broadcast não tem eco
+        self.assertIsNone(driver.cached_goal(2))
+
+    def test_exception_reply_is_short_frame(self):
+        driver = self.make_driver([with_crc(bytes([1, 0x83, 0x02]))])
+        self.assertEqual(driver._send_modbus_command(1, 0x03, 0x20, 1), b'')
+        self.assertEqual(driver.serial.chunks, [])
+
+    def test_bad_crc_and_timeout_return_empty(self):
+        reply = bytearray(with_crc(bytes([1, 0x06, 0x00, 0x1E, 0x01, 0x00])))
+        reply[-1] ^= 0xFF
+        driver = self.make_driver([bytes(reply)])
+        self.assertEqual(driver._send_modbus_command(1, 0x06, 0x1E, 0x100), b'')
+        self.assertEqual(driver._send_modbus_command(1, 0x06, 0x1E, 0x100), b'')
+
+    def test_corrupted_reply_is_retried(self):
+        echo = with_crc(bytes([1, 0x06, 0x00, 0x1E, 0x01, 0x00]))
+        corrupted = bytearray(echo)
+        corrupted[-1] ^= 0xFF
+        driver = self.make_driver([bytes(corrupted), echo])
+        self.assertEqual(driver._send_modbus_command(1, 0x06, 0x1E, 0x100), echo[:-2])
+        self.assertEqual(len(driver.serial.written), 2)
+        stats = driver.link_stats()[1]
+        self.assertEqual((stats['crc_errors'], stats['retries']), (1, 1))
+
+    def test_failed_read_returns_none_and_dead_slave_is_cut_short(self):
+        driver = self.make_driver([])
+        self.assertIsNone(driver.get_position(1))
+        for _ in range(3):
+            driver.read_state(1)
+        self.assertTrue(driver.link_stats()[1]['suspect'])
+        start = time.monotonic()
+        self.assertIsNone(driver.read_state(1))
+        self.assertLess(time.monotonic() - start, 0.04)  # Sem retentativa, timeout mínimo
+
+
+class ModbusFramingTests(SimpleTestCase):
+    def test_table_crc_matches_bitwise(self):
+        for data in (b'', bytes([1, 0x03, 0x00, 0x37, 0x00, 0x01]), bytes(range(256))):
+            self.assertEqual(crc16(data), crc16_bitwise(data))
+
+    def test_manual_example_frame(self):
+        # Exemplo do manual FC_MODBUS: leitura da posição atual do ID 1
+        self.assertEqual(build_request(1, 0x03, 0x0037, 1), bytes.fromhex('010300370001' '35c4'))
+
+    def test_incremental_crc_over_chunks(self):
+        frame = memoryview(with_crc(bytes([1, 0x03, 0x02, 0x08, 0x00])))
+        crc = crc16(frame[:3])
+        crc = crc16(frame[3:], crc)
+        self.assertEqual(crc, 0)
+
+
+class BusWorkerTests(SimpleTestCase):
+    def test_priority_order_and_futures(self):
+        order = []
+        release = threading.Event()
+        bus = BusWorker(driver=object())
+        bus.start()
+        self.addCleanup(bus.stop)
+
+        blocker = bus.submit(lambda driver: release.wait(1))
+        futures = [
+            bus.submit(lambda driver, name: order.append(name) or name, name, priority=priority)
+            for name, priority in (('diag', PRIORITY_DIAGNOSTIC), ('ui', PRIORITY_UI), ('control', PRIORITY_CONTROL))
+        ]
+        release.set()
+
+        self.assertTrue(blocker.result(1))
+        self.assertEqual([f.result(1) for f in futures], ['diag', 'ui', 'control'])
+        self.assertEqual(order, ['control', 'ui', 'diag'])
+
+    def test_exceptions_propagate_to_caller(self):
+        bus = BusWorker(driver=object())
+        bus.start()
+        self.addCleanup(bus.stop)
+        with self.assertRaises(AttributeError):
+            bus.call('missing_method', timeout=1)
+
+
+def ox100_reply(values, status=0x0004, quality=0):
+    """Resposta FC 04 do bloco de medições do OX100 (floats com a palavra baixa primeiro)."""
+    words = [status, quality, 0]
+    for value in values:
+        low, high = struct.unpack('<2H', struct.pack('<f', value))
+        words += [low, high]
+    words += [0] * (24 - len(words))
+    return with_crc(bytes([1, 0x04, 48]) + struct.pack('>24H', *words))
+
+
+class ProfilometerDriverTests(SimpleTestCase):
+    def make_driver(self, chunks):
+        driver = ProfilometerDriver(response_timeout=0.05)
+        driver.serial = FakeSerial(chunks)
+        return driver
+
+    def test_profile_decoded_into_preallocated_buffer(self):
+        values = [10.5, 11.0, 11.5, 12.0, 12.5, 13.0, 13.5]
+        driver = self.make_driver([ox100_reply(values)])
+        buffer = driver.profile
+        profile = driver.read_profile(ProfileConfig(is_simulated=False))
+        self.assertIs(profile, buffer)
+        self.assertEqual(list(profile), values)
+        self.assertEqual(driver.serial.written, [with_crc(bytes([1, 0x04, 0x00, 0xC8, 0x00, 0x18]))])
+
+    def test_invalid_measurement_returns_none(self):
+        driver = self.make_driver([ox100_reply([1.0] * 7, status=0)])
+        self.assertIsNone(driver.read_value(ProfileConfig(is_simulated=False)))
+
+    def test_simulated_value_is_honoured(self):
+        driver = self.make_driver([])
+        config = ProfileConfig(is_simulated=True, simulated_value=7.5)
+        self.assertEqual(driver.read_value(config), 7.5)
+        self.assertEqual(list(driver.read_profile(config)), [7.5] * 7)
+        self.assertEqual(driver.serial.written, [])
+
+
+class SlowProfilometer:
+    """Profilômetro falso: cada leitura demora e devolve um contador crescente."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.reads = 0
+        self.buffer = np.zeros(7, dtype=np.float32)
+
+    def read_profile(self, profile_config=None):
+        time.sleep(self.delay)
+        self.reads += 1
+        self.buffer.fill(self.reads)
+        return self.buffer
+
+
+class BackgroundProfileReaderTests(SimpleTestCase):
+    def test_acquisition_overlaps_caller_work(self):
+        reader = BackgroundProfileReader(SlowProfilometer(0.05))
+        self.addCleanup(reader.close)
+        reader.read(None)
+        started = time.monotonic()
+        for _ in range(4):
+            time.sleep(0.05)  # Tráfego dos atuadores
+            reader.read(None)
+        # Sequencial seriam ~0.4 s; em pipeline o ciclo é limitado pelo mais lento
+        self.assertLess(time.monotonic() - started, 0.32)
+
+    def test_returned_sample_is_not_overwritten_by_next_acquisition(self):
+        reader = BackgroundProfileReader(SlowProfilometer(0.01))
+        self.addCleanup(reader.close)
+        first = reader.read(None)
+        self.assertEqual(first[0], 1)
+        time.sleep(0.05)  # A próxima aquisição termina enquanto o ciclo usa `first`
+        self.assertEqual(first[0], 1)
+        self.assertEqual(reader.read(None)[0], 2)
+
+class ProfileAnalyzerTests(SimpleTestCase):
+    def test_zone_errors_follow_local_deviation(self):
+        analyzer = ProfileAnalyzer(3, target=12.0)
+        profile = [12.0, 12.0, 12.0, 12.0, 12.0, 11.0, 11.0]  # Borda direita abaixo do alvo
+        left, middle, right = analyzer.zone_errors(profile)
+        self.assertAlmostEqual(left, 0.0)
+        self.assertGreater(right, 0.5)
+        self.assertGreater(right, middle)
+
+    def test_dropouts_and_outliers_are_masked(self):
+        analyzer = ProfileAnalyzer(3, target=[10.0] * 7)
+        profile = [10.0, 10.1, float('nan'), 9.9, 10.0, 55.0, 10.0]
+        mask = analyzer.valid_mask(profile)
+        self.assertEqual(mask.tolist(), [True, True, False, True, True, False, True])
+        errors = analyzer.zone_errors(profile)
+        self.assertTrue(all(abs(e) < 0.2 for e in errors))
+
+    def test_zone_without_valid_points_is_nan(self):
+        analyzer = ProfileAnalyzer(3, target=10.0)
+        nan = float('nan')
+        errors = analyzer.zone_errors([nan, nan, nan, nan, 10.0, 10.0, 10.0])
+        self.assertTrue(math.isnan(errors[0]))
+        self.assertAlmostEqual(errors[2], 0.0)
+
+
+class PIDBankTests(SimpleTestCase):
+    def test_bumpless_reset_holds_current_position(self):
+        pid = PIDBank(2)
+        pid.reset([1000, 2000], setpoint=[10.0, 10.0], measurement=[9.0, 11.0], kp=1.0)
+        out = pid.update([10.0, 10.0], [9.0, 11.0], 0.1, kp=1.0, ki=0.0, kd=0.0, out_min=0, out_max=4095)
+        self.assertEqual(out.tolist(), [1000.0, 2000.0])
+
+    def test_integral_converges_and_anti_windup(self):
+        pid = PIDBank(1)
+        pid.reset([4000], [10.0], [5.0], kp=0.0)
+        for _ in range(100):
+            out = pid.update([10.0], [5.0], 0.1, kp=0.0, ki=10.0, kd=0.0, out_min=0, out_max=4095)
+        self.assertEqual(out[0], 4095)
+        self.assertLessEqual(pid.integral[0], 4095)
+        # Sem windup: o erro invertido tira a saída da saturação no primeiro ciclo
+        out = pid.update([10.0], [15.0], 0.1, kp=0.0, ki=10.0, kd=0.0, out_min=0, out_max=4095)
+        self.assertLess(out[0], 4095)
+
+    def test_setpoint_change_does_not_kick_derivative(self):
+        pid = PIDBank(1)
+        pid.reset([2000], [10.0], [10.0], kp=0.0)
+        out = pid.update([20.0], [10.0], 0.1, kp=0.0, ki=0.0, kd=5.0, out_min=0, out_max=4095)
+        self.assertEqual(out[0], 2000)
+        out = pid.update([20.0], [11.0], 0.1, kp=0.0, ki=0.0, kd=5.0, out_min=0, out_max=4095)
+        self.assertLess(out[0], 2000)
+
+    def test_masked_zone_keeps_state(self):
+        pid = PIDBank(2)
+        pid.reset([100, 200], [1.0, 1.0], [0.0, 0.0], kp=1.0)
+        out = pid.update([1.0, 1.0], [0.0, 0.0], 0.1, kp=1.0, ki=1.0, kd=0.0, out_min=0, out_max=4095,
+                         mask=np.array([True, False]))
+        self.assertGreater(out[0], 100)
+        self.assertEqual(out[1], 200)
+
+
+class WriteFilterTests(SimpleTestCase):
+    def test_deadband_tolerance_and_forced_refresh(self):
+        wf = WriteFilter([1, 2, 3])
+        goals = {1: 1000, 2: 2000, 3: 3000}
+        errors = [1.0, 1.0, 1.0]
+        sent = wf.filter(goals, errors, deadband=5, tolerance=0.5, refresh_interval=2.0, now=0.0)
+        self.assertEqual(sent, goals)  # Nada confirmado ainda
+        wf.record(sent, {1: True, 2: True, 3: True}, duration=0.006, now=0.0)
+
+        goals = {1: 1003, 2: 2100, 3: 3100}
+        errors = [1.0, 1.0, 0.2]  # Zona 3 dentro da tolerância
+        self.assertEqual(wf.filter(goals, errors, 5, 0.5, 2.0, now=0.1), {2: 2100})
+        self.assertEqual(wf.suppressed, 2)
+        self.assertAlmostEqual(wf.saved_time, 0.004)
+
+        # Após o intervalo de refresh tudo é reenviado
+        self.assertEqual(wf.filter(goals, errors, 5, 0.5, 2.0, now=2.5), goals)
+
+
+class SlaveStatsTests(SimpleTestCase):
+    def test_timeout_follows_latency_percentile(self):
+        stats = SlaveStats()
+        self.assertEqual(stats.timeout(0.5), 0.5)  # Sem amostras: timeout configurado
+        for _ in range(32):
+            stats.record(OUTCOME_OK, 0.02)
+        self.assertAlmostEqual(stats.timeout(0.5), 0.06)
+        for _ in range(32):
+            stats.record(OUTCOME_OK, 0.001)
+        self.assertEqual(stats.timeout(0.5), 0.06)  # p99 ainda dominado pelas amostras lentas
+        for _ in range(128):
+            stats.record(OUTCOME_OK, 0.001)
+        self.assertEqual(stats.timeout(0.5), MIN_TIMEOUT)
+
+    def test_retry_budget_and_suspect_slave(self):
+        stats = SlaveStats()
+        self.assertEqual(sum(stats.take_retry() for _ in range(5)), 3)
+        for _ in range(10):
+            stats.record(OUTCOME_OK, 0.005)
+        self.assertTrue(stats.take_retry())  # 10 sucessos devolvem um token
+
+        for _ in range(3):
+            stats.record(OUTCOME_TIMEOUT, 0.0)
+        self.assertTrue(stats.suspect)
+        self.assertEqual(stats.timeout(0.5), MIN_TIMEOUT)
+        self.assertFalse(stats.take_retry())
+        self.assertAlmostEqual(stats.summary(0.5)['timeout_rate'], 3 / 13, places=4)
+
+    def test_suspect_slave_gets_periodic_full_timeout(self):
+        stats = SlaveStats()
+        timeouts = []
+        for _ in range(SUSPECT_AFTER + 2 * RECOVERY_PROBE_EVERY):
+            timeouts.append(stats.timeout(0.5))
+            stats.record(OUTCOME_TIMEOUT, 0.0)
+        suspect = timeouts[SUSPECT_AFTER:]
+        self.assertEqual(suspect.count(0.5), 2)  # Uma tentativa com o timeout cheio a cada RECOVERY_PROBE_EVERY
+        self.assertEqual(suspect.count(MIN_TIMEOUT), 2 * RECOVERY_PROBE_EVERY - 2)
+
+        stats.record(OUTCOME_OK, 0.03)  # Atuador lento respondeu dentro do timeout cheio
+        self.assertFalse(stats.suspect)
+
+
+class HardwareSimulatorTests(SimpleTestCase):
+    def make(self, clock=None, **driver_options):
+        simulator = HardwareSimulator((1, 2, 3))
+        driver, profilometer = MightyZapDriver(**driver_options), ProfilometerDriver()
+        if clock:
+            simulator.attach(driver, profilometer, clock=clock, sleep=clock.sleep)
+        else:
+            simulator.attach(driver, profilometer)
+        return simulator, driver, profilometer
+
+    def test_actuator_motion_dynamics(self):
+        clock = FakeClock()
+        simulator, driver, _ = self.make(clock)
+        driver.set_position(1, 3000)
+        clock.sleep(0.1)
+        state = driver.read_state(1)
+        self.assertTrue(2048 < state.position < 3000)
+        self.assertEqual(state.op_mode, 1)
+        self.assertGreater(state.current, IDLE_CURRENT)
+
+        clock.sleep(2.0)
+        state = driver.read_state(1)
+        self.assertAlmostEqual(state.position, 3000, delta=2)
+        self.assertEqual((state.op_mode, state.current), (0, IDLE_CURRENT))
+        driver.set_position(1, state.position + 5)  # Dentro da margem de compliance: não move
+        clock.sleep(0.5)
+        self.assertEqual(driver.read_state(1).position, state.position)
+
+    def test_transaction_time_follows_baud_rate(self):
+        clock = FakeClock()
+        _, driver, _ = self.make(clock)
+        start = clock()
+        driver.read_state(1)
+        # Requisição de 8 bytes + resposta de 19 bytes a 11 bits por caractere
+        self.assertAlmostEqual(clock() - start, 27 * 11 / 57600 + DEFAULT_TURNAROUND, places=6)
+
+    def test_profile_follows_actuator_positions(self):
+        clock = FakeClock()
+        _, driver, profilometer = self.make(clock)
+        config = ProfileConfig(is_simulated=False)
+        np.testing.assert_allclose(profilometer.read_profile(config), 10.0, atol=1e-5)
+
+        driver.set_position(1, 3048)
+        clock.sleep(2.0)
+        profile = profilometer.read_profile(config).copy()
+        self.assertAlmostEqual(profile[0], 10.0 + 0.01 * 1000, delta=1.5)
+        self.assertTrue(np.all(np.diff(profile) <= 0))  # Só a borda do atuador 1 sobe
+
+    def test_wrong_baud_rate_dead_actuator_and_exceptions(self):
+        simulator, driver, _ = self.make(response_timeout=0.02, baudrate=115200)
+        self.assertIsNone(driver.read_state(1))
+
+        simulator, driver, _ = self.make(response_timeout=0.02)
+        simulator.actuator(2).online = False
+        self.assertIsNone(driver.read_state(2))
+        self.assertEqual(driver._send_modbus_command(1, 0x03, 0x0100, 1), b'')  # Endereço ilegal
+        self.assertEqual(driver.link_stats()[1]['timeouts'], 0)
+
+    def test_rejected_block_read_falls_back_to_single_registers(self):
+        clock = FakeClock()
+        simulator, driver, _ = self.make(clock)
+        simulator.actuator(1).block_reads = False
+        driver.set_position(1, 3000)
+        clock.sleep(0.1)
+        state = driver.read_state(1)
+        self.assertTrue(2048 < state.position < 3000)
+        self.assertEqual(state.op_mode, 1)
+        self.assertGreater(state.current, IDLE_CURRENT)
+        self.assertEqual(driver.block_read_unsupported, {1})
+
+        start = clock()
+        self.assertIsNotNone(driver.read_state(1))
+        # Sem nova tentativa do bloco: três leituras de um registrador (8 + 7 bytes)
+        self.assertAlmostEqual(clock() - start, 3 * (15 * 11 / 57600 + DEFAULT_TURNAROUND), places=6)
+        self.assertEqual(driver.read_state(2).position, 2048)
+        self.assertEqual(driver.block_read_unsupported, {1})
+
+    def test_pty_bridge(self):
+        simulator = HardwareSimulator((1, 2))
+        bridges = simulator.ptys()
+        for bridge in bridges:
+            self.addCleanup(bridge.stop)
+        driver = MightyZapDriver(port=bridges[0].port, response_timeout=0.2)
+        self.assertTrue(driver.connect())
+        self.addCleanup(driver.disconnect)
+        self.assertEqual(driver.read_state(2).position, 2048)
+        self.assertEqual(driver.set_positions({1: 1000, 2: 1200}), {1: True, 2: True})
+
+
+class DiscoveryTests(TestCase):
+    def setUp(self):
+        # Dois atuadores com o ID 2: um a 57600, outro (ainda não configurado) a 115200
+        self.simulator = HardwareSimulator((1, 2, 2, 5))
+        self.simulator.actuators[2].baudrate = 115200
+        self.simulator.actuator(5).baudrate = 115200
+        self.driver = MightyZapDriver()
+        self.simulator.attach(self.driver)
+
+    def test_scan_finds_ids_at_each_baud_rate(self):
+        result = scan(self.driver, ids=range(1, 8), baudrates=[57600, 115200])
+        found = [(d.modbus_id, d.baudrate, d.firmware_version) for d in result['devices']]
+        self.assertEqual(found, [(1, 57600, 20), (2, 57600, 20), (2, 115200, 20), (5, 115200, 20)])
+        self.assertEqual(result['conflicts'], [(2, 115200)])
+        self.assertEqual(result['probes'], 14)
+        self.assertEqual(self.driver.baudrate, 57600)  # Volta à taxa original
+        self.assertEqual(self.driver.serial.baudrate, 57600)
+
+        # Encerra assim que os dispositivos esperados aparecem
+        self.assertEqual(scan(self.driver, ids=range(1, 8), expected=2)['probes'], 2)
+
+    def test_sync_creates_and_updates_actuator_config(self):
+        ActuatorConfig.objects.create(name="Left", modbus_id=1, min_position=100)
+        ActuatorConfig.objects.create(name="Spare", modbus_id=9)
+        result = scan(self.driver, ids=range(1, 8), baudrates=[57600, 115200])
+        sync = sync_actuators(result['devices'])
+        self.assertEqual(sync, {'created': [2, 5], 'updated': [1], 'missing': [9]})
+        left = ActuatorConfig.objects.get(modbus_id=1)
+        self.assertEqual((left.name, left.min_position, left.baudrate), ("Left", 100, 57600))
+        self.assertEqual(ActuatorConfig.objects.get(modbus_id=2).baudrate, 57600)  # Primeira taxa varrida
+        self.assertEqual(ActuatorConfig.objects.get(modbus_id=5).model_number, 0x0C1F)
+
+    def test_discovery_sweeps_in_bus_sized_chunks(self):
+        sweep = Discovery(57600, ids=range(1, 21), baudrates=[57600, 115200])
+        chunks = []
+        while (chunk := sweep.next_chunk()) is not None:
+            ids, baudrate = chunk
+            chunks.append((len(ids), baudrate))
+            sweep.add(scan(self.driver, ids=ids, baudrates=[baudrate]))
+            self.assertEqual(self.driver.baudrate, 57600)  # Cada pedaço devolve o barramento na taxa original
+        self.assertEqual(chunks, [(CHUNK_IDS, 57600), (20 - CHUNK_IDS, 57600), (CHUNK_IDS, 115200), (20 - CHUNK_IDS, 115200)])
+        self.assertEqual(sweep.finish(), [1, 2, 5])
+        self.assertEqual(sweep.conflicts, [(2, 115200)])
+        self.assertEqual(ActuatorConfig.objects.get(modbus_id=2).baudrate, 57600)
+
+
+class BusConfigTests(TestCase):
+    def setUp(self):
+        ControlSettings.objects.create()
+        ActuatorConfig.objects.create(name="A1", modbus_id=1)
+        self.simulator = HardwareSimulator((1, 2, 3))
+        self.driver = MightyZapDriver()
+        self.simulator.attach(self.driver)
+
+    def test_migration_moves_devices_and_driver(self):
+        report = bus_config.migrate_baudrate(self.driver, [1, 2, 3], 115200, cycles=3)
+        self.assertEqual(report['status'], bus_config.MIGRATED)
+        self.assertEqual((report['before']['baudrate'], report['after']['baudrate']), (57600, 115200))
+        self.assertEqual(report['after']['errors'], 0)
+        self.assertEqual(set(report['after']['turnaround_ms']), {1, 2, 3})
+        self.assertEqual([a.baudrate for a in self.simulator.actuators], [115200] * 3)
+        self.assertEqual(self.driver.serial.baudrate, 115200)
+        self.assertEqual(ControlSettings.objects.get().bus_baudrate, 115200)
+        self.assertEqual(ActuatorConfig.objects.get(modbus_id=1).baudrate, 115200)
+
+    def test_failed_verification_rolls_back(self):
+        # O atuador 2 grava o novo valor mas não reinicia
+        self.simulator.actuator(2).special = lambda function_code, data, now: True
+        report = bus_config.migrate_baudrate(self.driver, [1, 2, 3], 115200, cycles=3, verify_timeout=0.2)
+        self.assertEqual(report['status'], bus_config.ROLLED_BACK)
+        self.assertEqual(report['lost'], [])
+        self.assertIsNone(report['after'])
+        self.assertEqual(self.driver.baudrate, 57600)
+        self.assertEqual([a.baudrate for a in self.simulator.actuators], [57600] * 3)
+        self.assertEqual([a.baud_register for a in self.simulator.actuators], [0x20] * 3)
+        self.assertEqual(ControlSettings.objects.get().bus_baudrate, 57600)
+
+    def test_unreachable_actuator_aborts_before_any_write(self):
+        self.simulator.actuator(3).online = False
+        report = bus_config.migrate_baudrate(self.driver, [1, 2, 3], 115200, cycles=3)
+        self.assertEqual(report['status'], bus_config.FAILED)
+        self.assertIsNone(report['before'])
+        self.assertEqual(self.simulator.actuator(1).baud_register, 0x20)
+
+
+class BenchmarkTests(SimpleTestCase):
+    def test_compare_flags_regressions_in_either_direction(self):
+        baseline = {
+            'driver.read_state.p99': benchmark.metric(8.0, 'ms'),
+            'driver.read_state.rate': benchmark.metric(130.0, '1/s', benchmark.HIGHER),
+            'loop.3_actuators.overruns': benchmark.metric(0, 'cycles'),
+        }
+        results = {
+            'driver.read_state.p99': benchmark.metric(12.0, 'ms'),
+            'driver.read_state.rate': benchmark.metric(120.0, '1/s', benchmark.HIGHER),
+            'loop.3_actuators.overruns': benchmark.metric(2, 'cycles'),  # Baseline 0: sem referência
+            'web.job_status.p50': benchmark.metric(1.0, 'ms'),  # Métrica nova
+        }
+        regressions = benchmark.compare(results, baseline, tolerance=0.25)
+        self.assertEqual([name for name, *_ in regressions], ['driver.read_state.p99'])
+        results['driver.read_state.rate'] = benchmark.metric(90.0, '1/s', benchmark.HIGHER)
+        self.assertEqual(len(benchmark.compare(results, baseline, tolerance=0.25)), 2)
+
+    def test_driver_and_loop_suites_on_simulator(self):
+        results = benchmark.bench_driver(count=5)
+        self.assertGreater(results['driver.read_state.p50']['value'], 27 * 11 / 57600 * 1000)
+        results = benchmark.bench_loop(n_actuators=2, cycles=3, interval_ms=20)
+        self.assertIn('loop.2_actuators.cycle.p99', results)
+        self.assertIn('loop.2_actuators.read', results)
+
+
+class SimulatorLoop(ControlLoop):
+    """ControlLoop que para após `cycles` ciclos, guardando as metas e o estado de cada um."""
+
+    def __init__(self, snapshot, cycles, **kwargs):
+        super().__init__(**kwargs)
+        self.config_cache = self
+        self.snapshot = snapshot
+        self.cycles = cycles
+        self.recorded = []
+        self.profile_delays = (0.0,)  # Atraso extra da aquisição, ciclo a ciclo (jitter)
+        self.changes = {}  # {ciclo: snapshot} aplicado depois desse ciclo
+        self.sent = []  # Escritas enviadas até cada ciclo
+
+    def get(self):
+        return self.snapshot
+
+    def read_profile(self, profile_config):
+        time.sleep(self.profile_delays[self.scheduler.cycles % len(self.profile_delays)])
+        return super().read_profile(profile_config)
+
+    def log_timing(self):
+        if self.scheduler.cycles > 2 * self.cycles:
+            self.running = False  # Ciclos demais sem registro: algo falhou
+
+    def record_cycle(self, profile_config, actuators, profile, errors, goals, states):
+        super().record_cycle(profile_config, actuators, profile, errors, goals, states)
+        self.recorded.append((errors.copy(), goals, states))
+        self.sent.append(self.write_filter.sent)
+        self.snapshot = self.changes.get(len(self.recorded) - 1, self.snapshot)
+        if len(self.recorded) >= self.cycles:
+            self.running = False
+
+
+class ControlLoopTests(SimpleTestCase):
+    """ControlLoop completo, em tempo real, sobre os barramentos simulados."""
+
+    def make_snapshot(self, actuators=(), target_value=12.0, **settings):
+        settings = {'is_active': True, 'loop_interval_ms': 100, 'kp': 1.0, 'ki': 0.5, **settings}
+        actuators = actuators or [ActuatorConfig(name=f'A{i}', modbus_id=i) for i in (1, 2, 3)]
+        return ConfigSnapshot(
+            version=0,
+            settings=ControlSettings(**settings),
+            profile_config=ProfileConfig(target_value=target_value, tolerance=0.05, is_simulated=False),
+            actuators=list(actuators),
+        )
+
+    def run_loop(self, snapshot, cycles, profile_delays=(0.0,), turnaround=DEFAULT_TURNAROUND, changes=None,
+                 **simulator_options):
+        """Roda `cycles` ciclos; retorna o loop e as requisições {função: {id: n}} vistas no barramento."""
+        simulator = HardwareSimulator([a.modbus_id for a in snapshot.actuators], seed=0, **simulator_options)
+        for actuator in simulator.actuators:
+            actuator.turnaround = turnaround
+        self.simulator = simulator
+        driver, profilometer = MightyZapDriver(), ProfilometerDriver()
+        simulator.attach(driver, profilometer)
+
+        requests = {}
+        process = simulator.actuator_bus.process
+
+        def counting(frame, baudrate, now):
+            per_id = requests.setdefault(frame[1], {})
+            per_id[frame[0]] = per_id.get(frame[0], 0) + 1
+            return process(frame, baudrate, now)
+
+        simulator.actuator_bus.process = counting
+        loop = SimulatorLoop(snapshot, cycles, driver=driver, profilometer_driver=profilometer)
+        loop.profile_delays = profile_delays
+        loop.changes = changes or {}
+        loop.running = True
+        try:
+            loop.loop()
+        finally:
+            loop.bus.stop()
+            for resource in (loop.telemetry, loop.live_state, loop.metrics):
+                if resource:
+                    resource.close()
+        self.assertEqual(len(loop.recorded), cycles)
+        return loop, requests
+
+    def test_state_is_read_from_the_bus_every_cycle(self):
+        # Aquisição alternando entre lenta e rápida: a leitura do ciclo anterior
+        # tem então bem menos de um período quando o ciclo seguinte começa
+        loop, requests = self.run_loop(self.make_snapshot(), cycles=10,
+                                       profile_delays=(0.03, 0.0))
+        reads = loop.scheduler.phases['read'].count
+        self.assertEqual(reads, 10 - loop.scheduler.skipped_phases.get('read', 0))
+        self.assertEqual(requests[0x03], {1: reads, 2: reads, 3: reads})
+
+
+    def test_goals_follow_the_configured_proportional_gain(self):
+        # Só P: a meta é a posição inicial mais kp x POSITION_SCALE x variação do erro da zona
+        loop, _ = self.run_loop(self.make_snapshot(kp=3.0, ki=0.0), cycles=6)
+        (errors_0, goals_0, states_0), *cycles = loop.recorded
+        self.assertEqual(goals_0, {i: state.position for i, state in zip((1, 2, 3), states_0)})
+        for errors, goals, _ in cycles:
+            expected = [state.position + 3.0 * POSITION_SCALE * (error - error_0)
+                        for state, error, error_0 in zip(states_0, errors, errors_0)]
+            for goal, value in zip(goals.values(), expected):
+                self.assertAlmostEqual(goal, value, delta=0.5)
+
+    def test_goals_converge_within_actuator_limits(self):
+        actuators = [
+            ActuatorConfig(name='A1', modbus_id=1, min_position=2100),  # Começa abaixo do mínimo
+            ActuatorConfig(name='A2', modbus_id=2),
+            ActuatorConfig(name='A3', modbus_id=3, max_position=2200),
+        ]
+        loop, _ = self.run_loop(self.make_snapshot(actuators, kp=3.0, ki=40.0), cycles=30)
+        for _, goals, _ in loop.recorded:
+            for actuator in actuators:
+                self.assertGreaterEqual(goals[actuator.modbus_id], actuator.min_position)
+                self.assertLessEqual(goals[actuator.modbus_id], actuator.max_position)
+
+        errors, goals, _ = loop.recorded[-1]
+        self.assertEqual(goals[3], 2200)  # Saturado, sem windup empurrando além do limite
+        self.assertGreater(goals[2], 2200)  # A zona vizinha compensa o atuador saturado
+        # Erro de 2.0 levado à resolução do atuador (margem de partida de 7 contagens)
+        self.assertLess(abs(errors[:2]).max(), 0.1)
+        self.assertGreater(errors[2], 0.1)
+
+    def test_read_phase_is_skipped_under_deadline_pressure(self):
+        # 15 ms de resposta por atuador: a leitura dos três não cabe no que sobra do período
+        # depois da aquisição, então só o primeiro ciclo (sem estados ainda) lê, e estoura
+        loop, requests = self.run_loop(self.make_snapshot(refresh_interval_ms=0), cycles=5, turnaround=0.015)
+        scheduler = loop.scheduler
+        self.assertGreaterEqual(scheduler.overruns, 1)
+        self.assertEqual(scheduler.phases['read'].count, 1)
+        self.assertEqual(scheduler.skipped_phases, {'read': 4})
+        self.assertEqual(requests[0x03], {1: 1, 2: 1, 3: 1})
+        # A escrita sai em todos os ciclos, com os estados do ciclo anterior
+        self.assertEqual(scheduler.phases['write'].count, 5)
+        self.assertEqual(loop.write_filter.sent, 15)
+        self.assertGreaterEqual(sum(requests[0x06].values()), 5)
+
+        # Só o ciclo que leu registra posição e corrente; os demais não repetem a leitura antiga
+        data = read_telemetry(loop.telemetry.path)
+        self.assertTrue((data['position'][0] > 0).all())
+        self.assertTrue((data['position'][1:] == NO_VALUE).all())
+        self.assertTrue((data['current'][1:] == NO_VALUE).all())
+        self.assertTrue((data['commanded'] != NO_VALUE).all())
+        live = LiveStateReader().read()
+        self.assertEqual(live['position'][:3].tolist(), [NO_VALUE] * 3)
+
+        record = MetricsReader().read()
+        self.assertEqual(record['skipped_phases'][PHASE_INDEX['read']], 4)
+        self.assertEqual(record['counters'][COUNTER_INDEX['overruns']], scheduler.overruns)
+        self.assertEqual(record['phase_buckets'][PHASE_INDEX['write']].sum(), 5)
+
+    def test_writes_within_deadband_or_tolerance_are_suppressed(self):
+        # Só P (kp=1): a meta anda 10 contagens por unidade de variação do erro da zona.
+        # O perfil simulado começa exatamente em 10.0
+        settings = {'kp': 1.0, 'ki': 0.0, 'deadband': 5, 'refresh_interval_ms': 60000}
+        loop, _ = self.run_loop(self.make_snapshot(target_value=10.0, **settings), cycles=7, changes={
+            2: self.make_snapshot(target_value=10.1, **settings),  # Fora da tolerância, meta +1: deadband
+            5: self.make_snapshot(target_value=12.0, **settings),  # Meta +20: sai
+        })
+        # Ciclo 0: primeira escrita; 1-2: zona na tolerância; 3-5: dentro do deadband; 6: enviada
+        self.assertEqual(loop.sent, [3, 3, 3, 3, 3, 3, 6])
+        self.assertEqual([goals[1] for _, goals, _ in loop.recorded], [2048, 2048, 2048, 2049, 2049, 2049, 2068])
+        self.assertEqual(loop.write_filter.suppressed, 15)
+        self.assertEqual(self.simulator.actuator(1).goal, 2068)
+
+        record = MetricsReader().read()
+        self.assertEqual(record['counters'][COUNTER_INDEX['writes_sent']], 6)
+        self.assertEqual(record['counters'][COUNTER_INDEX['writes_suppressed']], 15)
+
+class FakeClock:
+    """Relógio monotônico controlado pelo teste; sleep() apenas avança o tempo."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class FixedRateSchedulerTests(SimpleTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.scheduler = FixedRateScheduler(0.1, clock=self.clock, sleep=self.clock.sleep)
+
+    def test_period_does_not_include_work_time(self):
+        starts = []
+        for _ in range(5):
+            self.scheduler.wait()
+            starts.append(self.clock.now)
+            self.clock.now += 0.03  # Trabalho do ciclo
+            self.scheduler.lap('work')
+        periods = [round(b - a, 6) for a, b in zip(starts, starts[1:])]
+        self.assertEqual(periods, [0.1] * 4)
+        self.assertEqual(self.scheduler.overruns, 0)
+        self.assertAlmostEqual(self.scheduler.phases['work'].mean, 0.03)
+
+    def test_overrun_skips_missed_cycles_and_rejoins_grid(self):
+        self.scheduler.wait()
+        start = self.clock.now
+        self.clock.now += 0.25  # Ciclo estourou 2,5 períodos
+        self.assertFalse(self.scheduler.wait())
+        self.assertEqual(self.scheduler.overruns, 1)
+        self.assertEqual(self.scheduler.skipped_cycles, 1)
+        self.assertAlmostEqual(self.scheduler.jitter_max, 0.05)
+        self.assertAlmostEqual(self.scheduler.time_left(), 0.05)
+        self.assertTrue(self.scheduler.wait())
+        self.assertAlmostEqual(self.clock.now - start, 0.3)
+
+
+class TelemetryRecorderTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = temp_dir(self)
+
+    def record(self, recorder, n):
+        for i in range(n):
+            recorder.record(1000.0 + i, 0.01, 10.0, 9.5, [i, -1], [i, 200], [50, 60])
+
+    def test_batches_are_persisted_and_readable(self):
+        recorder = TelemetryRecorder(self.directory, [1, 2], capacity=8, batch_size=4)
+        self.record(recorder, 6)
+        data = read_telemetry(recorder.path)
+        self.assertEqual(len(data), 4)  # Só lotes completos vão para o disco
+        recorder.close()
+        data = read_telemetry(recorder.path)
+        self.assertEqual(data['timestamp'].tolist(), [1000.0 + i for i in range(6)])
+        self.assertEqual(data['commanded'][5].tolist(), [5, -1])
+        self.assertEqual(read_telemetry_header(recorder.path)['actuators'], [1, 2])
+        self.assertEqual(recorder.recent(3)['timestamp'].tolist(), [1003.0, 1004.0, 1005.0])
+
+    def test_rotation_bounds_file_count(self):
+        recorder = TelemetryRecorder(self.directory, [1, 2], capacity=8, batch_size=4,
+                                     max_file_bytes=1, max_files=2)
+        self.record(recorder, 20)
+        recorder.close()
+        files = sorted(os.listdir(self.directory))
+        self.assertEqual(len(files), 2)
+        self.assertEqual(read_telemetry(os.path.join(self.directory, files[-1]))['timestamp'][-1], 1019.0)
+
+
+class LiveStateTests(SimpleTestCase):
+    def test_published_cycle_is_read_by_another_mapping(self):
+        path = os.path.join(temp_dir(self), 'live.state')
+        reader = LiveStateReader(path)
+        self.assertIsNone(reader.read())  # Nada publicado ainda
+
+        writer = LiveStateWriter(path)
+        self.assertIsNone(reader.read())
+        writer.publish(1000.0, 0.02, 10.0, 9.5, [9.5] * 7, [1, 2], [0.5, -0.5], [100, -1], [90, 210], [30, 40])
+        state = reader.read()
+        self.assertEqual(state['cycle'], 1)
+        self.assertEqual(state['seq'] % 2, 0)
+        self.assertEqual(state['actuator_ids'][:2].tolist(), [1, 2])
+        self.assertEqual(state['position'][:2].tolist(), [90, 210])
+
+        writer.publish(1000.1, 0.02, 10.0, 9.6, [9.6] * 7, [1, 2], [0.4, -0.4], [101, 99], [95, 205], [30, 40])
+        self.assertEqual(reader.read()['cycle'], 2)
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(temp_dir(self), 'metrics')
+        self.reader = MetricsReader(self.path)
+        self.assertIsNone(self.reader.read())  # Nenhum processo de controle ainda
+        self.recorder = MetricsRecorder(self.path)
+        self.addCleanup(self.recorder.close)
+
+    def test_scheduler_phases_and_overruns_are_recorded(self):
+        clock = FakeClock()
+        scheduler = FixedRateScheduler(0.1, clock=clock, sleep=clock.sleep, metrics=self.recorder)
+        scheduler.wait()
+        clock.now += 0.003
+        scheduler.lap('read')
+        scheduler.skip('write')
+        scheduler.wait()  # Dorme 0,097 s
+        clock.now += 0.25
+        scheduler.wait()  # Estouro de 2,5 períodos
+
+        snapshot = self.reader.read()
+        read = PHASE_INDEX['read']
+        self.assertEqual(snapshot['phase_buckets'][read].tolist(), [0, 0, 0, 1] + [0] * 8)  # 2,5 ms < 3 ms <= 5 ms
+        self.assertAlmostEqual(snapshot['phase_sum'][read], 0.003)
+        self.assertAlmostEqual(snapshot['phase_sum'][PHASE_INDEX['sleep']], 0.097)
+        self.assertEqual(snapshot['skipped_phases'][PHASE_INDEX['write']], 1)
+        counters = snapshot['counters']
+        self.assertEqual(counters[COUNTER_INDEX['cycles']], 3)
+        self.assertEqual(counters[COUNTER_INDEX['overruns']], 1)
+        self.assertEqual(counters[COUNTER_INDEX['skipped_cycles']], 1)
+
+    def test_driver_records_every_transaction(self):
+        driver = MightyZapDriver()
+        simulator = HardwareSimulator((1,))
+        simulator.attach(driver)
+        driver.metrics = self.recorder
+        self.assertIsNotNone(driver.get_position(1))
+        simulator.actuator(1).online = False
+        self.assertIsNone(driver.get_position(1))
+
+        snapshot = self.reader.read()
+        # Sucesso, timeout e a retentativa dele (também timeout)
+        self.assertEqual(snapshot['bus_outcomes'][1, OUTCOME_OK], 1)
+        self.assertEqual(snapshot['bus_outcomes'][1, OUTCOME_TIMEOUT], 2)
+        self.assertEqual(snapshot['bus_retries'][1], 1)
+        self.assertEqual(snapshot['bus_buckets'][1].sum(), 3)
+        self.assertEqual(snapshot['bus_outcomes'][2].sum(), 0)
+
+
+class CommandMailboxTests(SimpleTestCase):
+    def setUp(self):
+        path = os.path.join(temp_dir(self), 'mailbox')
+        self.web = CommandMailbox(path)
+        self.control = CommandMailbox(path)  # Outro mapeamento do mesmo arquivo, como no run_control
+
+    def test_command_round_trip(self):
+        job_id = self.web.submit('set_positions', {1: 100, 2: 200}, broadcast=True)
+        self.assertEqual(self.web.status(job_id)['status'], 'pending')
+
+        (index,) = self.control.take_posted()
+        self.assertEqual(self.control.command(index), ('set_positions', {1: 100, 2: 200}, True))
+        self.assertEqual(self.web.status(job_id)['status'], 'running')
+        self.control.finish(index, {1: True, 2: False})
+
+        status = self.web.status(job_id)
+        self.assertEqual(status['status'], 'done')
+        self.assertEqual(status['result'], {'1': True, '2': False})
+        self.assertIsNone(self.web.status('0-1'))
+
+    def test_out_of_range_goals_are_rejected(self):
+        for goals in ({1: 40000}, {1: -1}, {248: 100}):
+            with self.assertRaises(ValueError):
+                self.web.submit('set_positions', goals)
+        self.assertEqual(self.control.take_posted(), [])
+
+    def test_discover_result_counts_every_device(self):
+        job_id = self.web.submit('discover', {})
+        found = list(range(1, MAX_ACTUATORS + 5))  # Mais IDs do que cabem no slot
+        self.control.finish(self.control.take_posted()[0], dict.fromkeys(found, True))
+        self.assertEqual(self.web.status(job_id)['result'], {'found': len(found)})
+
+    def test_job_status_served_by_any_worker(self):
+        # Cada worker do gunicorn tem o seu mapeamento; o job não pertence a nenhum deles
+        other_worker = CommandMailbox(self.web.path)
+        job_id = self.web.submit('set_position', {1: 100})
+        self.control.finish(self.control.take_posted()[0], {1: True})
+        self.assertEqual(other_worker.status(job_id)['result'], {'1': True})
+
+    def test_reused_slot_invalidates_old_job_id(self):
+        first = self.web.submit('set_position', {1: 100})
+        self.control.finish(self.control.take_posted()[0], {1: True})
+        for _ in range(MAILBOX_SLOTS):
+            self.web.submit('set_position', {1: 100})
+            self.control.finish(self.control.take_posted()[0], {1: True})
+        self.assertIsNone(self.web.status(first))
+
+    def test_stale_commands_expire(self):
+        job_id = self.web.submit('set_position', {1: 100})
+        self.web.slots['submitted'][int(job_id.split('-')[0])] -= PENDING_TIMEOUT + 1
+        self.assertEqual(self.web.status(job_id)['status'], 'failed')
+        self.assertEqual(self.control.take_posted(), [])
+        self.assertEqual(self.web.status(job_id)['error'], 'Expired before execution')
+
+
+    def test_layout_change_leaves_old_mappings_valid(self):
+        # Um worker com o layout antigo ainda mapeia o arquivo maior
+        path = os.path.join(temp_dir(self), 'old-mailbox')
+        size = SLOT_DTYPE.itemsize * MAILBOX_SLOTS
+        with open(path, 'wb') as f:
+            f.write(b'\xff' * 2 * size)
+        os.chmod(path, 0o664)
+        old = np.memmap(path, dtype=np.uint8, mode='r')
+
+        mailbox = CommandMailbox(path)
+        self.assertEqual(os.path.getsize(path), size)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o664)
+        self.assertTrue((mailbox.slots['state'] == 0).all())
+        self.assertEqual(old[-1], 0xFF)  # Truncar no lugar faria este acesso gerar SIGBUS
+        self.assertEqual(CommandMailbox(path).status(mailbox.submit('set_position', {1: 100}))['status'], 'pending')
+
+class ConfigCacheTests(TestCase):
+    def setUp(self):
+        self.settings_obj = ControlSettings.objects.create(is_active=True, kp=1.0)
+        ActuatorConfig.objects.create(name="A2", modbus_id=2)
+        ActuatorConfig.objects.create(name="A1", modbus_id=1)
+        self.version_path = os.path.join(temp_dir(self), 'config.version')
+        self.cache = ConfigCache(version_path=self.version_path)
+
+    def test_snapshot_served_without_queries(self):
+        snapshot = self.cache.get()
+        self.assertEqual([a.modbus_id for a in snapshot.actuators], [1, 2])
+        with self.assertNumQueries(0):
+            self.assertIs(self.cache.get(), snapshot)
+
+    def test_local_invalidation_and_version_file(self):
+        self.cache.get()
+        self.settings_obj.kp = 2.5
+        self.settings_obj.save()
+        self.cache.invalidate()  # Mesmo processo: contador de versão
+        self.assertEqual(self.cache.get().settings.kp, 2.5)
+
+        ControlSettings.objects.update(kp=4.0)
+        touch_version_file(self.version_path)  # Outro processo: arquivo de versão
+        self.assertEqual(self.cache.get().settings.kp, 4.0)
@@ -0,0 +1,96 @@
+import json
+import tempfile
+import time
+
+import numpy as np
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from apps.hardware.models import ActuatorConfig
+from apps.hardware.services import mailbox as mailbox_module
+from apps.hardware.services.benchmark import latency_metrics
+from apps.hardware.services.bus import BusWorker
+from apps.hardware.services.live_state import LiveStateWriter
+from apps.hardware.services.mailbox import CommandMailbox, MailboxServer
+from apps.hardware.services.mighty_zap import MightyZapDriver
+from apps.hardware.services.simulator import HardwareSimulator
+from apps.hardware.services.profilometer import MEASURED_VALUE_COUNT
+from . import live
+
+JOB_POLL_INTERVAL = 0.001
+JOB_TIMEOUT = 5.0
+
+
+def bench_web(count=200) -> dict:
+    """
+    Request latency of the JSON API through the Django stack (test client, WSGI path).
+
+    Commands go to a temporary mailbox served by a MailboxServer on the
+    simulated actuator bus, so `web.job_roundtrip` covers the whole path:
+    request, mailbox, control-side poll, bus transaction and status.
+    The commands move the first configured actuator, since the API only
+    accepts goals within an ActuatorConfig.
+    """
+    actuator = ActuatorConfig.objects.order_by('modbus_id').first()
+    if actuator is None:
+        raise RuntimeError("The web benchmark needs at least one configured actuator")
+    client = Client()
+    with tempfile.TemporaryDirectory() as directory, override_settings(
+            HARDWARE_LIVE_STATE_FILE=f'{directory}/live.state',
+            HARDWARE_MAILBOX_FILE=f'{directory}/mailbox'):
+        driver = MightyZapDriver()
+        HardwareSimulator((actuator.modbus_id,)).attach(driver)
+        bus = BusWorker(driver)
+        bus.start()
+        mailbox = CommandMailbox()
+        server = MailboxServer(bus, mailbox)
+        server.start()
+        writer = LiveStateWriter()
+        writer.publish(time.time(), 0.01, 12.0, 12.0, np.full(MEASURED_VALUE_COUNT, 12.0),
+                       [actuator.modbus_id], [0.0], [2048], [2048], [30])
+        writer.publish_status(time.time(), True)
+
+        original_mailbox, mailbox_module._mailbox_instance = mailbox_module._mailbox_instance, mailbox
+        original_reader, live._reader = live._reader, None
+        try:
+            return _run(client, count, actuator)
+        finally:
+            mailbox_module._mailbox_instance = original_mailbox
+            live._reader = original_reader
+            server.stop()
+            bus.stop()
+            writer.close()
+            mailbox.close()
+
+
+def _run(client, count, actuator):
+    position = (actuator.min_position + actuator.max_position) // 2
+    body = json.dumps({'actuator_id': actuator.modbus_id, 'position': position})
+    set_position = reverse('set_actuator_position')
+    submit, status, stream, roundtrip = [], [], [], []
+    for i in range(count):
+        start = time.perf_counter()
+        response = client.post(set_position, body, content_type='application/json')
+        submitted = time.perf_counter()
+        submit.append(submitted - start)
+        status_url = response.json()['status_url']
+
+        while True:
+            start = time.perf_counter()
+            job = client.get(status_url).json()
+            status.append(time.perf_counter() - start)
+            if job['status'] in ('done', 'failed') or time.perf_counter() - submitted > JOB_TIMEOUT:
+                break
+            time.sleep(JOB_POLL_INTERVAL)
+        roundtrip.append(time.perf_counter() - submitted)
+
+        start = time.perf_counter()
+        client.get(reverse('live_stream'))
+        stream.append(time.perf_counter() - start)
+
+    results = {}
+    results.update(latency_metrics('web.set_position', submit))
+    results.update(latency_metrics('web.job_status', status))
+    results.update(latency_metrics('web.live_snapshot', stream))
+    results.update(latency_metrics('web.job_roundtrip', roundtrip))
+    return results
@@ -0,0 +1,171 @@
+import asyncio
+import json
+import logging
+import math
+import time
+
+from django.conf import settings
+
+from apps.hardware.services.live_state import LiveStateReader
+from apps.hardware.services.telemetry import NO_VALUE
+
+logger = logging.getLogger(__name__)
+
+QUEUE_SIZE = 16
+STALE_AFTER = 2.0  # Seconds without a new cycle before the loop is reported offline
+KEEPALIVE_INTERVAL = 15.0
+# Streams are closed after this long and EventSource reconnects; bounds the life
+# of a stream whose client went away without the server noticing
+MAX_STREAM_SECONDS = 300.0
+
+
+def _round(value, digits=3):
+    value = float(value)
+    return None if math.isnan(value) else round(value, digits)
+
+
+def _counts(values):
+    """Actuator fields as JSON: NO_VALUE (no write, failed or skipped read) becomes null."""
+    return [None if value == NO_VALUE else value for value in values.tolist()]
+
+
+def state_message(state) -> dict:
+    """Converts a live state record into the JSON message sent to the browsers."""
+    if state is None:
+        return {'online': False}
+    n = int(state['n_actuators'])
+    return {
+        'online': bool(time.time() - state['timestamp'] < STALE_AFTER),
+        'active': bool(state['active']),
+        'overruns': int(state['overruns']),
+        'jitter_max_ms': _round(state['jitter_max'] * 1000.0, 2),
+        'cycle': int(state['cycle']),
+        'cycle_ms': _round(state['cycle_time'] * 1000.0, 2),
+        'target': _round(state['target']),
+        'measured': _round(state['measured']),
+        'profile': [_round(v) for v in state['profile']],
+        'actuators': state['actuator_ids'][:n].tolist(),
+        'error': [_round(v) for v in state['error'][:n]],
+        'commanded': _counts(state['commanded'][:n]),
+        'position': _counts(state['position'][:n]),
+        'current': _counts(state['current'][:n]),
+    }
+
+
+def message_delta(previous: dict, current: dict) -> dict:
+    """Fields of `current` that differ from `previous`."""
+    return {key: value for key, value in current.items() if previous.get(key) != value}
+
+
+class LiveHub:
+    """
+    Fans the live state out to every connected browser of this web worker.
+
+    A single producer task polls the memory-mapped live state at
+    HARDWARE_LIVE_STREAM_HZ, whatever the number of clients, and pushes
+    only the fields that changed since the previous update. New clients get
+    the full last message first. A client that cannot keep up has its queue
+    replaced by one full snapshot instead of blocking the producer. The task
+    only runs while somebody is listening.
+    """
+
+    def __init__(self, reader=None, rate=None):
+        self.reader = reader or get_reader()
+        self.interval = 1.0 / (rate or settings.HARDWARE_LIVE_STREAM_HZ)
+        self.subscribers = set()
+        self.last = None
+        self._task = None
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        if self.last is not None:
+            queue.put_nowait(('snapshot', self.last))
+        self.subscribers.add(queue)
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue):
+        self.subscribers.discard(queue)
+        if not self.subscribers and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.last = None
+
+    def poll(self):
+        """Reads the live state once and fans out the change, if any."""
+        message = state_message(self.reader.read())
+        if self.last is None:
+            event, payload = 'snapshot', message
+        else:
+            event, payload = 'delta', message_delta(self.last, message)
+        self.last = message
+        if not payload:
+            return
+        for queue in self.subscribers:
+            self._offer(queue, event, payload)
+
+    def _offer(self, queue, event, payload):
+        try:
+            queue.put_nowait((event, payload))
+        except asyncio.QueueFull:
+            # Slow client: drop its backlog, resynchronise with a full snapshot
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(('snapshot', self.last))
+
+    async def _run(self):
+        while True:
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error(f"Live state poll failed: {e}")
+            await asyncio.sleep(self.interval)
+
+
+_reader = None
+_hubs = {}
+
+
+def get_reader() -> LiveStateReader:
+    global _reader
+    if _reader is None:
+        _reader = LiveStateReader()
+    return _reader
+
+
+def current_message() -> dict:
+    return state_message(get_reader().read())
+
+
+def get_hub() -> LiveHub:
+    """Returns the hub of the running event loop (one per web worker process)."""
+    loop = asyncio.get_running_loop()
+    hub = _hubs.get(loop)
+    if hub is None:
+        _hubs.clear()
+        hub = _hubs[loop] = LiveHub()
+    return hub
+
+
+def sse_event(event, payload, retry=None) -> str:
+    data = json.dumps(payload, separators=(',', ':'))
+    prefix = f"retry: {retry}\n" if retry is not None else ""
+    return f"{prefix}event: {event}\ndata: {data}\n\n"
+
+
+async def event_stream(hub: LiveHub):
+    """SSE body: the hub's messages for one client, with keep-alives."""
+    queue = hub.subscribe()
+    deadline = time.monotonic() + MAX_STREAM_SECONDS
+    try:
+        yield sse_event('hello', {}, retry=int(hub.interval * 1000))
+        while time.monotonic() < deadline:
+            try:
+                event, payload = await asyncio.wait_for(queue.get(), KEEPALIVE_INTERVAL)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse_event(event, payload)
+    finally:
+        hub.unsubscribe(queue)
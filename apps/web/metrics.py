@@ -0,0 +1,94 @@
+from apps.hardware.services.metrics import BUCKETS, COUNTERS, OUTCOMES, PHASES, MetricsReader
+
+# Prometheus text exposition format
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+PREFIX = 'bocal'
+
+COUNTER_HELP = {
+    'cycles': 'Control cycles started',
+    'overruns': 'Control cycles that started late',
+    'skipped_cycles': 'Control periods missed entirely after an overrun',
+    'writes_sent': 'Goal positions sent to the actuators',
+    'writes_suppressed': 'Goal positions not sent (deadband or zone in tolerance)',
+    'loop_errors': 'Control cycles aborted by an exception',
+}
+
+_reader = None
+
+
+def get_reader() -> MetricsReader:
+    global _reader
+    if _reader is None:
+        _reader = MetricsReader()
+    return _reader
+
+
+def _histogram(lines, name, labels, buckets, total):
+    """Appends the series of one histogram; `buckets` are per-bucket counts, +Inf last."""
+    cumulative = 0
+    for bound, count in zip(BUCKETS, buckets):
+        cumulative += int(count)
+        lines.append(f'{name}_bucket{{{labels}le="{bound:g}"}} {cumulative}')
+    cumulative += int(buckets[-1])
+    lines.append(f'{name}_bucket{{{labels}le="+Inf"}} {cumulative}')
+    labels = labels.rstrip(',')
+    labels = f'{{{labels}}}' if labels else ''
+    lines.append(f'{name}_sum{labels} {float(total)!r}')
+    lines.append(f'{name}_count{labels} {cumulative}')
+
+
+def render(snapshot) -> str:
+    """Prometheus exposition of a MetricsReader snapshot (empty when the loop never ran)."""
+    if snapshot is None:
+        return ''
+    lines = [
+        f'# HELP {PREFIX}_loop_start_time_seconds Unix time the control process started recording',
+        f'# TYPE {PREFIX}_loop_start_time_seconds gauge',
+        f'{PREFIX}_loop_start_time_seconds {float(snapshot["started"])!r}',
+    ]
+
+    for name, value in zip(COUNTERS, snapshot['counters']):
+        metric = f'{PREFIX}_loop_{name}_total'
+        lines.append(f'# HELP {metric} {COUNTER_HELP[name]}')
+        lines.append(f'# TYPE {metric} counter')
+        lines.append(f'{metric} {int(value)}')
+
+    metric = f'{PREFIX}_loop_phase_seconds'
+    lines.append(f'# HELP {metric} Duration of the control cycle phases')
+    lines.append(f'# TYPE {metric} histogram')
+    for i, phase in enumerate(PHASES):
+        _histogram(lines, metric, f'phase="{phase}",', snapshot['phase_buckets'][i], snapshot['phase_sum'][i])
+
+    metric = f'{PREFIX}_loop_skipped_phases_total'
+    lines.append(f'# HELP {metric} Phases left out to keep the cycle within its period')
+    lines.append(f'# TYPE {metric} counter')
+    for phase, value in zip(PHASES, snapshot['skipped_phases']):
+        lines.append(f'{metric}{{phase="{phase}"}} {int(value)}')
+
+    # Bus series only for the slaves that were actually addressed
+    slaves = [int(i) for i in snapshot['bus_outcomes'].sum(axis=1).nonzero()[0]]
+
+    metric = f'{PREFIX}_bus_transaction_seconds'
+    lines.append(f'# HELP {metric} Bus transaction time, request to end of reply or timeout')
+    lines.append(f'# TYPE {metric} histogram')
+    for slave in slaves:
+        _histogram(lines, metric, f'slave="{slave}",', snapshot['bus_buckets'][slave], snapshot['bus_sum'][slave])
+
+    metric = f'{PREFIX}_bus_transactions_total'
+    lines.append(f'# HELP {metric} Bus transactions by outcome')
+    lines.append(f'# TYPE {metric} counter')
+    for slave in slaves:
+        for outcome, name in OUTCOMES.items():
+            lines.append(f'{metric}{{slave="{slave}",outcome="{name}"}} {int(snapshot["bus_outcomes"][slave, outcome])}')
+
+    metric = f'{PREFIX}_bus_retries_total'
+    lines.append(f'# HELP {metric} Bus transactions repeated after a timeout or a bad reply')
+    lines.append(f'# TYPE {metric} counter')
+    for slave in slaves:
+        lines.append(f'{metric}{{slave="{slave}"}} {int(snapshot["bus_retries"][slave])}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def current_metrics() -> str:
+    return render(get_reader().read())
@@ -1,6 +1,23 @@
-from django.test import TestCase, Client
+import asyncio
+import json
+from concurrent.futures import Future
+import os
+import time
+
+from django.test import TestCase, SimpleTestCase, Client, override_settings
 from django.urls import reverse
-from apps.hardware.models import ControlSettings
+from apps.hardware.models import ActuatorConfig, ControlSettings, PositionPreset
+from apps.hardware.services import mailbox as mailbox_module
+from apps.hardware.services.mailbox import CommandMailbox, MailboxServer
+from apps.hardware.services.live_state import LiveStateWriter, LiveStateReader
+from apps.hardware.services.metrics import MetricsRecorder
+from apps.hardware.services.link_stats import OUTCOME_OK, OUTCOME_TIMEOUT
+from apps.hardware.services.mighty_zap import DeviceIdentity, MightyZapDriver
+from apps.hardware.services.simulator import HardwareSimulator
+from apps.hardware.services.telemetry import NO_VALUE
+from apps.hardware.tests import temp_dir
+from apps.web.live import LiveHub, event_stream, state_message
+from apps.web.benchmark import bench_web
 
 class DashboardViewTests(TestCase):
     def test_dashboard_status_code(self):
@@ -24,3 +41,269 @@ class DashboardViewTests(TestCase):
         self.assertFalse(settings.is_active)
 
 
+def publish(writer, cycle_ms, positions):
+    writer.publish(time.time(), cycle_ms / 1000.0, 10.0, 9.5, [9.5] * 7, [1, 2],
+                   [0.5, -0.5], positions, positions, [30, 40])
+
+
+class LiveStreamTests(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(temp_dir(self), 'live.state')
+        self.writer = LiveStateWriter(self.path)
+
+    def test_hub_fans_out_snapshot_then_deltas(self):
+        async def scenario():
+            hub = LiveHub(LiveStateReader(self.path), rate=100)
+            publish(self.writer, 20, [100, 200])
+            first, second = hub.subscribe(), hub.subscribe()
+            hub.poll()
+            publish(self.writer, 20, [150, 200])
+            hub.poll()
+            messages = [first.get_nowait(), first.get_nowait()]
+            self.assertEqual(second.qsize(), 2)
+            hub.unsubscribe(first)
+            hub.unsubscribe(second)
+            return messages
+
+        (event1, snapshot), (event2, delta) = asyncio.run(scenario())
+        self.assertEqual(event1, 'snapshot')
+        self.assertTrue(snapshot['online'])
+        self.assertEqual(snapshot['position'], [100, 200])
+        self.assertEqual(event2, 'delta')
+        # Só os campos que mudaram (posição/comando) e o contador de ciclo
+        self.assertEqual(set(delta), {'cycle', 'commanded', 'position'})
+
+    def test_missing_actuator_values_are_null(self):
+        publish(self.writer, 20, [100, NO_VALUE])
+        message = state_message(LiveStateReader(self.path).read())
+        self.assertEqual(message['position'], [100, None])
+
+    def test_event_stream_format(self):
+        async def scenario():
+            hub = LiveHub(LiveStateReader(self.path), rate=100)
+            publish(self.writer, 20, [100, 200])
+            stream = event_stream(hub)
+            chunks = [await stream.__anext__(), await stream.__anext__()]
+            await stream.aclose()
+            self.assertFalse(hub.subscribers)
+            return chunks
+
+        hello, snapshot = asyncio.run(scenario())
+        self.assertTrue(hello.startswith('retry: 10\n'))
+        self.assertTrue(snapshot.startswith('event: snapshot\ndata: '))
+        self.assertEqual(json.loads(snapshot.split('data: ', 1)[1])['actuators'], [1, 2])
+
+    def test_wsgi_fallback_sends_one_snapshot(self):
+        publish(self.writer, 20, [100, 200])
+        with override_settings(HARDWARE_LIVE_STATE_FILE=self.path):
+            from apps.web import live
+            live._reader = None
+            self.addCleanup(setattr, live, '_reader', None)
+            response = Client().get(reverse('live_stream'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        body = response.content.decode()
+        self.assertIn('event: snapshot', body)
+        self.assertIn('"position":[100,200]', body)
+
+
+class MetricsViewTests(SimpleTestCase):
+    def setUp(self):
+        self.path = os.path.join(temp_dir(self), 'metrics')
+        from apps.web import metrics
+        metrics._reader = None
+        self.addCleanup(setattr, metrics, '_reader', None)
+
+    def get(self):
+        with override_settings(HARDWARE_METRICS_FILE=self.path):
+            return Client().get(reverse('metrics'))
+
+    def test_empty_before_the_control_loop_runs(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b'')
+
+    def test_prometheus_exposition(self):
+        recorder = MetricsRecorder(self.path)
+        self.addCleanup(recorder.close)
+        recorder.count('cycles', 3)
+        recorder.phase('read', 0.003)
+        recorder.phase('read', 2.0)
+        recorder.transaction(2, OUTCOME_OK, 0.004)
+        recorder.transaction(2, OUTCOME_TIMEOUT, 0.05)
+        recorder.retry(2)
+
+        response = self.get()
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE bocal_loop_phase_seconds histogram', lines)
+        self.assertIn('bocal_loop_cycles_total 3', lines)
+        # Buckets cumulativos
+        self.assertIn('bocal_loop_phase_seconds_bucket{phase="read",le="0.0025"} 0', lines)
+        self.assertIn('bocal_loop_phase_seconds_bucket{phase="read",le="0.005"} 1', lines)
+        self.assertIn('bocal_loop_phase_seconds_bucket{phase="read",le="+Inf"} 2', lines)
+        self.assertIn('bocal_loop_phase_seconds_count{phase="read"} 2', lines)
+        self.assertIn('bocal_loop_phase_seconds_sum{phase="read"} 2.003', lines)
+        self.assertIn('bocal_bus_transaction_seconds_count{slave="2"} 2', lines)
+        self.assertIn('bocal_bus_transactions_total{slave="2",outcome="timeout"} 1', lines)
+        self.assertIn('bocal_bus_retries_total{slave="2"} 1', lines)
+        self.assertFalse([line for line in lines if 'slave="1"' in line])  # Só escravos consultados
+
+
+class RecordingDriver:
+    """Driver falso: registra as chamadas e confirma todas as escritas."""
+
+    def __init__(self):
+        self.calls = []
+
+    def set_positions(self, goals, broadcast=False):
+        self.calls.append(('set_positions', (goals,), {'broadcast': broadcast}))
+        return {actuator_id: True for actuator_id in goals}
+
+
+class ImmediateBus:
+    """Barramento falso que executa cada operação na hora, na thread do teste."""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def submit(self, operation, *args, priority=None, **kwargs):
+        future = Future()
+        if isinstance(operation, str):
+            operation = getattr(type(self.driver), operation)
+        try:
+            future.set_result(operation(self.driver, *args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+
+class BatchCommandTests(TestCase):
+    def setUp(self):
+        ActuatorConfig.objects.create(name="A1", modbus_id=1, min_position=100, max_position=3000)
+        ActuatorConfig.objects.create(name="A2", modbus_id=2)
+        self.driver = RecordingDriver()
+        mailbox = CommandMailbox(os.path.join(temp_dir(self), 'mailbox'))
+        original, mailbox_module._mailbox_instance = mailbox_module._mailbox_instance, mailbox
+        self.addCleanup(setattr, mailbox_module, '_mailbox_instance', original)
+        # Lado do run_control, sem thread: cada poll() executa o que foi postado
+        self.server = MailboxServer(ImmediateBus(self.driver), mailbox)
+
+    def post(self, payload):
+        return self.client.post(reverse('set_actuator_positions'), json.dumps(payload),
+                                content_type='application/json')
+
+    def test_pairs_sent_in_one_grouped_operation(self):
+        response = self.post({'positions': [{'actuator_id': 1, 'position': 2000},
+                                            {'actuator_id': 2, 'position': 2000}]})
+        self.assertEqual(response.status_code, 202)
+        status_url = response.json()['status_url']
+        self.assertEqual(self.client.get(status_url).json()['status'], 'pending')
+        self.assertEqual(self.driver.calls, [])  # O processo web nunca toca o barramento
+
+        self.server.poll()
+        self.assertEqual(self.driver.calls, [('set_positions', ({1: 2000, 2: 2000},), {'broadcast': True})])
+        job = self.client.get(status_url).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'1': True, '2': True})
+        self.assertIsNotNone(job['duration_ms'])
+
+    def test_preset(self):
+        PositionPreset.objects.create(name='startup', positions={'2': 1500})
+        response = self.post({'preset': 'startup'})
+        self.assertEqual(response.status_code, 202)
+        self.server.poll()
+        self.assertEqual(self.driver.calls[0][1], ({2: 1500},))
+        self.assertFalse(self.driver.calls[0][2]['broadcast'])  # Não cobre todos os atuadores
+        self.assertEqual(self.post({'preset': 'missing'}).status_code, 404)
+
+    def test_batch_rejected_when_outside_limits(self):
+        response = self.post({'positions': [{'actuator_id': 1, 'position': 50},
+                                            {'actuator_id': 9, 'position': 10}]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([e['actuator_id'] for e in response.json()['errors']], [1, 9])
+        self.assertEqual(self.driver.calls, [])
+
+    def test_single_command_returns_job_immediately(self):
+        response = self.client.post(reverse('set_actuator_position'),
+                                    json.dumps({'actuator_id': 1, 'position': 500}),
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 202)
+        self.server.poll()
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual(job['status'], 'done')
+        self.assertEqual(job['result'], {'1': True})
+        self.assertEqual(self.driver.calls, [('set_positions', ({1: 500},), {'broadcast': False})])
+        self.assertEqual(self.client.get(reverse('job_status', args=['nope'])).status_code, 404)
+
+    def test_single_command_out_of_range_is_rejected(self):
+        # Fora do alcance do registrador, dos limites do A1 (100..3000), atuador não configurado, inválido
+        for payload in ({'actuator_id': 1, 'position': 40000}, {'actuator_id': 1, 'position': 3500},
+                        {'actuator_id': 300, 'position': 500}, {'actuator_id': 1, 'position': 'x'}):
+            response = self.client.post(reverse('set_actuator_position'), json.dumps(payload),
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.server.poll()
+        self.assertEqual(self.driver.calls, [])
+
+    def test_single_command_to_silent_actuator_fails(self):
+        # Barramento simulado só com o atuador 1: o 2 não responde à escrita
+        driver = MightyZapDriver(response_timeout=0.02)
+        HardwareSimulator((1,)).attach(driver)
+        self.server.bus = ImmediateBus(driver)
+        jobs = [self.client.post(reverse('set_actuator_position'),
+                                 json.dumps({'actuator_id': actuator_id, 'position': 500}),
+                                 content_type='application/json').json()['status_url']
+                for actuator_id in (1, 2)]
+        self.server.poll()
+        self.assertEqual([self.client.get(url).json()['result'] for url in jobs], [{'1': True}, {'2': False}])
+
+
+class WebBenchmarkTests(TestCase):
+    def test_roundtrip_through_simulated_bus(self):
+        ActuatorConfig.objects.create(name="A3", modbus_id=3)
+        mailbox = mailbox_module._mailbox_instance
+        results = bench_web(count=3)
+        self.assertGreater(results['web.job_roundtrip.p50']['value'], results['web.set_position.p50']['value'])
+        # Singleton restaurado: o benchmark não deixa a caixa de comandos temporária em uso
+        self.assertIs(mailbox_module._mailbox_instance, mailbox)
+
+
+class ProbeDriver:
+    """Driver falso para a varredura: responde instantaneamente pelos IDs dados."""
+
+    def __init__(self, devices):
+        self.devices = devices  # {(id, baudrate): DeviceIdentity}
+        self.baudrate = 57600
+
+    def set_baudrate(self, baudrate):
+        self.baudrate = baudrate
+
+    def probe(self, slave_id, timeout):
+        identity = self.devices.get((slave_id, self.baudrate))
+        return (OUTCOME_OK, identity) if identity else (OUTCOME_TIMEOUT, None)
+
+
+class DiscoveryViewTests(TestCase):
+    def setUp(self):
+        ActuatorConfig.objects.create(name="A1", modbus_id=1)
+        mailbox = CommandMailbox(os.path.join(temp_dir(self), 'mailbox'))
+        original, mailbox_module._mailbox_instance = mailbox_module._mailbox_instance, mailbox
+        self.addCleanup(setattr, mailbox_module, '_mailbox_instance', original)
+        self.driver = ProbeDriver({(1, 57600): DeviceIdentity(0x0C1F, 20), (7, 19200): DeviceIdentity(0x0C1F, 21)})
+        self.server = MailboxServer(ImmediateBus(self.driver), mailbox)
+
+    def test_discovery_job_syncs_inventory(self):
+        response = self.client.post(reverse('discover_actuators'))
+        self.assertEqual(response.status_code, 202)
+        self.server.poll()
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((job['operation'], job['status']), ('discover', 'done'))
+        self.assertEqual(job['result'], {'found': 2})
+
+        actuators = self.client.get(job['inventory_url']).json()['actuators']
+        self.assertEqual([(a['modbus_id'], a['baudrate'], a['firmware_version']) for a in actuators],
+                         [(1, 57600, 20), (7, 19200, 21)])
+
+    def test_refused_while_control_is_active(self):
+        ControlSettings.objects.create(is_active=True)
+        self.assertEqual(self.client.post(reverse('discover_actuators')).status_code, 409)
@@ -1,9 +1,14 @@
 from django.urls import path
-from .views import DashboardView, ControlStatusView, TestActuatorsView, ActuatorCommandView
+from .views import DashboardView, ControlStatusView, TestActuatorsView, ActuatorCommandView, BatchActuatorCommandView, JobStatusView, LiveStreamView, MetricsView, DiscoveryView
 
 urlpatterns = [
     path('', DashboardView.as_view(), name='dashboard'),
     path('actuator-test/', TestActuatorsView.as_view(), name='test_actuators'),
     path('api/set-position/', ActuatorCommandView.as_view(), name='set_actuator_position'),
+    path('api/set-positions/', BatchActuatorCommandView.as_view(), name='set_actuator_positions'),
+    path('api/discover/', DiscoveryView.as_view(), name='discover_actuators'),
+    path('api/jobs/<str:job_id>/', JobStatusView.as_view(), name='job_status'),
+    path('api/live/', LiveStreamView.as_view(), name='live_stream'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
     path('toggle_control/', ControlStatusView.as_view(), name='toggle_control'),
 ]
@@ -2,12 +2,17 @@ from django.views.generic import TemplateView, View
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.shortcuts import redirect
-from django.http import JsonResponse
+from django.urls import reverse
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.conf import settings as django_settings
 import json
 import logging
 
-from apps.hardware.models import ActuatorConfig, ProfileConfig, ControlSettings
-from apps.hardware.services.mighty_zap import get_driver
+from apps.hardware.models import ActuatorConfig, PositionPreset, ProfileConfig, ControlSettings
+from apps.hardware.services.mailbox import get_mailbox, MailboxFull
+from .live import get_hub, event_stream, current_message, sse_event
+from . import metrics
 
 logger = logging.getLogger(__name__)
 
@@ -37,6 +42,15 @@ class TestActuatorsView(TemplateView):
         context['actuators'] = ActuatorConfig.objects.all()
         return context
 
+def job_accepted(job_id, message):
+    """202 response pointing to the status endpoint of a submitted job."""
+    return JsonResponse({
+        'status': 'accepted',
+        'message': message,
+        'job_id': job_id,
+        'status_url': reverse('job_status', args=[job_id]),
+    }, status=202)
+
 @method_decorator(csrf_exempt, name='dispatch')
 class ActuatorCommandView(View):
     def post(self, request, *args, **kwargs):
@@ -48,13 +62,156 @@ class ActuatorCommandView(View):
             if actuator_id is None or position is None:
                 return JsonResponse({'status': 'error', 'message': 'Missing parameters'}, status=400)
 
-            # Usa instância singleton do driver (conecta automaticamente)
-            driver = get_driver()
-            driver.set_position(int(actuator_id), int(position))
-            return JsonResponse({'status': 'success', 'message': f'Movendo atuador {actuator_id} para posição {position}'})
+            # O run_control só repassa o comando ao barramento: os limites do
+            # ActuatorConfig são verificados aqui, como no endpoint em lote
+            goals, errors, _ = validate_positions([(actuator_id, position)])
+            if errors:
+                return JsonResponse({'status': 'error', 'message': errors[0]['message'], 'errors': errors}, status=400)
+
+            # Postado na caixa de comandos do run_control, dono do barramento RS-485;
+            # a resposta não espera o I/O
+            job_id = get_mailbox().submit('set_position', goals)
+            return job_accepted(job_id, f'Movendo atuador {actuator_id} para posição {position}')
+
+        except MailboxFull as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+        except (ValueError, TypeError) as e:
+            return JsonResponse({'status': 'error', 'message': f'Invalid request: {e}'}, status=400)
+        except Exception as e:
+            logger.error(f"API Error: {e}")
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+def validate_positions(pairs):
+    """
+    Checks (actuator_id, position) pairs against the ActuatorConfig limits.
+
+    Returns:
+        (goals, errors, n_configured): {modbus_id: position}, a list of
+        per-actuator error dicts (goals are only meaningful when it is empty)
+        and the number of configured actuators
+    """
+    actuators = {a.modbus_id: a for a in ActuatorConfig.objects.all()}
+    goals, errors = {}, []
+    for actuator_id, position in pairs:
+        try:
+            actuator_id, position = int(actuator_id), int(position)
+        except (TypeError, ValueError):
+            errors.append({'actuator_id': actuator_id, 'message': 'Invalid actuator id or position'})
+            continue
+        actuator = actuators.get(actuator_id)
+        if actuator is None:
+            errors.append({'actuator_id': actuator_id, 'message': 'Unknown actuator'})
+        elif not actuator.min_position <= position <= actuator.max_position:
+            errors.append({'actuator_id': actuator_id, 'message':
+                           f'Position {position} outside {actuator.min_position}..{actuator.max_position}'})
+        elif actuator_id in goals:
+            errors.append({'actuator_id': actuator_id, 'message': 'Duplicate actuator'})
+        else:
+            goals[actuator_id] = position
+    return goals, errors, len(actuators)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchActuatorCommandView(View):
+    """
+    Moves several actuators in one grouped bus operation (run by run_control).
+
+    Body: {"positions": [{"actuator_id": 1, "position": 2000}, ...]}
+    or {"preset": "<PositionPreset name>"}. The whole batch is rejected if
+    any entry is outside its ActuatorConfig limits. Accepted batches return
+    a job id; the job result holds the per-actuator outcome ({id: ok}) and
+    its duration_ms the bus time.
+    """
+
+    def post(self, request, *args, **kwargs):
+        try:
+            data = json.loads(request.body)
+            if data.get('preset') is not None:
+                preset = PositionPreset.objects.filter(name=data['preset']).first()
+                if preset is None:
+                    return JsonResponse({'status': 'error', 'message': f"Unknown preset {data['preset']}"}, status=404)
+                pairs = list(preset.positions.items())
+            elif isinstance(data.get('positions'), list):
+                pairs = [(item.get('actuator_id'), item.get('position')) for item in data['positions']]
+            else:
+                return JsonResponse({'status': 'error', 'message': 'Missing positions or preset'}, status=400)
+
+            goals, errors, n_configured = validate_positions(pairs)
+            if errors or not goals:
+                return JsonResponse({'status': 'error', 'message': 'Invalid batch', 'errors': errors}, status=400)
+
+            # One bus job; broadcast only when the batch covers every configured actuator
+            job_id = get_mailbox().submit('set_positions', goals, broadcast=len(goals) == n_configured)
+            return job_accepted(job_id, f'Movendo {len(goals)} atuadores')
 
+        except MailboxFull as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+        except (ValueError, AttributeError) as e:
+            return JsonResponse({'status': 'error', 'message': f'Invalid request: {e}'}, status=400)
         except Exception as e:
             logger.error(f"API Error: {e}")
             return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
+@method_decorator(csrf_exempt, name='dispatch')
+class DiscoveryView(View):
+    """
+    Actuator inventory and bus discovery.
+
+    GET lists the configured actuators with the model, firmware and baud
+    rate found by the last discovery. POST starts a sweep of IDs 1-247 at
+    every supported baud rate (run by run_control, which holds the bus
+    one chunk of IDs at a time); found devices are synced into
+    ActuatorConfig, the job result counts them and its inventory_url
+    points back here. Refused while the control loop is active.
+    """
+
+    def get(self, request, *args, **kwargs):
+        actuators = ActuatorConfig.objects.order_by('modbus_id').values(
+            'modbus_id', 'name', 'model_number', 'firmware_version', 'baudrate')
+        return JsonResponse({'actuators': list(actuators)})
+
+    def post(self, request, *args, **kwargs):
+        settings = ControlSettings.objects.first()
+        if settings and settings.is_active:
+            return JsonResponse({'status': 'error', 'message': 'Stop the control loop before a discovery'}, status=409)
+        try:
+            job_id = get_mailbox().submit('discover', {})
+        except MailboxFull as e:
+            return JsonResponse({'status': 'error', 'message': str(e)}, status=503)
+        return job_accepted(job_id, 'Procurando atuadores no barramento')
+
+class JobStatusView(View):
+    """Status, result and timing of a command submitted to the bus."""
+
+    def get(self, request, job_id, *args, **kwargs):
+        status = get_mailbox().status(job_id)
+        if status is None:
+            return JsonResponse({'status': 'error', 'message': 'Unknown job'}, status=404)
+        if status['operation'] == 'discover':
+            status['inventory_url'] = reverse('discover_actuators')
+        return JsonResponse(status)
+
+
+class LiveStreamView(View):
+    """Server-Sent Events stream of the control loop live state (see live.LiveHub)."""
+
+    async def get(self, request, *args, **kwargs):
+        if isinstance(request, ASGIRequest):
+            response = StreamingHttpResponse(event_stream(get_hub()), content_type='text/event-stream')
+        else:
+            # WSGI cannot hold the connection open: send the current state once and
+            # let EventSource reconnect at the stream rate
+            retry = int(1000 / django_settings.HARDWARE_LIVE_STREAM_HZ)
+            response = HttpResponse(sse_event('snapshot', current_message(), retry=retry),
+                                    content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+
+class MetricsView(View):
+    """Control loop and bus metrics in the Prometheus text format (see metrics.render)."""
 
+    def get(self, request, *args, **kwargs):
+        return HttpResponse(metrics.current_metrics(), content_type=metrics.CONTENT_TYPE)
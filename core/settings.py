@@ -124,7 +124,33 @@ if _static_app_dir.exists():
 else:
     STATICFILES_DIRS = []
 
+# Hardware
+# File touched whenever the hardware configuration changes, so the control
+# process can refresh its cached snapshot without polling the database.
+HARDWARE_CONFIG_VERSION_FILE = BASE_DIR / 'config.version'
+
+# The test runner moves every HARDWARE_* file to a temporary directory
+TEST_RUNNER = 'core.test_runner.TestRunner'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Per-cycle control loop telemetry (rotating binary files, bounded in size)
+HARDWARE_TELEMETRY_DIR = BASE_DIR / 'telemetry'
+
+# Shared memory between run_control (sole owner of the serial ports) and the
+# web workers: live state of the loop and the command mailbox. Kept on tmpfs
+# when available so the per-cycle updates never reach the SD card.
+HARDWARE_SHM_DIR = Path('/dev/shm') if Path('/dev/shm').is_dir() else BASE_DIR
+HARDWARE_LIVE_STATE_FILE = HARDWARE_SHM_DIR / 'bocal-live.state'
+HARDWARE_MAILBOX_FILE = HARDWARE_SHM_DIR / 'bocal-mailbox'
+# Counters and histograms of the control loop and the bus, served at /metrics/
+HARDWARE_METRICS_FILE = HARDWARE_SHM_DIR / 'bocal-metrics'
+# Rate (Hz) at which the live stream pushes updates to the browsers
+HARDWARE_LIVE_STREAM_HZ = 5
+
+# Results of `manage.py benchmark --save-baseline`, compared on every later run.
+# Timings are machine specific: save it on the target machine.
+HARDWARE_BENCHMARK_BASELINE = BASE_DIR / 'benchmark-baseline.json'
@@ -0,0 +1,36 @@
+import tempfile
+from pathlib import Path
+
+from django.test import override_settings
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Test runner that keeps the suite away from the hardware files.
+
+    Every HARDWARE_* path points into a temporary directory for the whole
+    run, so saving a model in a test does not touch the config version file
+    watched by a run_control on the same machine, and no test reads or
+    writes its live state, mailbox, metrics or telemetry.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        self._hardware_dir = tempfile.TemporaryDirectory(prefix='bocal-test-')
+        directory = Path(self._hardware_dir.name)
+        self._hardware_settings = override_settings(
+            HARDWARE_CONFIG_VERSION_FILE=directory / 'config.version',
+            HARDWARE_TELEMETRY_DIR=directory / 'telemetry',
+            HARDWARE_SHM_DIR=directory,
+            HARDWARE_LIVE_STATE_FILE=directory / 'bocal-live.state',
+            HARDWARE_MAILBOX_FILE=directory / 'bocal-mailbox',
+            HARDWARE_METRICS_FILE=directory / 'bocal-metrics',
+            HARDWARE_BENCHMARK_BASELINE=directory / 'benchmark-baseline.json',
+        )
+        self._hardware_settings.enable()
+        super().setup_test_environment(**kwargs)
+
+    def teardown_test_environment(self, **kwargs):
+        super().teardown_test_environment(**kwargs)
+        self._hardware_settings.disable()
+        self._hardware_dir.cleanup()
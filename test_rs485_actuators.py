@@ -47,6 +47,9 @@ except ImportError:
     print("Execute: pip install pyserial")
     sys.exit(1)
 
+# Enquadramento MODBUS compartilhado com o driver (CRC16 por tabela)
+from apps.hardware.modbus import build_request, calculate_crc16
+
 try:
     import RPi.GPIO as GPIO
     GPIO_AVAILABLE = True
@@ -55,19 +58,6 @@ except ImportError:
     GPIO_AVAILABLE = False
 
 
-def calculate_crc16(data: bytes) -> bytes:
-    """Calcula CRC16 MODBUS (Polynomial: 0xA001)."""
-    crc = 0xFFFF
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x0001:
-                crc = (crc >> 1) ^ 0xA001
-            else:
-                crc >>= 1
-    return struct.pack('<H', crc)  # Little-endian
-
-
 class RS485Controller:
     """Controlador RS485 via MAX485 para atuadores MightyZAP."""
 
@@ -160,9 +150,7 @@ class RS485Controller:
             return b''
 
         # Monta frame MODBUS RTU
-        frame = struct.pack('>BBHH', slave_id, function_code, address, data)
-        crc = calculate_crc16(frame)
-        frame += crc
+        frame = build_request(slave_id, function_code, address, data)
 
         try:
             # Limpa buffers